@@ -11,51 +11,40 @@ import traceback
 import numpy as np
 from PIL import Image
 
-# 全局变量，用于缓存模型实例
-_pipeline = None
+from pipeline_registry import PipelineRegistry
+import blank_filter
+from blank_filter import BLANK_PAGE_MARKER, is_blank_page
+import page_orientation
+
+# 全局pipeline注册表，按配置缓存模型实例；默认启用内存上限和空闲卸载（见pipeline_registry.DEFAULT_*）
+_registry = PipelineRegistry.from_defaults()
 # 标记是否使用了回退方案
 _using_fallback = False
-# 标记是否已经尝试过初始化
-_initialization_attempted = False
 
-def get_pipeline():
+def get_registry():
+    """
+    获取全局pipeline注册表
+    """
+    return _registry
+
+def get_pipeline(config=None, **overrides):
     """
     获取或创建OCR pipeline实例
     直接使用标准PaddleOCR以避免paddlex重复初始化问题
-    """
-    global _pipeline, _using_fallback, _initialization_attempted
     
-    # 如果已经初始化过，直接返回缓存的实例
-    if _pipeline is not None:
-        return _pipeline
-    
-    # 如果已经尝试过初始化但失败了，避免重复尝试
-    if _initialization_attempted:
-        raise RuntimeError("之前的OCR初始化已失败，请重启程序后重试")
+    参数:
+        config: pipeline配置字典，可包含 lang、use_angle_cls、det_limit_side_len、model_variant
+                以及其他PaddleOCR构造参数；为None时使用默认配置
+        overrides: 以关键字形式覆盖config中的配置项
     
-    _initialization_attempted = True
-    print("正在初始化OCR模型...")
+    返回:
+        pipeline实例，相同配置的实例会被缓存复用
+    """
+    global _using_fallback
     
-    # 直接尝试使用标准PaddleOCR，避免paddlex重复初始化问题
-    try:
-        print("尝试使用标准PaddleOCR...")
-        # 直接使用PaddleOCR的ocr模块，避免导入整个paddleocr包
-        try:
-            from paddleocr import PaddleOCR
-            print("成功导入PaddleOCR")
-            # 使用更简单的参数配置，减少初始化复杂性
-            _pipeline = PaddleOCR(use_angle_cls=True, lang='ch')
-            print("成功初始化标准PaddleOCR")
-            _using_fallback = True
-            return _pipeline
-        except Exception as paddle_error:
-            print(f"初始化PaddleOCR时出错: {str(paddle_error)}")
-            raise
-    except Exception as e:
-        error_msg = f"OCR初始化失败: {str(e)}"
-        print(error_msg)
-        traceback.print_exc()
-        raise RuntimeError(error_msg)
+    pipeline = _registry.get(config, **overrides)
+    _using_fallback = True
+    return pipeline
 
 def is_using_fallback():
     """
@@ -64,7 +53,441 @@ def is_using_fallback():
     global _using_fallback
     return _using_fallback
 
-def ocr_image(image_path, output_dir="output", print_result=True):
+def load_image_array(image_path):
+    """
+    使用PIL读取图片并转换为numpy数组，避免paddlex图片读取器的问题
+    """
+    img = Image.open(image_path)
+    # 转换RGBA为RGB
+    if img.mode == 'RGBA':
+        img = img.convert('RGB')
+    # 转换为numpy数组
+    return np.array(img)
+
+def decode_image_source(source):
+    """
+    将内存中的图片统一转换为numpy数组，不写临时文件
+    
+    参数:
+        source: 图片路径、bytes/bytearray/memoryview（编码后的图片数据）、numpy数组、
+                PIL.Image对象，或带read()方法的二进制流
+    
+    返回:
+        numpy数组（RGBA会转换为RGB）
+    """
+    if isinstance(source, np.ndarray):
+        # 已解码的帧直接使用，去掉透明通道
+        if source.ndim == 3 and source.shape[2] == 4:
+            return np.ascontiguousarray(source[:, :, :3])
+        return source
+    if isinstance(source, Image.Image):
+        img = source
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        import io
+        img = Image.open(io.BytesIO(source))
+    elif hasattr(source, 'read'):
+        img = Image.open(source)
+    elif isinstance(source, (str, os.PathLike)):
+        return load_image_array(source)
+    else:
+        raise TypeError(f"不支持的图片输入类型: {type(source)}")
+    
+    # 转换RGBA为RGB
+    if img.mode == 'RGBA':
+        img = img.convert('RGB')
+    return np.array(img)
+
+def predict_array(pipeline, img_array, using_fallback, cls=None):
+    """
+    根据不同的 pipeline 类型调用对应的方法，返回原始识别输出
+    
+    参数:
+        cls: 是否执行逐行方向分类，为None时使用pipeline自身的配置（仅标准PaddleOCR的ocr方法支持）
+    """
+    # 优先使用predict方法（根据警告提示）
+    if hasattr(pipeline, 'predict'):
+        print("ocr_image: 使用predict方法进行识别")
+        output = pipeline.predict(img_array)
+        print(f"ocr_image: 预测完成, 返回结果类型: {type(output)}")
+        # 处理output为None的情况
+        if output is None:
+            print("[ERROR] predict方法返回None值")
+            output = []
+    elif using_fallback or hasattr(pipeline, 'ocr'):
+        print("ocr_image: 使用ocr方法进行识别")
+        output = pipeline.ocr(img_array) if cls is None else pipeline.ocr(img_array, cls=cls)
+        print(f"ocr_image: OCR识别完成, 返回结果类型: {type(output)}")
+        # 处理output为None的情况
+        if output is None:
+            print("[ERROR] ocr方法返回None值")
+            output = []
+    else:
+        error_msg = f"不支持的 pipeline 类型: {type(pipeline)}"
+        print(f"ocr_image: 错误 - {error_msg}")
+        raise ValueError(error_msg)
+    return output
+
+def _to_list(value):
+    """numpy数组转换为列表，便于保存为JSON"""
+    return value.tolist() if hasattr(value, 'tolist') else value
+
+def _expand_page_result(page):
+    """
+    将PaddleOCR 3.x的整页结果 {'rec_texts': [...], 'rec_scores': [...], 'rec_polys': [...]} 拆分为逐行结果，
+    每行保留自己的置信度
+    """
+    texts = list(page.get('rec_texts') or [])
+    scores = page.get('rec_scores')
+    scores = list(scores) if scores is not None else [1.0] * len(texts)
+    polys = page.get('rec_polys')
+    if polys is None:
+        polys = page.get('dt_polys')
+    polys = list(polys) if polys is not None else [[]] * len(texts)
+    return [{'text': text, 'score': float(score), 'position': _to_list(poly)}
+            for text, score, poly in zip(texts, scores, polys)]
+
+def parse_ocr_output(output, using_fallback, print_result=True):
+    """
+    将不同格式的识别输出统一转换为标准结果列表
+    
+    返回:
+        [{'text': 文本, 'score': 置信度, 'position': 坐标}, ...]
+    """
+    standard_results = []
+    
+    # 根据不同的结果格式进行处理
+    if using_fallback and isinstance(output, list) and len(output) > 0 and isinstance(output[0], list):
+        # 标准PaddleOCR格式: [[[坐标], [文本, 置信度]], ...]
+        for line in output[0]:  # 标准PaddleOCR返回的是双层列表
+            if len(line) >= 2 and isinstance(line[1], (list, tuple)) and len(line[1]) >= 1:
+                text = line[1][0] if line[1] else ""
+                score = line[1][1] if len(line[1]) > 1 else 1.0
+                position = line[0] if isinstance(line[0], (list, tuple)) else []
+                
+                standard_results.append({
+                    'text': text,
+                    'score': score,
+                    'position': position
+                })
+                
+                if print_result:
+                    print(f"文本: {text}, 置信度: {score:.4f}")
+    else:
+        # PaddleOCR-VL或其他格式处理
+        if isinstance(output, list):
+            for line in output:
+                if isinstance(line, dict) and isinstance(line.get('rec_texts'), (list, tuple)):
+                    # PaddleOCR 3.x整页结果：按行拆分，使用每行的rec_scores
+                    for item in _expand_page_result(line):
+                        standard_results.append(item)
+                        if print_result:
+                            print(f"文本: {item['text']}, 置信度: {item['score']:.4f}")
+                elif isinstance(line, dict):
+                    # 处理字典格式
+                    text = line.get('text', line.get('rec_texts', ''))
+                    score = line.get('score', 1.0)
+                    position = line.get('position', line.get('coordinates', []))
+                    
+                    standard_results.append({
+                        'text': text,
+                        'score': score,
+                        'position': position
+                    })
+                    
+                    if print_result:
+                        print(f"文本: {text}, 置信度: {score:.4f}")
+                elif isinstance(line, (list, tuple)) and len(line) > 0:
+                    # 处理列表或元组格式
+                    if isinstance(line[0], (list, tuple)) and len(line) > 1:
+                        # 处理[[坐标], 文本]格式
+                        text = line[1] if isinstance(line[1], str) else str(line[1])
+                        standard_results.append({
+                            'text': text,
+                            'score': 1.0,
+                            'position': line[0]
+                        })
+                        
+                        if print_result:
+                            print(f"文本: {text}")
+                    else:
+                        # 其他列表格式
+                        if print_result:
+                            print(f"未知格式: {line}")
+        else:
+            # 原有的OCRVL对象格式处理
+            if hasattr(output, '__iter__') and not isinstance(output, (str, dict)):
+                for idx, res in enumerate(output):
+                    if print_result:
+                        print(f"\n页面 {idx + 1}:")
+                        # 根据不同类型的结果采用不同的打印方式
+                        if hasattr(res, 'print'):
+                            res.print()
+                        else:
+                            print(res)
+    
+    return standard_results
+
+def render_ocr_results(standard_results, image_name, using_fallback, blank=False):
+    """
+    生成JSON和Markdown格式的结果内容
+    
+    返回:
+        (JSON文本, Markdown文本)
+    """
+    import json
+    json_content = json.dumps(standard_results, ensure_ascii=False, indent=2)
+    
+    md_lines = [f"# {image_name}\n\n", "## OCR识别结果\n\n",
+                f"**使用引擎**: {'标准PaddleOCR' if using_fallback else 'PaddleOCR-VL'}\n\n"]
+    if blank:
+        md_lines.append("**空白页**: 预检查判定为空白页，已跳过模型识别\n\n")
+    for idx, item in enumerate(standard_results, 1):
+        md_lines.append(f"### 文本 {idx}\n")
+        md_lines.append(f"```\n{item['text']}\n```\n")
+        if 'score' in item:
+            md_lines.append(f"**置信度**: {item['score']:.4f}\n\n")
+        else:
+            md_lines.append("\n")
+    return json_content, ''.join(md_lines)
+
+def save_ocr_results(standard_results, save_path, image_name, using_fallback, output=None, blank=False,
+                     writer=None):
+    """
+    保存结果为JSON和Markdown格式，blank为True时在Markdown中标记为空白页
+    
+    参数:
+        writer: result_writer.ResultWriter实例，指定时交给后台线程写入，不阻塞调用方
+    
+    返回:
+        使用writer时返回WriteTicket，否则返回None
+    """
+    json_path = os.path.join(save_path, f"{image_name}_result.json")
+    md_path = os.path.join(save_path, f"{image_name}_result.md")
+    json_content, md_content = render_ocr_results(standard_results, image_name, using_fallback, blank)
+    
+    ticket = None
+    if writer is not None:
+        ticket = writer.submit({json_path: json_content, md_path: md_content}, tag=image_name)
+    else:
+        # 保存为JSON
+        with open(json_path, 'w', encoding='utf-8') as f:
+            f.write(json_content)
+        
+        # 保存为Markdown
+        with open(md_path, 'w', encoding='utf-8') as f:
+            f.write(md_content)
+    
+    # 保留原有的保存方法（如果结果对象支持）
+    if output is not None and hasattr(output, '__iter__') and not isinstance(output, (str, dict)):
+        for res in output:
+            if hasattr(res, 'save_to_json'):
+                res.save_to_json(save_path=save_path)
+            if hasattr(res, 'save_to_markdown'):
+                res.save_to_markdown(save_path=save_path)
+    return ticket
+
+def extract_pure_texts(standard_results):
+    """
+    返回纯文本结果，确保与原文保持一致并保留换行格式
+    直接从standard_results中提取文本内容，不做额外处理
+    """
+    pure_text_results = []
+    for item in standard_results:
+        # 直接添加原始文本，保留所有字符包括换行符
+        if isinstance(item, dict):
+            # 尝试多种可能的文本键名
+            text_keys = ['text', 'content', 'value', 'recognition_result']
+            for key in text_keys:
+                if key in item:
+                    text = item[key]
+                    # 检查文本是否为列表，如果是则展平
+                    if isinstance(text, list):
+                        for t in text:
+                            # 确保添加的是字符串
+                            if isinstance(t, str):
+                                pure_text_results.append(t)
+                    elif isinstance(text, str):
+                        pure_text_results.append(text)
+                    break
+        elif isinstance(item, (str, tuple)):
+            # 直接添加字符串或转换元组为字符串
+            text = str(item)
+            if text.strip():
+                pure_text_results.append(text)
+        elif hasattr(item, '__str__'):
+            # 尝试转换其他对象为字符串
+            text = str(item)
+            if text.strip():
+                pure_text_results.append(text)
+    return pure_text_results
+
+def supports_staged_inference(pipeline):
+    """
+    检查pipeline是否提供独立的检测器和识别器（标准PaddleOCR 2.x）
+    """
+    return hasattr(pipeline, 'text_detector') and hasattr(pipeline, 'text_recognizer')
+
+def detect_text_boxes(pipeline, img_array):
+    """
+    仅执行文字检测，返回按从上到下、从左到右排序的文本框列表
+    
+    返回:
+        [[[x1, y1], [x2, y2], [x3, y3], [x4, y4]], ...]，pipeline不支持单独检测时返回None
+    """
+    if not hasattr(pipeline, 'text_detector'):
+        return None
+    dt_boxes, _ = pipeline.text_detector(img_array)
+    if dt_boxes is None:
+        return []
+    boxes = [np.array(box).reshape(4, 2).tolist() for box in dt_boxes]
+    # 与PaddleOCR一致：先按上边缘排序，同一行内按左边缘排序
+    boxes.sort(key=lambda b: (b[0][1], b[0][0]))
+    for i in range(len(boxes) - 1):
+        for j in range(i, -1, -1):
+            if abs(boxes[j + 1][0][1] - boxes[j][0][1]) < 10 and boxes[j + 1][0][0] < boxes[j][0][0]:
+                boxes[j], boxes[j + 1] = boxes[j + 1], boxes[j]
+            else:
+                break
+    return boxes
+
+def crop_text_box(img_array, box):
+    """
+    按四点文本框透视裁剪出单行文本图片，竖排文本自动旋转为横排
+    """
+    import cv2
+    points = np.array(box, dtype=np.float32).reshape(4, 2)
+    width = int(max(np.linalg.norm(points[0] - points[1]), np.linalg.norm(points[2] - points[3])))
+    height = int(max(np.linalg.norm(points[0] - points[3]), np.linalg.norm(points[1] - points[2])))
+    width = max(width, 1)
+    height = max(height, 1)
+    target = np.float32([[0, 0], [width, 0], [width, height], [0, height]])
+    matrix = cv2.getPerspectiveTransform(points, target)
+    crop = cv2.warpPerspective(img_array, matrix, (width, height),
+                               borderMode=cv2.BORDER_REPLICATE, flags=cv2.INTER_CUBIC)
+    if height / float(width) >= 1.5:
+        crop = np.rot90(crop)
+    return crop
+
+def recognize_crops(pipeline, crops, cls=True, batch_size=None):
+    """
+    仅对已裁剪好的单行文本图片执行识别（跳过文字检测）
+    
+    参数:
+        pipeline: OCR pipeline实例
+        crops: 单行文本图片(numpy数组)列表
+        cls: 是否使用方向分类器
+        batch_size: 本次调用中识别器内部的分批大小，为None时使用识别器自身的rec_batch_num；
+                    只在调用期间生效，不改变pipeline配置（也就不会按新配置再加载一份模型）
+    
+    返回:
+        [(文本, 置信度), ...]，与crops一一对应
+    """
+    crops = list(crops)
+    if not crops:
+        return []
+    
+    # 标准PaddleOCR提供独立的识别器，可一次性批量识别
+    if hasattr(pipeline, 'text_recognizer'):
+        if cls and getattr(pipeline, 'use_angle_cls', False) and getattr(pipeline, 'text_classifier', None) is not None:
+            crops, _, _ = pipeline.text_classifier(crops)
+        recognizer = pipeline.text_recognizer
+        previous = getattr(recognizer, 'rec_batch_num', None)
+        if batch_size is not None and previous is not None:
+            recognizer.rec_batch_num = batch_size
+        try:
+            rec_res, _ = recognizer(crops)
+        finally:
+            if batch_size is not None and previous is not None:
+                recognizer.rec_batch_num = previous
+        return [(text, float(score)) for text, score in rec_res]
+    
+    # 其他pipeline：逐个识别，合并每个裁剪区域内的文本
+    using_fallback = is_using_fallback()
+    results = []
+    for crop in crops:
+        output = predict_array(pipeline, crop, using_fallback)
+        items = parse_ocr_output(output, using_fallback, print_result=False)
+        text = ' '.join(item['text'] for item in items if isinstance(item.get('text'), str))
+        score = sum(float(item.get('score', 1.0)) for item in items) / len(items) if items else 0.0
+        results.append((text, score))
+    return results
+
+def orient_page(pipeline, img_array, detect_orientation=None):
+    """
+    整页方向检测：页面旋转到正向后关闭逐行方向分类
+    
+    参数:
+        detect_orientation: 是否检测，为None时使用 page_orientation.DETECT_PAGE_ORIENTATION
+    
+    返回:
+        (图片数组, 传给predict_array的cls参数, 逆时针旋转角度)
+    """
+    if detect_orientation is None:
+        detect_orientation = page_orientation.DETECT_PAGE_ORIENTATION
+    # 未开启逐行方向分类时没有可以省掉的模型调用
+    if not detect_orientation or not getattr(pipeline, 'use_angle_cls', False) or not supports_staged_inference(pipeline):
+        return img_array, None, 0
+    img_array, cls, info = page_orientation.normalize_page(pipeline, img_array)
+    if cls:
+        print(f"ocr_image: 整页方向不确定（{info['reason']}），使用逐行方向分类")
+    else:
+        print(f"ocr_image: 整页方向检测完成，旋转 {info['rotation']} 度，关闭逐行方向分类")
+    return img_array, cls, info['rotation']
+
+def _recognize_array(pipeline, img_array, using_fallback, skip_blank):
+    """
+    ocr_image与ocr_input共用：对已解码的图片执行空白页检测、整页方向检测和模型识别
+    
+    返回:
+        (原始输出, 是否空白页, 逆时针旋转角度)，空白页的原始输出为None
+    """
+    if skip_blank:
+        blank, metrics = is_blank_page(img_array)
+        if blank:
+            print(f"ocr_image: 判定为空白页（墨迹像素 {metrics['ink_pixels']}），跳过模型识别")
+            return None, True, 0
+    img_array, cls, rotation = orient_page(pipeline, img_array)
+    return predict_array(pipeline, img_array, using_fallback, cls=cls), False, rotation
+
+def _collect_results(output, blank, rotation, using_fallback, name, output_dir, print_result, writer,
+                     image_path=None):
+    """
+    ocr_image与ocr_input共用：解析原始输出并保存结果，返回结构化结果字典
+    output_dir为None时不保存；解析或保存失败时记录在save_error中，不抛出异常
+    """
+    save_path = None
+    if output_dir is not None:
+        # 为每个图片创建单独的输出文件夹
+        save_path = os.path.join(output_dir, name)
+        os.makedirs(save_path, exist_ok=True)
+    
+    standard_results = []
+    write_status = None
+    save_error = None
+    try:
+        if not blank:
+            standard_results = parse_ocr_output(output, using_fallback, print_result)
+        if save_path is not None:
+            write_status = save_ocr_results(standard_results, save_path, name, using_fallback, output,
+                                            blank=blank, writer=writer)
+    except Exception as e:
+        save_error = e
+        print(f"保存结果时出错: {str(save_error)}")
+    
+    return {
+        'image_path': image_path,
+        'texts': [BLANK_PAGE_MARKER] if blank else extract_pure_texts(standard_results),
+        'results': standard_results,
+        'save_path': save_path,
+        'blank': blank,
+        'rotation': rotation,
+        'using_fallback': using_fallback,
+        'write_status': write_status,
+        'save_error': save_error,
+    }
+
+def ocr_image(image_path, output_dir="output", print_result=True, pipeline_config=None, skip_blank=None,
+              writer=None, return_details=False):
     """执行OCR识别并返回纯文本结果"""
 
     """
@@ -74,10 +497,19 @@ def ocr_image(image_path, output_dir="output", print_result=True):
         image_path: 图片路径
         output_dir: 结果保存目录
         print_result: 是否打印识别结果
+        pipeline_config: pipeline配置字典，为None时使用默认配置
+        skip_blank: 是否跳过空白页的模型识别，为None时使用 blank_filter.SKIP_BLANK_PAGES
+        writer: result_writer.ResultWriter实例，指定时结果文件由后台线程写入，识别线程不等待磁盘I/O
+        return_details: 为True时返回包含结构化结果和写入状态的字典
     
     返回:
-        识别结果列表
+        识别结果列表，空白页返回 [BLANK_PAGE_MARKER]；return_details为True时返回
+        {'image_path', 'texts', 'results', 'save_path', 'blank', 'rotation', 'using_fallback', 'write_status',
+         'save_error'}，其中write_status为WriteTicket（未使用writer时为None），rotation为整页方向检测
+        逆时针旋转的角度，结果坐标基于旋转后的页面
     """
+    if skip_blank is None:
+        skip_blank = blank_filter.SKIP_BLANK_PAGES
     print(f"ocr_image: 开始处理图片: {image_path}")
     
     # 检查图片文件是否存在
@@ -92,7 +524,7 @@ def ocr_image(image_path, output_dir="output", print_result=True):
         
         print("ocr_image: 获取OCR pipeline实例...")
         # 获取pipeline和回退状态
-        pipeline = get_pipeline()
+        pipeline = get_pipeline(pipeline_config)
         using_fallback = is_using_fallback()
         print(f"ocr_image: pipeline初始化完成, 是否使用回退方案: {using_fallback}")
         
@@ -101,43 +533,21 @@ def ocr_image(image_path, output_dir="output", print_result=True):
             print(f"\n正在执行 OCR 识别: {image_path}")
         
         # 根据不同的 pipeline 类型调用对应的方法
+        blank = False
+        rotation = 0
         try:
             print(f"ocr_image: 检查pipeline类型: {type(pipeline)}")
             # 先使用PIL预处理图片，避免paddlex图片读取器的问题
             print("ocr_image: 使用PIL预处理图片...")
             try:
-                img = Image.open(image_path)
-                # 转换RGBA为RGB
-                if img.mode == 'RGBA':
-                    img = img.convert('RGB')
-                # 转换为numpy数组
-                img_array = np.array(img)
+                img_array = load_image_array(image_path)
                 print(f"ocr_image: 图片预处理成功，形状: {img_array.shape}")
-                
-                # 优先使用predict方法（根据警告提示）
-                if hasattr(pipeline, 'predict'):
-                    print("ocr_image: 使用predict方法进行识别")
-                    output = pipeline.predict(img_array)
-                    print(f"ocr_image: 预测完成, 返回结果类型: {type(output)}")
-                    # 处理output为None的情况
-                    if output is None:
-                        print("[ERROR] predict方法返回None值")
-                        output = []
-                elif using_fallback or hasattr(pipeline, 'ocr'):
-                    print("ocr_image: 使用ocr方法进行识别")
-                    output = pipeline.ocr(img_array)
-                    print(f"ocr_image: OCR识别完成, 返回结果类型: {type(output)}")
-                    # 处理output为None的情况
-                    if output is None:
-                        print("[ERROR] ocr方法返回None值")
-                        output = []
-                else:
-                    error_msg = f"不支持的 pipeline 类型: {type(pipeline)}"
-                    print(f"ocr_image: 错误 - {error_msg}")
-                    raise ValueError(error_msg)
+                output, blank, rotation = _recognize_array(pipeline, img_array, using_fallback, skip_blank)
             except Exception as preprocess_error:
                 # 如果预处理失败，尝试直接使用路径
                 print(f"ocr_image: 图片预处理失败，尝试直接使用路径: {str(preprocess_error)}")
+                blank = False
+                rotation = 0
                 if using_fallback or hasattr(pipeline, 'ocr'):
                     output = pipeline.ocr(image_path)
                 elif hasattr(pipeline, 'predict'):
@@ -155,157 +565,65 @@ def ocr_image(image_path, output_dir="output", print_result=True):
             print("识别结果:")
             print("="*80)
         
-        # 为每个图片创建单独的输出文件夹
         image_name = os.path.splitext(os.path.basename(image_path))[0]
-        save_path = os.path.join(output_dir, image_name)
-        os.makedirs(save_path, exist_ok=True)
+        details = _collect_results(output, blank, rotation, using_fallback, image_name, output_dir, print_result,
+                                   writer, image_path=image_path)
         
-        # 处理不同类型的输出结果
-        standard_results = []
-        
-        try:
-            # 根据不同的结果格式进行处理
-            if using_fallback and isinstance(output, list) and len(output) > 0 and isinstance(output[0], list):
-                # 标准PaddleOCR格式: [[[坐标], [文本, 置信度]], ...]
-                for line in output[0]:  # 标准PaddleOCR返回的是双层列表
-                    if len(line) >= 2 and isinstance(line[1], (list, tuple)) and len(line[1]) >= 1:
-                        text = line[1][0] if line[1] else ""
-                        score = line[1][1] if len(line[1]) > 1 else 1.0
-                        position = line[0] if isinstance(line[0], (list, tuple)) else []
-                        
-                        standard_results.append({
-                            'text': text,
-                            'score': score,
-                            'position': position
-                        })
-                        
-                        if print_result:
-                            print(f"文本: {text}, 置信度: {score:.4f}")
-            else:
-                # PaddleOCR-VL或其他格式处理
-                if isinstance(output, list):
-                    for line in output:
-                        if isinstance(line, dict):
-                            # 处理字典格式
-                            text = line.get('text', line.get('rec_texts', ''))
-                            score = line.get('score', 1.0)
-                            position = line.get('position', line.get('coordinates', []))
-                            
-                            standard_results.append({
-                                'text': text,
-                                'score': score,
-                                'position': position
-                            })
-                            
-                            if print_result:
-                                print(f"文本: {text}, 置信度: {score:.4f}")
-                        elif isinstance(line, (list, tuple)) and len(line) > 0:
-                            # 处理列表或元组格式
-                            if isinstance(line[0], (list, tuple)) and len(line) > 1:
-                                # 处理[[坐标], 文本]格式
-                                text = line[1] if isinstance(line[1], str) else str(line[1])
-                                standard_results.append({
-                                    'text': text,
-                                    'score': 1.0,
-                                    'position': line[0]
-                                })
-                                
-                                if print_result:
-                                    print(f"文本: {text}")
-                            else:
-                                # 其他列表格式
-                                if print_result:
-                                    print(f"未知格式: {line}")
-                else:
-                    # 原有的OCRVL对象格式处理
-                    if hasattr(output, '__iter__') and not isinstance(output, (str, dict)):
-                        for idx, res in enumerate(output):
-                            if print_result:
-                                print(f"\n页面 {idx + 1}:")
-                                # 根据不同类型的结果采用不同的打印方式
-                                if hasattr(res, 'print'):
-                                    res.print()
-                                else:
-                                    print(res)
-            
-            # 保存结果为JSON和Markdown格式
-            json_path = os.path.join(save_path, f"{image_name}_result.json")
-            md_path = os.path.join(save_path, f"{image_name}_result.md")
-            
-            # 保存为JSON
-            import json
-            with open(json_path, 'w', encoding='utf-8') as f:
-                json.dump(standard_results, f, ensure_ascii=False, indent=2)
-            
-            # 保存为Markdown
-            with open(md_path, 'w', encoding='utf-8') as f:
-                f.write(f"# {image_name}\n\n")
-                f.write("## OCR识别结果\n\n")
-                f.write(f"**使用引擎**: {'标准PaddleOCR' if using_fallback else 'PaddleOCR-VL'}\n\n")
-                for idx, item in enumerate(standard_results, 1):
-                    f.write(f"### 文本 {idx}\n")
-                    f.write(f"```\n{item['text']}\n```\n")
-                    if 'score' in item:
-                        f.write(f"**置信度**: {item['score']:.4f}\n\n")
-                    else:
-                        f.write("\n")
-            
-            # 保留原有的保存方法（如果结果对象支持）
-            if hasattr(output, '__iter__') and not isinstance(output, (str, dict)):
-                for res in output:
-                    if hasattr(res, 'save_to_json'):
-                        res.save_to_json(save_path=save_path)
-                    if hasattr(res, 'save_to_markdown'):
-                        res.save_to_markdown(save_path=save_path)
-            
-        except Exception as save_error:
-            print(f"保存结果时出错: {str(save_error)}")
+        if not print_result and not return_details:
+            return None
         
         if print_result:
-            print(f"\n[完成] 结果已保存到 {save_path} 目录")
-            
-            # 返回纯文本结果，确保与原文保持一致并保留换行格式
-            # 直接从standard_results中提取文本内容，不做额外处理
-            pure_text_results = []
-            for item in standard_results:
-                # 直接添加原始文本，保留所有字符包括换行符
-                if isinstance(item, dict):
-                    # 尝试多种可能的文本键名
-                    text_keys = ['text', 'content', 'value', 'recognition_result']
-                    for key in text_keys:
-                        if key in item:
-                            text = item[key]
-                            # 检查文本是否为列表，如果是则展平
-                            if isinstance(text, list):
-                                for t in text:
-                                    # 确保添加的是字符串
-                                    if isinstance(t, str):
-                                        pure_text_results.append(t)
-                            elif isinstance(text, str):
-                                pure_text_results.append(text)
-                            break
-                elif isinstance(item, (str, tuple)):
-                    # 直接添加字符串或转换元组为字符串
-                    text = str(item)
-                    if text.strip():
-                        pure_text_results.append(text)
-                elif hasattr(item, '__str__'):
-                    # 尝试转换其他对象为字符串
-                    text = str(item)
-                    if text.strip():
-                        pure_text_results.append(text)
-            # 确保返回的结果不为空
-            if not pure_text_results:
-                print("[WARNING] 无法从OCR结果中提取任何文本")
-                pure_text_results = ["未识别到明确的文本内容"]
-            
-            print(f"[DEBUG] 最终返回的文本结果数量: {len(pure_text_results)}")
-            return pure_text_results
+            print(f"\n[完成] 结果已保存到 {details['save_path']} 目录")
+        
+        # 确保返回的结果不为空
+        if not details['texts']:
+            print("[WARNING] 无法从OCR结果中提取任何文本")
+            details['texts'] = ["未识别到明确的文本内容"]
+        
+        print(f"[DEBUG] 最终返回的文本结果数量: {len(details['texts'])}")
+        if return_details:
+            return details
+        return details['texts']
     except Exception as e:
         print(f"OCR 处理过程中发生错误: {str(e)}")
         traceback.print_exc()
         raise
 
+def ocr_input(source, name="image", output_dir=None, print_result=False, pipeline_config=None, skip_blank=None,
+              writer=None, return_details=False):
+    """
+    对内存中的图片进行OCR识别，不需要先写入临时文件
+    
+    参数:
+        source: 编码后的图片数据(bytes/bytearray/memoryview)、numpy数组、PIL.Image对象或二进制流，
+                也可以是图片路径
+        name: 结果名称，用于日志和保存结果时的文件名
+        output_dir: 结果保存目录，为None时不写入磁盘
+        print_result: 是否打印识别结果
+        pipeline_config: pipeline配置字典，为None时使用默认配置
+        skip_blank: 是否跳过空白页的模型识别，为None时使用 blank_filter.SKIP_BLANK_PAGES
+        writer: result_writer.ResultWriter实例，保存结果时交给后台线程写入
+        return_details: 为True时返回与ocr_image相同结构的字典
+    
+    返回:
+        识别结果列表，空白页返回 [BLANK_PAGE_MARKER]
+    """
+    if skip_blank is None:
+        skip_blank = blank_filter.SKIP_BLANK_PAGES
+    
+    img_array = decode_image_source(source)
+    pipeline = get_pipeline(pipeline_config)
+    using_fallback = is_using_fallback()
+    
+    output, blank, rotation = _recognize_array(pipeline, img_array, using_fallback, skip_blank)
+    details = _collect_results(output, blank, rotation, using_fallback, name, output_dir, print_result, writer)
+    if details['save_error'] is not None:
+        # 内存输入没有回退路径，解析或保存失败直接抛出
+        raise details['save_error']
+    if return_details:
+        return details
+    return details['texts']
+
 if __name__ == "__main__":
     # 单张图片测试示例
     test_image = r"C:\Users\gotmo\Pictures\Screenshots\Snipaste_2025-10-09_14-21-01.png"
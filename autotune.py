@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CPU并行配置自动调优
+使用代表性图片在 (进程数 × 每进程线程数 × 识别批大小) 网格上做短时标定，
+测量吞吐量和p95延迟，并把最佳配置保存到 ocr_tuning.json，之后的运行会自动加载
+
+用法:
+    python autotune.py 样例图片1.jpg 样例图片2.jpg ... --processes 1,2,4 --threads 1,2,4 --batch-sizes 6,16
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import socket
+import argparse
+import itertools
+import threading
+import traceback
+import multiprocessing
+
+from pipeline_registry import TUNING_FILE
+
+# 标定进程加载模型并预热的最长等待秒数，超时后其余进程放弃等待
+TRIAL_LOAD_TIMEOUT = 600.0
+# 加载完成后计时阶段的最长等待秒数，超时的进程被终止，该组配置记为失败
+TRIAL_RUN_TIMEOUT = 1800.0
+
+
+def _parse_int_list(value):
+    """解析逗号分隔的整数列表"""
+    return [int(item) for item in value.split(',') if item.strip()]
+
+
+def percentile(values, percent):
+    """计算百分位数（最近秩法）"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(percent / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def _trial_worker(image_paths, cpu_threads, rec_batch_num, pipeline_config, barrier, result_queue,
+                  load_timeout=TRIAL_LOAD_TIMEOUT):
+    """
+    标定子进程：限制线程数后加载模型，预热后对分配到的图片逐张计时
+    """
+    # 线程数需要在导入Paddle之前设置
+    for name in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+        os.environ[name] = str(cpu_threads)
+
+    latencies = []
+    start = end = None
+    error = None
+    try:
+        from PaddleOCRVL_main import get_pipeline, is_using_fallback, load_image_array, predict_array
+
+        config = dict(pipeline_config or {})
+        config.update({'cpu_threads': cpu_threads, 'rec_batch_num': rec_batch_num})
+        pipeline = get_pipeline(config)
+        using_fallback = is_using_fallback()
+
+        images = [load_image_array(path) for path in image_paths]
+        # 预热，不计入统计
+        if images:
+            predict_array(pipeline, images[0], using_fallback)
+    except Exception as e:
+        error = str(e)
+        traceback.print_exc()
+
+    # 所有进程加载完成后同时开始计时；有进程崩溃或加载超时时不再等待
+    try:
+        barrier.wait(load_timeout)
+    except threading.BrokenBarrierError:
+        if error is None:
+            error = f"其他标定进程未能在 {load_timeout:.0f} 秒内完成加载"
+
+    if error is None:
+        try:
+            start = time.time()
+            for img_array in images:
+                t0 = time.time()
+                predict_array(pipeline, img_array, using_fallback)
+                latencies.append(time.time() - t0)
+            end = time.time()
+        except Exception as e:
+            error = str(e)
+            traceback.print_exc()
+
+    result_queue.put({'latencies': latencies, 'start': start, 'end': end, 'error': error})
+
+
+def _collect_outcomes(workers, result_queue, deadline):
+    """
+    收集标定进程的结果，直到全部返回、进程全部退出或超过截止时间
+
+    返回:
+        结果列表，数量可能少于进程数
+    """
+    outcomes = []
+    while len(outcomes) < len(workers):
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            break
+        try:
+            outcomes.append(result_queue.get(timeout=min(1.0, remaining)))
+        except queue.Empty:
+            if not any(worker.is_alive() for worker in workers):
+                # 进程全部退出后队列中可能仍有刚写入的结果
+                try:
+                    while len(outcomes) < len(workers):
+                        outcomes.append(result_queue.get(timeout=0.5))
+                except queue.Empty:
+                    pass
+                break
+    return outcomes
+
+
+def run_trial(image_paths, processes, cpu_threads, rec_batch_num, pipeline_config=None, rounds=1,
+              load_timeout=TRIAL_LOAD_TIMEOUT, run_timeout=TRIAL_RUN_TIMEOUT, trial_fn=_trial_worker):
+    """
+    运行一组配置的标定
+
+    参数:
+        image_paths: 代表性图片路径列表
+        processes: 并行进程数
+        cpu_threads: 每个进程的计算线程数
+        rec_batch_num: 识别批大小
+        pipeline_config: 其他pipeline配置
+        rounds: 每个进程重复处理图片列表的轮数
+        load_timeout: 模型加载和预热的最长等待秒数
+        run_timeout: 计时阶段的最长等待秒数
+        trial_fn: 标定进程函数，需为模块级函数，参数与_trial_worker相同
+
+    返回:
+        标定结果字典；有进程崩溃、超时或出错时包含error字段
+    """
+    ctx = multiprocessing.get_context('spawn')
+    barrier = ctx.Barrier(processes)
+    result_queue = ctx.Queue()
+
+    # 把图片轮流分配给各进程，图片较少时重复使用
+    workload = list(image_paths) * max(1, rounds)
+    if len(workload) < processes:
+        workload = workload * (processes // len(workload) + 1)
+    shares = [workload[i::processes] for i in range(processes)]
+
+    workers = [
+        ctx.Process(target=trial_fn,
+                    args=(shares[i], cpu_threads, rec_batch_num, pipeline_config, barrier, result_queue,
+                          load_timeout))
+        for i in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    # 先取结果再join，避免子进程阻塞在向队列写入数据上
+    outcomes = _collect_outcomes(workers, result_queue, time.time() + load_timeout + run_timeout)
+
+    errors = [o['error'] for o in outcomes if o['error']]
+    for worker in workers:
+        worker.join(timeout=5.0)
+        if worker.is_alive():
+            worker.terminate()
+            worker.join()
+            errors.append(f"标定进程 {worker.pid} 超时，已终止")
+        elif worker.exitcode != 0:
+            errors.append(f"标定进程 {worker.pid} 异常退出，退出码 {worker.exitcode}")
+    if len(outcomes) < processes and not errors:
+        errors.append(f"只收到 {len(outcomes)}/{processes} 个标定进程的结果")
+    result_queue.close()
+
+    trial = {
+        'processes': processes,
+        'cpu_threads': cpu_threads,
+        'rec_batch_num': rec_batch_num,
+    }
+    if errors:
+        trial.update({'error': errors[0], 'throughput': 0.0, 'p95_latency': None, 'images': 0})
+        return trial
+
+    latencies = [latency for o in outcomes for latency in o['latencies']]
+    wall = max(o['end'] for o in outcomes) - min(o['start'] for o in outcomes)
+    trial.update({
+        'images': len(latencies),
+        'wall_time': wall,
+        'throughput': len(latencies) / wall if wall > 0 else 0.0,
+        'p50_latency': percentile(latencies, 50),
+        'p95_latency': percentile(latencies, 95),
+    })
+    return trial
+
+
+def select_best(trials, max_p95=None):
+    """
+    选择吞吐量最高的配置；指定max_p95时只在p95延迟不超过该值的配置中选择
+    """
+    candidates = [t for t in trials if not t.get('error') and t['images'] > 0]
+    if max_p95 is not None:
+        within = [t for t in candidates if t['p95_latency'] <= max_p95]
+        if within:
+            candidates = within
+        else:
+            print(f"没有配置满足p95延迟不超过 {max_p95} 秒，忽略延迟限制")
+    if not candidates:
+        return None
+    return max(candidates, key=lambda t: t['throughput'])
+
+
+def autotune(image_paths, process_options, thread_options, batch_options, pipeline_config=None,
+             rounds=1, max_p95=None, save_path=None):
+    """
+    在参数网格上运行标定并保存最佳配置
+
+    返回:
+        (最佳配置, 全部标定结果)
+    """
+    cpu_count = os.cpu_count() or 1
+    trials = []
+    grid = list(itertools.product(process_options, thread_options, batch_options))
+    for idx, (processes, cpu_threads, rec_batch_num) in enumerate(grid, 1):
+        if processes * cpu_threads > cpu_count * 2:
+            print(f"[{idx}/{len(grid)}] 跳过 进程={processes} 线程={cpu_threads}：超出CPU核数过多")
+            continue
+        print(f"[{idx}/{len(grid)}] 标定 进程={processes} 线程={cpu_threads} 批大小={rec_batch_num} ...")
+        trial = run_trial(image_paths, processes, cpu_threads, rec_batch_num, pipeline_config, rounds)
+        trials.append(trial)
+        if trial.get('error'):
+            print(f"    失败: {trial['error']}")
+        else:
+            print(f"    吞吐量 {trial['throughput']:.2f} 张/秒, p95延迟 {trial['p95_latency']:.2f} 秒")
+
+    best = select_best(trials, max_p95)
+    if best is None:
+        print("所有配置均标定失败，未保存调优结果")
+        return None, trials
+
+    best_config = {
+        'processes': best['processes'],
+        'cpu_threads': best['cpu_threads'],
+        'rec_batch_num': best['rec_batch_num'],
+    }
+    save_path = save_path or TUNING_FILE
+    with open(save_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'host': socket.gethostname(),
+            'cpu_count': cpu_count,
+            'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'images': [os.path.basename(p) for p in image_paths],
+            'best': best_config,
+            'trials': trials,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"最佳配置: {best_config}，已保存到 {save_path}")
+    return best_config, trials
+
+
+def print_summary(trials):
+    """打印标定结果汇总表"""
+    print("\n进程  线程  批大小  吞吐量(张/秒)  p50(秒)  p95(秒)")
+    for t in sorted(trials, key=lambda t: -t.get('throughput', 0.0)):
+        if t.get('error'):
+            print(f"{t['processes']:>4}  {t['cpu_threads']:>4}  {t['rec_batch_num']:>6}  失败: {t['error']}")
+        else:
+            print(f"{t['processes']:>4}  {t['cpu_threads']:>4}  {t['rec_batch_num']:>6}  "
+                  f"{t['throughput']:>13.2f}  {t['p50_latency']:>7.2f}  {t['p95_latency']:>7.2f}")
+
+
+def main():
+    """命令行入口"""
+    cpu_count = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="自动调优并行进程数、每进程线程数和识别批大小")
+    parser.add_argument("images", nargs="+", help="代表性图片文件")
+    parser.add_argument("--processes", default=",".join(str(p) for p in sorted({1, 2, max(1, cpu_count // 4)})),
+                        help="候选进程数，逗号分隔")
+    parser.add_argument("--threads", default=",".join(str(t) for t in sorted({1, 2, 4, max(1, cpu_count // 2)})),
+                        help="候选每进程线程数，逗号分隔")
+    parser.add_argument("--batch-sizes", default="6,16", help="候选识别批大小，逗号分隔")
+    parser.add_argument("--rounds", type=int, default=1, help="每个进程重复处理图片列表的轮数")
+    parser.add_argument("--max-p95", type=float, default=None, help="允许的最大p95延迟（秒）")
+    parser.add_argument("--save", default=None, help=f"调优结果保存路径，默认 {TUNING_FILE}")
+    parser.add_argument("--lang", default="ch", help="识别语言，如 ch、en、japan")
+    args = parser.parse_args()
+
+    missing = [p for p in args.images if not os.path.exists(p)]
+    if missing:
+        print(f"图片文件不存在: {', '.join(missing)}")
+        sys.exit(1)
+
+    best, trials = autotune(args.images, _parse_int_list(args.processes), _parse_int_list(args.threads),
+                            _parse_int_list(args.batch_sizes), pipeline_config={'lang': args.lang},
+                            rounds=args.rounds, max_p95=args.max_p95, save_path=args.save)
+    print_summary(trials)
+    if best is None:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+跨图片批量文字识别模块
+文字检测按图片逐张执行，检测得到的文本行裁剪图在多张图片之间合并，
+按宽高比排序后以大批量送入识别器，再将结果分发回各图片的 standard_results
+"""
+
+import os
+import sys
+import argparse
+import traceback
+
+from PaddleOCRVL_main import (
+    get_pipeline, is_using_fallback, load_image_array, predict_array,
+    parse_ocr_output, save_ocr_results, extract_pure_texts,
+    supports_staged_inference, detect_text_boxes, crop_text_box, recognize_crops
+)
+import blank_filter
+from blank_filter import BLANK_PAGE_MARKER, is_blank_page
+
+# 默认识别批大小
+DEFAULT_REC_BATCH_SIZE = 32
+# 每组合并处理的图片数量，限制同时驻留内存的裁剪图数量
+DEFAULT_IMAGE_GROUP_SIZE = 16
+# 与PaddleOCR默认值一致，低于该置信度的文本行被丢弃
+DEFAULT_DROP_SCORE = 0.5
+
+
+def _recognize_pooled(pipeline, pooled, rec_batch_size, cls):
+    """
+    对合并后的裁剪图按宽高比排序并分批识别
+
+    参数:
+        pooled: [(图片序号, 文本框序号, 裁剪图), ...]
+
+    返回:
+        {(图片序号, 文本框序号): (文本, 置信度)}
+    """
+    # 宽高比相近的文本行放在同一批，减少填充带来的无效计算
+    order = sorted(range(len(pooled)), key=lambda i: pooled[i][2].shape[1] / float(max(pooled[i][2].shape[0], 1)))
+
+    recognized = {}
+    for start in range(0, len(order), rec_batch_size):
+        batch = [pooled[i] for i in order[start:start + rec_batch_size]]
+        rec_results = recognize_crops(pipeline, [crop for _, _, crop in batch], cls=cls, batch_size=rec_batch_size)
+        for (image_idx, box_idx, _), result in zip(batch, rec_results):
+            recognized[(image_idx, box_idx)] = result
+    return recognized
+
+
+def ocr_images_batched(image_paths, output_dir="output", rec_batch_size=DEFAULT_REC_BATCH_SIZE,
+                       image_group_size=DEFAULT_IMAGE_GROUP_SIZE, print_result=True, pipeline_config=None,
+                       skip_blank=None):
+    """
+    批量识别多张图片，文本行识别跨图片合并批处理
+
+    参数:
+        image_paths: 图片路径列表
+        output_dir: 结果保存目录，每张图片保存在以图片名命名的子目录中
+        rec_batch_size: 识别批大小
+        image_group_size: 每组合并处理的图片数量
+        print_result: 是否打印识别结果
+        pipeline_config: pipeline配置字典，为None时使用默认配置
+        skip_blank: 是否跳过空白页，为None时使用 blank_filter.SKIP_BLANK_PAGES
+
+    返回:
+        {图片路径: 识别结果列表}，处理失败的图片对应的值为异常对象
+    """
+    if skip_blank is None:
+        skip_blank = blank_filter.SKIP_BLANK_PAGES
+    config = dict(pipeline_config or {})
+    # 识别批大小在每次识别调用时设置到识别器上，不放入配置，避免按不同缓存键再加载一份模型
+    pipeline = get_pipeline(config)
+    using_fallback = is_using_fallback()
+    use_cls = config.get('use_angle_cls', True)
+    drop_score = getattr(pipeline, 'drop_score', DEFAULT_DROP_SCORE)
+    os.makedirs(output_dir, exist_ok=True)
+
+    results = {}
+    if not supports_staged_inference(pipeline):
+        # pipeline不支持单独检测/识别时逐张处理
+        print("当前pipeline不支持单独的检测与识别，逐张处理图片")
+        for image_path in image_paths:
+            try:
+                img_array = load_image_array(image_path)
+                output = predict_array(pipeline, img_array, using_fallback)
+                standard_results = parse_ocr_output(output, using_fallback, print_result)
+                results[image_path] = _save_image_results(image_path, output_dir, standard_results,
+                                                          using_fallback, output)
+            except Exception as e:
+                print(f"处理失败 {image_path}: {str(e)}")
+                results[image_path] = e
+        return results
+
+    for group_start in range(0, len(image_paths), image_group_size):
+        group = image_paths[group_start:group_start + image_group_size]
+        group_boxes = {}
+        pooled = []
+
+        # 逐张检测并裁剪文本行
+        for image_idx, image_path in enumerate(group):
+            try:
+                if not os.path.exists(image_path):
+                    raise FileNotFoundError(f"图片文件不存在: {image_path}")
+                img_array = load_image_array(image_path)
+                if skip_blank and is_blank_page(img_array)[0]:
+                    # 空白页不参与检测和识别
+                    results[image_path] = _save_image_results(image_path, output_dir, [], using_fallback,
+                                                              blank=True)
+                    print(f"空白页 {image_path}: 跳过识别")
+                    continue
+                boxes = detect_text_boxes(pipeline, img_array)
+                group_boxes[image_idx] = boxes
+                for box_idx, box in enumerate(boxes):
+                    pooled.append((image_idx, box_idx, crop_text_box(img_array, box)))
+                print(f"检测完成 {image_path}: {len(boxes)} 个文本行")
+            except Exception as e:
+                print(f"检测失败 {image_path}: {str(e)}")
+                traceback.print_exc()
+                results[image_path] = e
+
+        # 合并识别
+        try:
+            recognized = _recognize_pooled(pipeline, pooled, rec_batch_size, use_cls)
+        except Exception as e:
+            print(f"批量识别失败: {str(e)}")
+            traceback.print_exc()
+            for image_idx in group_boxes:
+                results[group[image_idx]] = e
+            continue
+        print(f"批量识别完成: {len(group_boxes)} 张图片, {len(pooled)} 个文本行")
+
+        # 将识别结果分发回各图片
+        for image_idx, boxes in group_boxes.items():
+            image_path = group[image_idx]
+            standard_results = []
+            for box_idx, box in enumerate(boxes):
+                text, score = recognized.get((image_idx, box_idx), ("", 0.0))
+                if score < drop_score:
+                    continue
+                standard_results.append({
+                    'text': text,
+                    'score': score,
+                    'position': box
+                })
+                if print_result:
+                    print(f"文本: {text}, 置信度: {score:.4f}")
+            try:
+                results[image_path] = _save_image_results(image_path, output_dir, standard_results, using_fallback)
+            except Exception as e:
+                print(f"保存结果时出错 {image_path}: {str(e)}")
+                results[image_path] = e
+
+    # 按输入顺序返回
+    return {image_path: results[image_path] for image_path in image_paths if image_path in results}
+
+
+def _save_image_results(image_path, output_dir, standard_results, using_fallback, output=None, blank=False):
+    """保存单张图片的结果并返回纯文本列表"""
+    image_name = os.path.splitext(os.path.basename(image_path))[0]
+    save_path = os.path.join(output_dir, image_name)
+    os.makedirs(save_path, exist_ok=True)
+    save_ocr_results(standard_results, save_path, image_name, using_fallback, output, blank=blank)
+    if blank:
+        return [BLANK_PAGE_MARKER]
+    return extract_pure_texts(standard_results)
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="跨图片批量识别文本行")
+    parser.add_argument("images", nargs="+", help="待识别的图片文件")
+    parser.add_argument("--output", default="output/batch_results", help="结果保存目录")
+    parser.add_argument("--rec-batch-size", type=int, default=DEFAULT_REC_BATCH_SIZE, help="识别批大小")
+    parser.add_argument("--group-size", type=int, default=DEFAULT_IMAGE_GROUP_SIZE, help="每组合并处理的图片数量")
+    parser.add_argument("--lang", default="ch", help="识别语言，如 ch、en、japan")
+    parser.add_argument("--keep-blank", action="store_true", help="不跳过空白页，全部送入模型识别")
+    args = parser.parse_args()
+
+    results = ocr_images_batched(args.images, output_dir=args.output, rec_batch_size=args.rec_batch_size,
+                                 image_group_size=args.group_size, print_result=False,
+                                 pipeline_config={'lang': args.lang}, skip_blank=not args.keep_blank)
+    failed = [path for path, result in results.items() if isinstance(result, Exception)]
+    blank_stats = blank_filter.get_blank_page_stats()
+    print(f"处理完成: 成功 {len(results) - len(failed)} 张, 失败 {len(failed)} 张, "
+          f"跳过空白页 {blank_stats['skipped']} 张")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批处理成本估计与调度模块
+只读取图片文件头（尺寸、格式、帧数）而不解码像素，估计每个文件的识别成本，
+按成本从大到小（LPT，最长处理时间优先）分配给工作进程，避免几张超大扫描件排在最后拖长整批耗时；
+进度条和剩余时间也按成本加权计算，而不是按文件个数。
+
+用法:
+    python batch_scheduler.py 图片目录 --workers 4
+"""
+
+import os
+import sys
+import time
+import heapq
+import argparse
+
+from PIL import Image
+
+# 不同格式的解码成本系数（相对JPEG）
+FORMAT_COST_FACTORS = {
+    'JPEG': 1.0,
+    'PNG': 1.3,
+    'TIFF': 1.4,
+    'BMP': 0.9,
+    'WEBP': 1.2,
+    'GIF': 1.1,
+}
+# 未知格式的成本系数
+DEFAULT_FORMAT_FACTOR = 1.2
+# 每个文件的固定开销，折算为百万像素（模型调用、结果保存等）
+FILE_OVERHEAD_MEGAPIXELS = 0.5
+# 是否按帧数计算成本；当前识别流程只读取多帧图片的第一帧
+COUNT_ALL_FRAMES = False
+
+# 支持的图片格式
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff', '.webp', '.gif')
+
+
+def probe_image(path):
+    """
+    只读取文件头获取图片信息，不解码像素数据
+
+    返回:
+        {'path', 'width', 'height', 'format', 'frames', 'file_size', 'error'}
+    """
+    info = {'path': path, 'width': 0, 'height': 0, 'format': None, 'frames': 1, 'file_size': 0, 'error': None}
+    try:
+        info['file_size'] = os.path.getsize(path)
+        # Image.open是惰性的，只解析文件头，像素数据在load()时才解码
+        with Image.open(path) as img:
+            info['width'], info['height'] = img.size
+            info['format'] = img.format
+            info['frames'] = max(1, int(getattr(img, 'n_frames', 1)))
+    except Exception as e:
+        info['error'] = str(e)
+    return info
+
+
+def estimate_cost(info, count_all_frames=None):
+    """
+    估计单个文件的识别成本（单位：折算后的百万像素）
+
+    参数:
+        info: probe_image的返回值
+        count_all_frames: 是否按全部帧计算，为None时使用 COUNT_ALL_FRAMES
+    """
+    if count_all_frames is None:
+        count_all_frames = COUNT_ALL_FRAMES
+    megapixels = info['width'] * info['height'] / 1e6
+    factor = FORMAT_COST_FACTORS.get(info['format'] or '', DEFAULT_FORMAT_FACTOR)
+    frames = info['frames'] if count_all_frames else 1
+    return (FILE_OVERHEAD_MEGAPIXELS + megapixels * factor) * frames
+
+
+def plan_batch(paths, count_all_frames=None, longest_first=True):
+    """
+    探测并估计一批文件的成本
+
+    参数:
+        longest_first: 是否按成本从大到小排序；只有一个工作进程（或逐个串行提交）时重排不会缩短总耗时，
+                       应保持原有顺序，成本只用于进度和剩余时间估计
+
+    返回:
+        [(原始序号, 路径, 成本), ...]，排序时成本相同的文件保持原有顺序
+    """
+    plan = []
+    for index, path in enumerate(paths):
+        plan.append((index, path, estimate_cost(probe_image(path), count_all_frames)))
+    if longest_first:
+        plan.sort(key=lambda item: (-item[2], item[0]))
+    return plan
+
+
+def schedule_lpt(costs, num_workers):
+    """
+    LPT静态调度：按成本从大到小，每次分配给当前负载最小的工作进程
+
+    参数:
+        costs: 每个任务的成本列表
+        num_workers: 工作进程数量
+
+    返回:
+        (每个工作进程分到的任务序号列表, 每个工作进程的总成本)
+    """
+    num_workers = max(1, int(num_workers))
+    assignments = [[] for _ in range(num_workers)]
+    loads = [0.0] * num_workers
+    heap = [(0.0, worker) for worker in range(num_workers)]
+    for index in sorted(range(len(costs)), key=lambda i: (-costs[i], i)):
+        load, worker = heapq.heappop(heap)
+        assignments[worker].append(index)
+        loads[worker] = load + costs[index]
+        heapq.heappush(heap, (loads[worker], worker))
+    return assignments, loads
+
+
+def simulate_makespan(costs, num_workers):
+    """按给定顺序把任务交给最先空闲的工作进程，返回总耗时（成本单位），用于比较不同顺序"""
+    heap = [0.0] * max(1, int(num_workers))
+    for cost in costs:
+        heapq.heapreplace(heap, heap[0] + cost)
+    return max(heap)
+
+
+class CostProgress:
+    """
+    按成本加权的进度和剩余时间估计
+
+    参数:
+        total_cost: 整批的总成本
+    """
+
+    def __init__(self, total_cost):
+        self.total_cost = float(total_cost)
+        self.done_cost = 0.0
+        self.start_time = time.time()
+
+    def complete(self, cost):
+        """记录一个文件完成（无论成功与否）"""
+        self.done_cost += cost
+
+    @property
+    def fraction(self):
+        """已完成的成本比例"""
+        if self.total_cost <= 0:
+            return 1.0
+        return min(1.0, self.done_cost / self.total_cost)
+
+    def eta(self):
+        """按已完成部分的实际速度估计剩余秒数，尚无完成的文件时返回None"""
+        if self.done_cost <= 0:
+            return None
+        elapsed = time.time() - self.start_time
+        return elapsed / self.done_cost * max(0.0, self.total_cost - self.done_cost)
+
+
+def format_eta(seconds):
+    """格式化剩余时间"""
+    if seconds is None:
+        return "剩余时间估算中"
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return f"剩余约 {seconds // 3600}小时{seconds % 3600 // 60:02d}分"
+    if seconds >= 60:
+        return f"剩余约 {seconds // 60}分{seconds % 60:02d}秒"
+    return f"剩余约 {seconds}秒"
+
+
+def _collect_images(inputs):
+    """展开命令行输入中的目录"""
+    paths = []
+    for path in inputs:
+        if os.path.isdir(path):
+            for file in sorted(os.listdir(path)):
+                if file.lower().endswith(IMAGE_EXTENSIONS):
+                    paths.append(os.path.join(path, file))
+        else:
+            paths.append(path)
+    return paths
+
+
+def main():
+    """命令行入口：打印成本估计和调度结果"""
+    parser = argparse.ArgumentParser(description="只读文件头估计识别成本，并按最长优先分配给工作进程")
+    parser.add_argument("images", nargs="+", help="图片文件或目录")
+    parser.add_argument("--workers", type=int, default=1, help="工作进程数量")
+    parser.add_argument("--all-frames", action="store_true", help="多帧图片按全部帧计算成本")
+    args = parser.parse_args()
+
+    paths = _collect_images(args.images)
+    if not paths:
+        print("没有找到图片文件")
+        sys.exit(1)
+
+    start = time.time()
+    infos = [probe_image(path) for path in paths]
+    costs = [estimate_cost(info, args.all_frames) for info in infos]
+    print(f"探测 {len(paths)} 个文件耗时 {time.time() - start:.3f} 秒")
+
+    for info, cost in sorted(zip(infos, costs), key=lambda item: -item[1]):
+        detail = info['error'] or f"{info['width']}x{info['height']} {info['format']} {info['frames']}帧"
+        print(f"{cost:>8.2f}  {os.path.basename(info['path'])}  ({detail})")
+
+    assignments, loads = schedule_lpt(costs, args.workers)
+    for worker, (indices, load) in enumerate(zip(assignments, loads)):
+        print(f"工作进程 {worker}: {len(indices)} 个文件, 成本 {load:.2f}")
+    ordered = sorted(costs, reverse=True)
+    print(f"预计总耗时（成本单位）: 原顺序 {simulate_makespan(costs, args.workers):.2f}, "
+          f"最长优先 {simulate_makespan(ordered, args.workers):.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+速度/准确率端到端评测工具
+使用本地字体渲染已知内容的合成文档（正文、表格、倒置和轻微倾斜的页面），
+在多组配置下经过 ocr_image 以及GUI的版面排序和表格格式化流程，
+并排输出字符错误率、表格结构准确率、延迟分位数和吞吐量，结果保存为JSON并打印汇总表。
+全程离线在CPU上运行（需要模型已下载到本地）。
+
+用法:
+    python benchmark_harness.py --docs 12 --output output/benchmark
+    python benchmark_harness.py --configs my_configs.json
+
+配置文件格式（JSON列表）:
+    [
+        {"name": "基线", "pipeline_config": {"use_angle_cls": true}, "scale": 1.0, "line_threshold": 15},
+        {"name": "关闭方向分类", "pipeline_config": {"use_angle_cls": false}}
+    ]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import traceback
+
+from PIL import Image, ImageDraw, ImageFont
+
+from autotune import percentile
+
+# 默认评测配置：每项改动都与基线对比
+DEFAULT_CONFIGS = [
+    {'name': '基线', 'pipeline_config': {'use_angle_cls': True}, 'scale': 1.0, 'line_threshold': 15},
+    {'name': '关闭方向分类', 'pipeline_config': {'use_angle_cls': False}, 'scale': 1.0, 'line_threshold': 15},
+    {'name': '输入缩放0.75', 'pipeline_config': {'use_angle_cls': True}, 'scale': 0.75, 'line_threshold': 15},
+    {'name': '行阈值10', 'pipeline_config': {'use_angle_cls': True}, 'scale': 1.0, 'line_threshold': 10},
+]
+
+# 合成文档类型
+DOC_KINDS = ('text', 'table', 'rotated', 'skewed')
+# rotated类型文档的旋转角度（逆时针）
+ROTATION_ANGLES = (90, 180, 270)
+
+# 常见系统字体目录和优先使用的字体文件（含中文字体的排在前面）
+FONT_DIRS = [
+    r"C:\Windows\Fonts",
+    "/usr/share/fonts",
+    "/usr/local/share/fonts",
+    os.path.expanduser("~/.fonts"),
+    os.path.expanduser("~/.local/share/fonts"),
+    "/System/Library/Fonts",
+    "/Library/Fonts",
+]
+CJK_FONT_NAMES = ('msyh', 'simhei', 'simsun', 'notosanscjk', 'notoserifcjk', 'sourcehansans',
+                  'wqy', 'pingfang', 'droidsansfallback', 'arialuni')
+LATIN_FONT_NAMES = ('dejavusans', 'arial', 'liberationsans', 'helvetica', 'lato', 'sourcecodepro')
+
+# 合成文本素材
+CJK_PHRASES = [
+    "发票代码", "开票日期", "购买方名称", "纳税人识别号", "货物或应税劳务名称", "规格型号",
+    "单位", "数量", "单价", "金额", "税率", "税额", "价税合计", "销售方", "收款人", "复核",
+    "本季度营业收入同比增长", "研发投入持续增加", "请于收到通知后五个工作日内回复",
+    "会议纪要", "项目进度", "合同编号", "联系电话", "备注",
+]
+LATIN_PHRASES = [
+    "Invoice number", "Date of issue", "Customer name", "Tax ID", "Description", "Quantity",
+    "Unit price", "Amount", "Total due", "Payment terms", "Quarterly revenue grew steadily",
+    "Please reply within five working days", "Meeting notes", "Project status", "Contract No",
+]
+
+
+def find_local_fonts():
+    """
+    查找本地字体文件
+
+    返回:
+        (中文字体路径或None, 西文字体路径或None)
+    """
+    cjk_font = None
+    latin_font = None
+    for font_dir in FONT_DIRS:
+        if not os.path.isdir(font_dir):
+            continue
+        for root_dir, _, files in os.walk(font_dir):
+            for file in sorted(files):
+                if os.path.splitext(file)[1].lower() not in ('.ttf', '.ttc', '.otf'):
+                    continue
+                key = file.lower().replace('-', '').replace('_', '')
+                path = os.path.join(root_dir, file)
+                if cjk_font is None and any(key.startswith(name) for name in CJK_FONT_NAMES):
+                    cjk_font = path
+                if latin_font is None and any(key.startswith(name) for name in LATIN_FONT_NAMES):
+                    latin_font = path
+            if cjk_font and latin_font:
+                return cjk_font, latin_font
+    return cjk_font, latin_font
+
+
+def load_font(path, size):
+    """加载字体，没有可用字体文件时使用Pillow内置字体"""
+    if path:
+        try:
+            return ImageFont.truetype(path, size)
+        except Exception as e:
+            print(f"加载字体失败 {path}: {str(e)}")
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        # Pillow 10.1之前的内置字体不支持指定字号，只能使用固定大小的位图字体
+        print(f"当前Pillow版本的内置字体不支持指定字号({size})，改用固定大小的位图字体，建议在系统中安装中文和西文字体")
+        return ImageFont.load_default()
+
+
+def _random_line(rng, phrases, digits=True):
+    """随机组合一行文本"""
+    words = rng.sample(phrases, rng.randint(1, 3))
+    if digits and rng.random() < 0.5:
+        words.append(str(rng.randint(10, 99999)))
+    return ' '.join(words)
+
+
+def render_document(kind, rng, font_path, phrases, page_size=(1240, 1754), font_size=32):
+    """
+    渲染一张合成文档
+
+    参数:
+        kind: 文档类型，text/table/rotated/skewed
+        rng: random.Random实例
+        font_path: 字体文件路径
+        phrases: 文本素材列表
+
+    返回:
+        (图片, 真值字典 {'kind', 'lines': [文本行], 'table': [[单元格]] 或 None, 'rotation': 逆时针旋转角度})
+    """
+    width, height = page_size
+    img = Image.new('RGB', page_size, 'white')
+    draw = ImageDraw.Draw(img)
+    font = load_font(font_path, font_size)
+    margin = 80
+    line_gap = int(font_size * 1.8)
+
+    truth = {'kind': kind, 'lines': [], 'table': None, 'rotation': 0}
+    y = margin
+    if kind == 'table':
+        title = _random_line(rng, phrases, digits=False)
+        draw.text((margin, y), title, fill='black', font=font)
+        truth['lines'].append(title)
+        y += line_gap * 2
+
+        rows, cols = rng.randint(3, 6), rng.randint(2, 4)
+        cell_width = (width - 2 * margin) // cols
+        cell_height = int(font_size * 2.2)
+        table = []
+        for r in range(rows):
+            row = []
+            for c in range(cols):
+                text = rng.choice(phrases) if r == 0 or c == 0 else str(rng.randint(1, 9999))
+                # 单元格文本需放得下
+                while draw.textlength(text, font=font) > cell_width - 20 and len(text) > 1:
+                    text = text[:-1]
+                x0 = margin + c * cell_width
+                y0 = y + r * cell_height
+                draw.rectangle([x0, y0, x0 + cell_width, y0 + cell_height], outline='black', width=2)
+                draw.text((x0 + 10, y0 + (cell_height - font_size) // 2), text, fill='black', font=font)
+                row.append(text)
+            table.append(row)
+            truth['lines'].append(' '.join(row))
+        truth['table'] = table
+        return img, truth
+
+    while y + line_gap < height - margin:
+        text = _random_line(rng, phrases)
+        while draw.textlength(text, font=font) > width - 2 * margin and len(text) > 1:
+            text = text[:-1]
+        draw.text((margin, y), text, fill='black', font=font)
+        truth['lines'].append(text)
+        y += line_gap
+        if len(truth['lines']) >= 18:
+            break
+
+    if kind == 'rotated':
+        # 覆盖整页方向检测的三种情况：90°/270°需要识别竖排文字方向，180°为倒置
+        truth['rotation'] = rng.choice(ROTATION_ANGLES)
+        img = img.rotate(truth['rotation'], expand=True)
+    elif kind == 'skewed':
+        img = img.rotate(rng.uniform(-3, 3), resample=Image.BICUBIC, expand=False, fillcolor='white')
+    return img, truth
+
+
+def generate_documents(count, output_dir, seed=0):
+    """
+    生成合成文档并保存为PNG
+
+    返回:
+        [{'path', 'kind', 'lines', 'table', 'rotation'}, ...]，以及使用的字体信息
+    """
+    rng = random.Random(seed)
+    cjk_font, latin_font = find_local_fonts()
+    if cjk_font:
+        font_path, phrases = cjk_font, CJK_PHRASES + LATIN_PHRASES
+    else:
+        # 没有中文字体时只渲染西文，避免出现无法显示的方块字
+        print("未找到本地中文字体，使用西文文本生成合成文档")
+        font_path, phrases = latin_font, LATIN_PHRASES
+
+    os.makedirs(output_dir, exist_ok=True)
+    documents = []
+    for idx in range(count):
+        kind = DOC_KINDS[idx % len(DOC_KINDS)]
+        img, truth = render_document(kind, rng, font_path, phrases)
+        path = os.path.join(output_dir, f"synthetic_{idx:03d}_{kind}.png")
+        img.save(path)
+        truth['path'] = path
+        documents.append(truth)
+    return documents, {'font': font_path or 'Pillow内置字体'}
+
+
+def levenshtein(a, b):
+    """编辑距离"""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+def _normalize(text):
+    """去掉空白和表格边框字符后再比较"""
+    return ''.join(ch for ch in text if not ch.isspace() and ch not in '|+-')
+
+
+def character_error_rate(reference, hypothesis):
+    """字符错误率 = 编辑距离 / 参考文本长度"""
+    reference = _normalize(reference)
+    hypothesis = _normalize(hypothesis)
+    if not reference:
+        return 0.0 if not hypothesis else 1.0
+    return levenshtein(reference, hypothesis) / float(len(reference))
+
+
+def _make_layout_helper(line_threshold):
+    """不创建窗口，直接复用OCRGUI的版面排序和表格格式化方法"""
+    from ocr_gui import OCRGUI
+    helper = OCRGUI.__new__(OCRGUI)
+    helper.line_threshold = line_threshold
+    return helper
+
+
+def score_table(helper, line_groups, truth_table):
+    """
+    比较识别出的表格结构与真值
+
+    返回:
+        {'detected': 是否检测为表格, 'structure_match': 行列数是否一致, 'cell_accuracy': 单元格文本准确率}
+    """
+    is_table, table_lines, column_positions = helper.detect_table_structure(line_groups)
+    if not is_table:
+        return {'detected': False, 'structure_match': False, 'cell_accuracy': 0.0}
+
+    # 表格行取包含多个文本块的行，与真值逐行逐列比较
+    rows = [sorted(line, key=helper.get_text_block_left_x) for line in table_lines if len(line) > 1]
+    rows = rows[-len(truth_table):] if len(rows) > len(truth_table) else rows
+    structure_match = (len(rows) == len(truth_table)
+                       and all(len(row) == len(truth_row) for row, truth_row in zip(rows, truth_table)))
+    total = sum(len(row) for row in truth_table)
+    correct = 0
+    for row, truth_row in zip(rows, truth_table):
+        for block, truth_text in zip(row, truth_row):
+            if _normalize(block.get('text', '')) == _normalize(truth_text):
+                correct += 1
+    return {'detected': True, 'structure_match': structure_match, 'cell_accuracy': correct / float(total)}
+
+
+def _resize_for_config(path, scale, work_dir):
+    """按配置缩放输入图片"""
+    if scale == 1.0:
+        return path
+    os.makedirs(work_dir, exist_ok=True)
+    scaled_path = os.path.join(work_dir, os.path.basename(path))
+    with Image.open(path) as img:
+        size = (max(1, int(img.width * scale)), max(1, int(img.height * scale)))
+        img.resize(size, Image.LANCZOS).save(scaled_path)
+    return scaled_path
+
+
+def run_config(documents, config, output_dir):
+    """
+    在一组配置下评测全部合成文档
+
+    返回:
+        该配置的评测结果字典
+    """
+    from PaddleOCRVL_main import ocr_image
+
+    name = config.get('name', 'config')
+    pipeline_config = config.get('pipeline_config') or {}
+    scale = float(config.get('scale', 1.0))
+    helper = _make_layout_helper(config.get('line_threshold', 15))
+    config_dir = os.path.join(output_dir, 'runs', name)
+    inputs = [_resize_for_config(doc['path'], scale, os.path.join(config_dir, 'inputs')) for doc in documents]
+
+    # 预热：加载模型，不计入统计
+    ocr_image(inputs[0], output_dir=os.path.join(config_dir, 'warmup'), print_result=False,
+              pipeline_config=pipeline_config, return_details=True)
+
+    per_doc = []
+    latencies = []
+    start = time.time()
+    for doc, image_path in zip(documents, inputs):
+        entry = {'path': doc['path'], 'kind': doc['kind']}
+        try:
+            t0 = time.time()
+            details = ocr_image(image_path, output_dir=config_dir, print_result=False,
+                                pipeline_config=pipeline_config, return_details=True)
+            latency = time.time() - t0
+            latencies.append(latency)
+
+            line_groups = helper.group_text_by_lines(details['results'])
+            hypothesis = helper.format_lines_text(line_groups) if line_groups else ''
+            entry.update({
+                'latency': latency,
+                'cer': character_error_rate('\n'.join(doc['lines']), hypothesis),
+            })
+            if doc['table'] is not None:
+                entry['table'] = score_table(helper, line_groups, doc['table'])
+        except Exception as e:
+            traceback.print_exc()
+            entry['error'] = str(e)
+        per_doc.append(entry)
+    wall = time.time() - start
+
+    ok = [d for d in per_doc if 'error' not in d]
+    tables = [d['table'] for d in ok if 'table' in d]
+    by_kind = {}
+    for kind in DOC_KINDS:
+        values = [d['cer'] for d in ok if d['kind'] == kind]
+        if values:
+            by_kind[kind] = sum(values) / len(values)
+    return {
+        'name': name,
+        'config': config,
+        'documents': len(per_doc),
+        'errors': len(per_doc) - len(ok),
+        'cer': sum(d['cer'] for d in ok) / len(ok) if ok else None,
+        'cer_by_kind': by_kind,
+        'table_detection_rate': sum(t['detected'] for t in tables) / len(tables) if tables else None,
+        'table_structure_accuracy': sum(t['structure_match'] for t in tables) / len(tables) if tables else None,
+        'table_cell_accuracy': sum(t['cell_accuracy'] for t in tables) / len(tables) if tables else None,
+        'latency_p50': percentile(latencies, 50),
+        'latency_p90': percentile(latencies, 90),
+        'latency_p95': percentile(latencies, 95),
+        'latency_max': max(latencies) if latencies else 0.0,
+        'throughput': len(latencies) / wall if wall > 0 else 0.0,
+        'per_document': per_doc,
+    }
+
+
+def run_benchmark(configs=None, doc_count=12, output_dir="output/benchmark", seed=0):
+    """
+    生成合成文档并依次评测各组配置
+
+    返回:
+        评测报告字典，同时保存为 output_dir/benchmark_report.json
+    """
+    configs = configs or DEFAULT_CONFIGS
+    documents, font_info = generate_documents(doc_count, os.path.join(output_dir, 'documents'), seed)
+    print(f"已生成 {len(documents)} 张合成文档，字体: {font_info['font']}")
+
+    results = []
+    for config in configs:
+        print(f"评测配置: {config.get('name')} ...")
+        try:
+            results.append(run_config(documents, config, output_dir))
+        except Exception as e:
+            traceback.print_exc()
+            results.append({'name': config.get('name'), 'config': config, 'error': str(e)})
+
+    report = {
+        'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'documents': len(documents),
+        'seed': seed,
+        'font': font_info['font'],
+        'results': results,
+    }
+    report_path = os.path.join(output_dir, 'benchmark_report.json')
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"评测报告已保存到 {report_path}")
+    return report
+
+
+def _fmt(value, pattern):
+    """格式化可能为None的数值"""
+    return pattern.format(value) if value is not None else '-'
+
+
+def print_summary(report):
+    """打印各配置的对比汇总表"""
+    print("\n配置              CER     表格结构  单元格   p50(秒)  p95(秒)  吞吐量(张/秒)")
+    for r in report['results']:
+        if r.get('error'):
+            print(f"{r['name']:<16}  失败: {r['error']}")
+            continue
+        print(f"{r['name']:<16}  {_fmt(r['cer'], '{:.3f}'):>6}  {_fmt(r['table_structure_accuracy'], '{:.0%}'):>8}  "
+              f"{_fmt(r['table_cell_accuracy'], '{:.0%}'):>6}  {r['latency_p50']:>7.2f}  {r['latency_p95']:>7.2f}  "
+              f"{r['throughput']:>13.2f}")
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="使用合成文档评测不同配置的速度与准确率")
+    parser.add_argument("--docs", type=int, default=12, help="合成文档数量")
+    parser.add_argument("--configs", default=None, help="评测配置JSON文件，默认使用内置配置")
+    parser.add_argument("--output", default="output/benchmark", help="合成文档和评测结果保存目录")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    args = parser.parse_args()
+
+    configs = None
+    if args.configs:
+        with open(args.configs, 'r', encoding='utf-8') as f:
+            configs = json.load(f)
+
+    report = run_benchmark(configs, doc_count=max(1, args.docs), output_dir=args.output, seed=args.seed)
+    print_summary(report)
+    if all(r.get('error') for r in report['results']):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+空白页预过滤模块
+在缩小后的灰度图上统计与背景灰度差异明显的墨迹像素，快速判断页面是否不含文字，
+空白页直接跳过模型推理（双面扫描的空白背面等）
+"""
+
+import threading
+import numpy as np
+from PIL import Image
+
+# 是否默认启用空白页过滤
+SKIP_BLANK_PAGES = True
+# 判断前将图片长边缩小到不超过该尺寸
+BLANK_CHECK_SIZE = 1024
+# 忽略的页面边缘比例，避免扫描仪边框和阴影被当作内容
+BLANK_BORDER_RATIO = 0.03
+# 与背景灰度（中位数）相差超过该值的像素视为墨迹：浅色文字（如245背景上的185灰）约相差60，
+# 透印通常在30以内
+INK_CONTRAST = 35
+# 背景噪声较大时阈值提高到噪声标准差的该倍数，避免扫描噪声被当作墨迹
+NOISE_FACTOR = 6.0
+# 缩小后的墨迹像素少于该数量时视为空白页
+MIN_INK_PIXELS = 8
+# 空白页在识别结果中的标记
+BLANK_PAGE_MARKER = "[空白页]"
+
+# 空白页统计
+_stats = {'checked': 0, 'skipped': 0}
+_stats_lock = threading.Lock()
+
+
+def _block_reduce(gray, factor):
+    """
+    按 factor x factor 分块做最小/最大值池化，细笔画在缩小后不会被平均掉
+
+    返回:
+        (最小值图, 最大值图)
+    """
+    if factor <= 1:
+        return gray, gray
+    height = gray.shape[0] // factor * factor
+    width = gray.shape[1] // factor * factor
+    gray = gray[:height, :width]
+    darkest = gray[0::factor, 0::factor].copy()
+    brightest = darkest.copy()
+    # 逐个偏移取跨步切片比在reshape后的小轴上归约快得多
+    for dy in range(factor):
+        for dx in range(factor):
+            if dy == 0 and dx == 0:
+                continue
+            block = gray[dy::factor, dx::factor]
+            np.minimum(darkest, block, out=darkest)
+            np.maximum(brightest, block, out=brightest)
+    return darkest, brightest
+
+
+def estimate_noise(gray):
+    """用中位数绝对偏差估计灰度噪声的标准差，文字像素只占少数时不受其影响"""
+    sample = gray[::4, ::4].astype(np.int16)
+    if sample.size == 0:
+        return 0.0
+    return 1.4826 * float(np.median(np.abs(sample - np.median(sample))))
+
+
+def ink_threshold(gray, ink_contrast=INK_CONTRAST, noise_factor=NOISE_FACTOR):
+    """
+    按背景噪声自适应的墨迹阈值：不低于ink_contrast，噪声较大时取噪声标准差的noise_factor倍
+
+    返回:
+        (阈值, 噪声标准差)
+    """
+    noise = estimate_noise(gray)
+    return max(float(ink_contrast), noise_factor * noise), noise
+
+
+def compute_blank_metrics(img_array, check_size=BLANK_CHECK_SIZE, border_ratio=BLANK_BORDER_RATIO,
+                          ink_contrast=INK_CONTRAST):
+    """
+    计算空白页判断所需的指标
+
+    返回:
+        {'background': 背景灰度, 'std': 灰度标准差, 'noise': 噪声标准差, 'ink_threshold': 墨迹阈值,
+         'ink_pixels': 墨迹像素数, 'ink_ratio': 墨迹像素占比}
+    """
+    img = Image.fromarray(img_array)
+    if img.mode != 'L':
+        img = img.convert('L')
+    gray = np.asarray(img)
+
+    # 去掉边缘区域
+    border_y = int(gray.shape[0] * border_ratio)
+    border_x = int(gray.shape[1] * border_ratio)
+    if gray.shape[0] > 2 * border_y + 2 and gray.shape[1] > 2 * border_x + 2:
+        gray = gray[border_y:gray.shape[0] - border_y, border_x:gray.shape[1] - border_x]
+
+    if gray.size == 0:
+        return {'background': 0.0, 'std': 0.0, 'noise': 0.0, 'ink_threshold': float(ink_contrast),
+                'ink_pixels': 0, 'ink_ratio': 0.0}
+
+    threshold, noise = ink_threshold(gray, ink_contrast)
+
+    factor = int(np.ceil(max(gray.shape) / float(check_size)))
+    darkest, brightest = _block_reduce(gray, factor)
+    darkest = darkest.astype(np.int16)
+    brightest = brightest.astype(np.int16)
+    # 最小/最大值池化会把噪声背景分别拉暗/拉亮，各自与池化后的背景比较
+    dark_background = float(np.median(darkest[::4, ::4]))
+    light_background = float(np.median(brightest[::4, ::4]))
+    background = (dark_background + light_background) / 2
+
+    # 深色背景上的浅色文字同样计为墨迹
+    ink = (darkest < dark_background - threshold) | (brightest > light_background + threshold)
+    ink_pixels = int(ink.sum())
+    return {
+        'background': background,
+        'std': float(darkest.std()),
+        'noise': noise,
+        'ink_threshold': threshold,
+        'ink_pixels': ink_pixels,
+        'ink_ratio': ink_pixels / float(ink.size),
+    }
+
+
+def is_blank_page(img_array, min_ink_pixels=MIN_INK_PIXELS, ink_contrast=INK_CONTRAST):
+    """
+    判断图片是否为空白页，同时更新统计计数
+
+    返回:
+        (是否空白, 指标字典)
+    """
+    metrics = compute_blank_metrics(img_array, ink_contrast=ink_contrast)
+    blank = metrics['ink_pixels'] < min_ink_pixels
+    with _stats_lock:
+        _stats['checked'] += 1
+        if blank:
+            _stats['skipped'] += 1
+    return blank, metrics
+
+
+def get_blank_page_stats():
+    """返回空白页统计 {'checked': 检查页数, 'skipped': 跳过页数}"""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_blank_page_stats():
+    """清零空白页统计"""
+    with _stats_lock:
+        _stats['checked'] = 0
+        _stats['skipped'] = 0
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+热文件夹监控模块
+持续监控扫描仪输出目录，文件写入完成后立即使用常驻的OCR模型识别，
+识别完成的文件移动到 _done 子目录，失败的文件移动到 _failed 子目录
+
+优先使用 watchdog 的系统文件事件（Linux下为inotify），未安装时自动回退为轮询
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import threading
+import traceback
+
+from PaddleOCRVL_main import get_pipeline, ocr_image
+
+# 支持的图片扩展名，与GUI保持一致
+SUPPORTED_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.tif', '.webp', '.gif'}
+# 已完成和失败文件的子目录名
+DONE_DIR_NAME = "_done"
+FAILED_DIR_NAME = "_failed"
+# 文件保持不变但始终无法读取超过该秒数时，仍交给识别流程处理（随后会被移入失败目录）
+UNREADABLE_TIMEOUT = 30.0
+
+
+class FolderWatcher:
+    """
+    热文件夹监控器
+
+    参数:
+        watch_dir: 监控目录
+        output_dir: 识别结果保存目录
+        done_dir: 识别成功的文件移动到的目录，默认 watch_dir/_done
+        failed_dir: 识别失败的文件移动到的目录，默认 watch_dir/_failed
+        poll_interval: 轮询间隔（秒），使用文件事件时作为兜底检查间隔
+        settle_time: 文件大小和修改时间保持不变多少秒后视为写入完成
+        pipeline_config: pipeline配置字典，为None时使用默认配置
+        use_events: 是否尝试使用系统文件事件
+    """
+
+    def __init__(self, watch_dir, output_dir="output/watch_results", done_dir=None, failed_dir=None,
+                 poll_interval=1.0, settle_time=1.0, pipeline_config=None, use_events=True):
+        self.watch_dir = os.path.abspath(watch_dir)
+        self.output_dir = output_dir
+        self.done_dir = done_dir or os.path.join(self.watch_dir, DONE_DIR_NAME)
+        self.failed_dir = failed_dir or os.path.join(self.watch_dir, FAILED_DIR_NAME)
+        self.poll_interval = poll_interval
+        self.settle_time = settle_time
+        self.pipeline_config = pipeline_config
+        self.use_events = use_events
+
+        # 路径 -> (文件大小, 修改时间, 状态首次稳定的时间)
+        self._pending = {}
+        # 路径 -> 文件到达时间，用于计算延迟；来自文件事件时间或文件本身的时间戳，而不是扫描发现的时间
+        self._arrivals = {}
+        self._arrivals_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._observer = None
+
+        # 统计信息
+        self.processed = 0
+        self.failed = 0
+        self.latencies = []
+
+    def _is_candidate(self, path):
+        """判断路径是否为待处理的图片文件"""
+        name = os.path.basename(path)
+        if name.startswith('.') or name.startswith('~'):
+            return False
+        if os.path.dirname(os.path.abspath(path)) != self.watch_dir:
+            return False
+        return os.path.splitext(name)[1].lower() in SUPPORTED_EXTENSIONS
+
+    def _start_event_observer(self):
+        """启动系统文件事件监听，失败时返回False"""
+        try:
+            from watchdog.observers import Observer
+            from watchdog.events import FileSystemEventHandler
+        except ImportError:
+            print("未安装watchdog，使用轮询方式监控文件夹")
+            return False
+
+        watcher = self
+
+        class _Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if not event.is_directory:
+                    now = time.time()
+                    with watcher._arrivals_lock:
+                        for path in (event.src_path, getattr(event, 'dest_path', None)):
+                            if path and watcher._is_candidate(path):
+                                watcher._arrivals.setdefault(os.path.abspath(path), now)
+                    watcher._wakeup.set()
+
+        try:
+            self._observer = Observer()
+            self._observer.schedule(_Handler(), self.watch_dir, recursive=False)
+            self._observer.start()
+            print(f"已启用文件事件监控: {self.watch_dir}")
+            return True
+        except Exception as e:
+            print(f"启用文件事件监控失败，使用轮询方式: {str(e)}")
+            self._observer = None
+            return False
+
+    def _scan(self):
+        """扫描监控目录，更新待处理文件的状态，返回已写入完成的文件列表"""
+        now = time.time()
+        seen = set()
+        ready = []
+        try:
+            entries = list(os.scandir(self.watch_dir))
+        except OSError as e:
+            print(f"读取监控目录失败: {str(e)}")
+            return ready
+
+        for entry in entries:
+            if not entry.is_file() or not self._is_candidate(entry.path):
+                continue
+            seen.add(entry.path)
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+
+            previous = self._pending.get(entry.path)
+            if previous is None:
+                self._record_arrival(entry.path, stat, now)
+            if previous is None or previous[0] != stat.st_size or previous[1] != stat.st_mtime:
+                # 新文件或仍在写入
+                self._pending[entry.path] = (stat.st_size, stat.st_mtime, now)
+                continue
+
+            stable_for = now - previous[2]
+            if stable_for < self.settle_time:
+                continue
+            if self._can_open(entry.path) or stable_for >= UNREADABLE_TIMEOUT:
+                ready.append(entry.path)
+
+        # 清理已被外部移走的文件
+        for path in list(self._pending):
+            if path not in seen:
+                del self._pending[path]
+                with self._arrivals_lock:
+                    self._arrivals.pop(path, None)
+
+        # 先到达的文件先处理
+        ready.sort(key=lambda p: self._pending[p][2])
+        return ready
+
+    def _record_arrival(self, path, stat, now):
+        """
+        记录文件到达时间：取文件事件时间、文件的ctime（POSIX下为写入/移入目录的时间，
+        Windows下为创建时间）和扫描发现时间中最早的一个。
+        不使用mtime，复制文件时mtime通常保留源文件的旧时间
+        """
+        with self._arrivals_lock:
+            candidates = [now, stat.st_ctime]
+            if path in self._arrivals:
+                candidates.append(self._arrivals[path])
+            self._arrivals[path] = min(candidates)
+
+    @staticmethod
+    def _can_open(path):
+        """检查文件是否可读且图片头完整（写入方仍占用文件时通常会失败）"""
+        try:
+            from PIL import Image
+            with Image.open(path) as img:
+                img.size
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _move(path, target_dir):
+        """移动文件到目标目录，重名时追加时间戳"""
+        os.makedirs(target_dir, exist_ok=True)
+        target = os.path.join(target_dir, os.path.basename(path))
+        if os.path.exists(target):
+            stem, ext = os.path.splitext(os.path.basename(path))
+            target = os.path.join(target_dir, f"{stem}_{time.strftime('%Y%m%d_%H%M%S')}{ext}")
+        shutil.move(path, target)
+        return target
+
+    def process_file(self, path):
+        """识别单个文件并移动到完成/失败目录"""
+        with self._arrivals_lock:
+            arrived = self._arrivals.get(path)
+        if arrived is None:
+            arrived = self._pending.get(path, (0, 0, time.time()))[2]
+        try:
+            ocr_image(path, output_dir=self.output_dir, print_result=True, pipeline_config=self.pipeline_config)
+            target = self._move(path, self.done_dir)
+            self.processed += 1
+            latency = time.time() - arrived
+            self.latencies.append(latency)
+            print(f"[完成] {os.path.basename(path)} -> {target}，延迟 {latency:.2f}秒")
+        except Exception as e:
+            self.failed += 1
+            print(f"[失败] {os.path.basename(path)}: {str(e)}")
+            traceback.print_exc()
+            try:
+                target = self._move(path, self.failed_dir)
+                with open(target + ".error.txt", 'w', encoding='utf-8') as f:
+                    f.write(f"错误: {str(e)}\n")
+            except Exception as move_error:
+                print(f"移动失败文件时出错: {str(move_error)}")
+        finally:
+            self._pending.pop(path, None)
+            with self._arrivals_lock:
+                self._arrivals.pop(path, None)
+
+    def run(self):
+        """持续监控并处理，直到调用stop()或收到中断"""
+        os.makedirs(self.watch_dir, exist_ok=True)
+        print(f"开始监控文件夹: {self.watch_dir}")
+
+        # 预先加载模型，保证第一个文件到达时无需等待模型初始化
+        get_pipeline(self.pipeline_config)
+
+        if self.use_events:
+            self._start_event_observer()
+
+        try:
+            while not self._stopped.is_set():
+                for path in self._scan():
+                    if self._stopped.is_set():
+                        break
+                    self.process_file(path)
+
+                # 仍有文件在写入时，按稳定时间缩短下一次检查间隔
+                timeout = self.poll_interval
+                if self._pending:
+                    timeout = min(timeout, max(0.1, self.settle_time / 2))
+                self._wakeup.wait(timeout)
+                self._wakeup.clear()
+        finally:
+            if self._observer is not None:
+                self._observer.stop()
+                self._observer.join()
+            print(f"停止监控: 成功 {self.processed} 个, 失败 {self.failed} 个")
+
+    def stop(self):
+        """停止监控"""
+        self._stopped.set()
+        self._wakeup.set()
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="监控文件夹并持续识别新到达的图片")
+    parser.add_argument("watch_dir", help="监控目录")
+    parser.add_argument("--output", default="output/watch_results", help="结果保存目录")
+    parser.add_argument("--done-dir", default=None, help="识别成功的文件移动到的目录")
+    parser.add_argument("--failed-dir", default=None, help="识别失败的文件移动到的目录")
+    parser.add_argument("--poll", type=float, default=1.0, help="轮询间隔（秒）")
+    parser.add_argument("--settle", type=float, default=1.0, help="文件保持不变多少秒后视为写入完成")
+    parser.add_argument("--lang", default="ch", help="识别语言，如 ch、en、japan")
+    parser.add_argument("--no-events", action="store_true", help="禁用文件事件，仅使用轮询")
+    args = parser.parse_args()
+
+    watcher = FolderWatcher(args.watch_dir, output_dir=args.output, done_dir=args.done_dir,
+                            failed_dir=args.failed_dir, poll_interval=args.poll, settle_time=args.settle,
+                            pipeline_config={'lang': args.lang}, use_events=not args.no_events)
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        watcher.stop()
+    except Exception as e:
+        print(f"文件夹监控异常退出: {str(e)}")
+        traceback.print_exc()
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+屏幕截图/视频帧流式识别模块
+每一帧先与上一帧做逐像素差分，按网格块找出发生变化的区域，
+只对变化区域重新执行文字检测和识别，其余位置沿用上一帧缓存的文本框，
+每一帧都输出完整的识别结果。基本静止的画面只需整页识别的一小部分计算量。
+
+用法:
+    python frame_stream.py 帧1.png 帧2.png ... --output output/frames
+    python frame_stream.py 截图目录 --lang ch
+"""
+
+import os
+import sys
+import argparse
+import threading
+import traceback
+
+import numpy as np
+
+from PaddleOCRVL_main import (
+    get_pipeline, is_using_fallback, decode_image_source, predict_array, parse_ocr_output,
+    save_ocr_results, extract_pure_texts, supports_staged_inference, detect_text_boxes,
+    crop_text_box, recognize_crops
+)
+from layout_order import block_bounds
+
+# 像素通道差超过该值视为发生变化（过滤压缩噪声和光标抗锯齿）
+DIFF_THRESHOLD = 24
+# 差分网格块边长（像素）
+TILE_SIZE = 32
+# 变化区域向外扩展的像素数，避免文字被区域边界截断
+REGION_MARGIN = 16
+# 变化区域面积超过整帧的该比例时直接整帧重新识别
+FULL_FRAME_RATIO = 0.5
+
+# 支持的帧图片格式
+FRAME_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff', '.webp')
+
+# 流式识别统计
+_stats = {'frames': 0, 'unchanged_frames': 0, 'full_frames': 0, 'partial_frames': 0,
+          'regions': 0, 'reused_boxes': 0, 'recognized_boxes': 0,
+          'pixels_total': 0, 'pixels_ocr': 0}
+_stats_lock = threading.Lock()
+
+
+def changed_tiles(previous, current, threshold=DIFF_THRESHOLD, tile_size=TILE_SIZE):
+    """
+    比较两帧并返回发生变化的网格块
+
+    返回:
+        bool数组，形状为 (行块数, 列块数)
+    """
+    diff = np.abs(current.astype(np.int16) - previous.astype(np.int16))
+    if diff.ndim == 3:
+        diff = diff.max(axis=2)
+    changed = diff > threshold
+
+    height, width = changed.shape
+    rows = -(-height // tile_size)
+    cols = -(-width // tile_size)
+    padded = np.zeros((rows * tile_size, cols * tile_size), dtype=bool)
+    padded[:height, :width] = changed
+    return padded.reshape(rows, tile_size, cols, tile_size).any(axis=(1, 3))
+
+
+def _tile_regions(tiles, tile_size, shape):
+    """将相邻的变化网格块合并为矩形区域，返回 [(x0, y0, x1, y1), ...]"""
+    height, width = shape[:2]
+    visited = np.zeros_like(tiles)
+    regions = []
+    for r, c in zip(*np.nonzero(tiles)):
+        if visited[r, c]:
+            continue
+        # 广度优先搜索连通的网格块（8邻域）
+        stack = [(r, c)]
+        visited[r, c] = True
+        r0, r1, c0, c1 = r, r, c, c
+        while stack:
+            y, x = stack.pop()
+            r0, r1, c0, c1 = min(r0, y), max(r1, y), min(c0, x), max(c1, x)
+            for ny in (y - 1, y, y + 1):
+                for nx in (x - 1, x, x + 1):
+                    if (0 <= ny < tiles.shape[0] and 0 <= nx < tiles.shape[1]
+                            and tiles[ny, nx] and not visited[ny, nx]):
+                        visited[ny, nx] = True
+                        stack.append((ny, nx))
+        regions.append((int(c0) * tile_size, int(r0) * tile_size,
+                        min(width, (int(c1) + 1) * tile_size), min(height, (int(r1) + 1) * tile_size)))
+    return regions
+
+
+def _intersects(a, b):
+    """两个矩形是否相交"""
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+def _merge_regions(regions):
+    """合并相互重叠的矩形，直到没有重叠"""
+    regions = list(regions)
+    merged = True
+    while merged:
+        merged = False
+        result = []
+        for region in regions:
+            for idx, other in enumerate(result):
+                if _intersects(region, other):
+                    result[idx] = (min(region[0], other[0]), min(region[1], other[1]),
+                                   max(region[2], other[2]), max(region[3], other[3]))
+                    merged = True
+                    break
+            else:
+                result.append(region)
+        regions = result
+    return regions
+
+
+def _offset_position(position, dx, dy):
+    """将区域内的坐标平移回整帧坐标"""
+    if not dx and not dy:
+        return position
+    try:
+        points = np.asarray(position, dtype=np.float64)
+        if points.ndim == 2 and points.shape[1] >= 2:
+            points[:, 0] += dx
+            points[:, 1] += dy
+            return points.tolist()
+        if points.ndim == 1 and points.size >= 4 and points.size % 2 == 0:
+            points[0::2] += dx
+            points[1::2] += dy
+            return points.tolist()
+    except (TypeError, ValueError):
+        pass
+    return position
+
+
+def recognize_region(pipeline, img_array, region, using_fallback, use_cls=True, pad=REGION_MARGIN):
+    """
+    对帧中的一个矩形区域执行检测和识别
+
+    参数:
+        pad: 检测时向外多取的像素数，避免贴边的文字漏检；只保留中心落在区域内的文本框
+
+    返回:
+        [{'text', 'score', 'position'}, ...]，坐标为整帧坐标
+    """
+    height, width = img_array.shape[:2]
+    x0, y0, x1, y1 = region
+    cx0, cy0 = max(0, x0 - pad), max(0, y0 - pad)
+    cx1, cy1 = min(width, x1 + pad), min(height, y1 + pad)
+    crop = np.ascontiguousarray(img_array[cy0:cy1, cx0:cx1])
+    if supports_staged_inference(pipeline):
+        boxes = detect_text_boxes(pipeline, crop)
+        crops = [crop_text_box(crop, box) for box in boxes]
+        rec_results = recognize_crops(pipeline, crops, cls=use_cls)
+        drop_score = getattr(pipeline, 'drop_score', 0.5)
+        items = [{'text': text, 'score': score, 'position': box}
+                 for box, (text, score) in zip(boxes, rec_results) if score >= drop_score]
+    else:
+        output = predict_array(pipeline, crop, using_fallback)
+        items = parse_ocr_output(output, using_fallback, print_result=False)
+
+    results = []
+    for item in items:
+        item['position'] = _offset_position(item.get('position'), cx0, cy0)
+        bx0, by0, bx1, by1 = block_bounds(item)
+        if (bx0, by0, bx1, by1) == (0.0, 0.0, 0.0, 0.0):
+            # 没有位置信息的结果无法判断归属，直接保留
+            results.append(item)
+            continue
+        center_x, center_y = (bx0 + bx1) / 2.0, (by0 + by1) / 2.0
+        if x0 <= center_x < x1 and y0 <= center_y < y1:
+            results.append(item)
+    return results
+
+
+def _sort_results(items):
+    """按从上到下、从左到右排序"""
+    return sorted(items, key=lambda item: (block_bounds(item)[1], block_bounds(item)[0]))
+
+
+class FrameStreamOCR:
+    """
+    有状态的帧流识别器，缓存上一帧图像和识别结果
+
+    参数:
+        pipeline_config: pipeline配置字典
+        threshold: 像素差分阈值
+        tile_size: 差分网格块边长
+        margin: 变化区域扩展像素数
+        full_frame_ratio: 变化面积超过该比例时整帧识别
+    """
+
+    def __init__(self, pipeline_config=None, threshold=DIFF_THRESHOLD, tile_size=TILE_SIZE,
+                 margin=REGION_MARGIN, full_frame_ratio=FULL_FRAME_RATIO):
+        self.pipeline_config = pipeline_config
+        self.threshold = threshold
+        self.tile_size = max(1, int(tile_size))
+        self.margin = max(0, int(margin))
+        self.full_frame_ratio = full_frame_ratio
+        self.reset()
+
+    def reset(self):
+        """清空缓存，下一帧将整帧识别"""
+        self._previous = None
+        self._results = []
+
+    def _changed_regions(self, img_array):
+        """计算需要重新识别的区域，返回None表示整帧识别"""
+        if self._previous is None or self._previous.shape != img_array.shape:
+            return None
+        tiles = changed_tiles(self._previous, img_array, self.threshold, self.tile_size)
+        if not tiles.any():
+            return []
+
+        height, width = img_array.shape[:2]
+        regions = [(max(0, x0 - self.margin), max(0, y0 - self.margin),
+                    min(width, x1 + self.margin), min(height, y1 + self.margin))
+                   for x0, y0, x1, y1 in _tile_regions(tiles, self.tile_size, img_array.shape)]
+
+        # 与变化区域相交的缓存文本框整体纳入区域，保证文本行被完整重新识别
+        cached = [block_bounds(item) for item in self._results]
+        if any(bounds == (0.0, 0.0, 0.0, 0.0) for bounds in cached):
+            # 缓存结果没有位置信息，无法局部更新
+            return None
+        changed = True
+        while changed:
+            regions = _merge_regions(regions)
+            changed = False
+            for idx, region in enumerate(regions):
+                for bounds in cached:
+                    if _intersects(region, bounds):
+                        grown = (max(0, min(region[0], int(bounds[0]))), max(0, min(region[1], int(bounds[1]))),
+                                 min(width, max(region[2], int(np.ceil(bounds[2])))),
+                                 min(height, max(region[3], int(np.ceil(bounds[3])))))
+                        if grown != region:
+                            region = grown
+                            changed = True
+                regions[idx] = region
+
+        area = sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in regions)
+        if area > self.full_frame_ratio * width * height:
+            return None
+        return regions
+
+    def process(self, frame):
+        """
+        识别一帧
+
+        参数:
+            frame: numpy数组、PIL.Image、编码后的图片数据或图片路径
+
+        返回:
+            {'results': 完整识别结果, 'texts': 纯文本列表, 'regions': 重新识别的区域,
+             'full': 是否整帧识别, 'reused': 沿用的文本框数, 'recognized': 新识别的文本框数}
+        """
+        img_array = decode_image_source(frame)
+        pipeline = get_pipeline(self.pipeline_config)
+        using_fallback = is_using_fallback()
+        use_cls = (self.pipeline_config or {}).get('use_angle_cls', True)
+        height, width = img_array.shape[:2]
+
+        regions = self._changed_regions(img_array)
+        full = regions is None
+        if full:
+            regions = [(0, 0, width, height)]
+            kept = []
+        else:
+            kept = [item for item in self._results
+                    if not any(_intersects(block_bounds(item), region) for region in regions)]
+
+        recognized = []
+        for region in regions:
+            recognized.extend(recognize_region(pipeline, img_array, region, using_fallback, use_cls,
+                                                self.margin))
+
+        results = _sort_results(kept + recognized)
+        # 保存副本：调用方（例如截图或视频解码循环）可能在下一帧复用同一个缓冲区
+        self._previous = img_array.copy()
+        self._results = results
+
+        ocr_pixels = sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in regions)
+        with _stats_lock:
+            _stats['frames'] += 1
+            if full:
+                _stats['full_frames'] += 1
+            elif regions:
+                _stats['partial_frames'] += 1
+            else:
+                _stats['unchanged_frames'] += 1
+            _stats['regions'] += 0 if full else len(regions)
+            _stats['reused_boxes'] += len(kept)
+            _stats['recognized_boxes'] += len(recognized)
+            _stats['pixels_total'] += width * height
+            _stats['pixels_ocr'] += ocr_pixels
+
+        return {
+            'results': results,
+            'texts': extract_pure_texts(results),
+            'regions': [] if full else regions,
+            'full': full,
+            'reused': len(kept),
+            'recognized': len(recognized),
+        }
+
+
+def ocr_frames(frames, pipeline_config=None, **options):
+    """
+    流式识别帧序列，每一帧产出一次完整的识别结果
+
+    参数:
+        frames: 帧的可迭代对象（numpy数组、PIL.Image、图片数据或路径）
+        pipeline_config: pipeline配置字典
+        options: 传给FrameStreamOCR的其他参数
+
+    产出:
+        (帧序号, FrameStreamOCR.process的返回字典)
+    """
+    stream = FrameStreamOCR(pipeline_config, **options)
+    for index, frame in enumerate(frames):
+        yield index, stream.process(frame)
+
+
+def get_frame_stream_stats():
+    """
+    返回流式识别统计
+    {'frames', 'unchanged_frames', 'full_frames', 'partial_frames', 'regions', 'reused_boxes',
+     'recognized_boxes', 'pixels_total', 'pixels_ocr', 'ocr_pixel_ratio': 实际识别像素占比}
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    stats['ocr_pixel_ratio'] = stats['pixels_ocr'] / float(stats['pixels_total']) if stats['pixels_total'] else 0.0
+    return stats
+
+
+def reset_frame_stream_stats():
+    """清零流式识别统计"""
+    with _stats_lock:
+        for key in _stats:
+            _stats[key] = 0
+
+
+def _collect_frames(inputs):
+    """展开命令行输入，目录按文件名排序"""
+    frames = []
+    for path in inputs:
+        if os.path.isdir(path):
+            for file in sorted(os.listdir(path)):
+                if file.lower().endswith(FRAME_EXTENSIONS):
+                    frames.append(os.path.join(path, file))
+        else:
+            frames.append(path)
+    return frames
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="对连续截图只识别发生变化的区域")
+    parser.add_argument("frames", nargs="+", help="按顺序排列的帧图片，或包含帧图片的目录")
+    parser.add_argument("--output", default=None, help="结果保存目录，不指定时只打印")
+    parser.add_argument("--threshold", type=int, default=DIFF_THRESHOLD, help="像素差分阈值")
+    parser.add_argument("--tile-size", type=int, default=TILE_SIZE, help="差分网格块边长")
+    parser.add_argument("--lang", default="ch", help="识别语言，如 ch、en、japan")
+    args = parser.parse_args()
+
+    frames = _collect_frames(args.frames)
+    if not frames:
+        print("没有找到帧图片")
+        sys.exit(1)
+
+    try:
+        for index, result in ocr_frames(frames, {'lang': args.lang}, threshold=args.threshold,
+                                        tile_size=args.tile_size):
+            name = os.path.splitext(os.path.basename(frames[index]))[0]
+            mode = "整帧" if result['full'] else f"{len(result['regions'])} 个变化区域"
+            print(f"{name}: {mode}，沿用 {result['reused']} 个文本框，新识别 {result['recognized']} 个")
+            if args.output:
+                save_path = os.path.join(args.output, name)
+                os.makedirs(save_path, exist_ok=True)
+                save_ocr_results(result['results'], save_path, name, is_using_fallback())
+            else:
+                for text in result['texts']:
+                    print(f"  {text}")
+    except Exception as e:
+        print(f"处理失败: {str(e)}")
+        traceback.print_exc()
+        sys.exit(1)
+
+    stats = get_frame_stream_stats()
+    print(f"处理完成: 共 {stats['frames']} 帧，整帧识别 {stats['full_frames']} 帧，"
+          f"局部识别 {stats['partial_frames']} 帧，无变化 {stats['unchanged_frames']} 帧")
+    print(f"实际识别像素占比 {stats['ocr_pixel_ratio']:.1%}")
+
+
+if __name__ == "__main__":
+    main()
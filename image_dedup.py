@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+近似重复图片检测模块
+基于感知哈希(dHash)和BK树，在调用OCR之前识别重复扫描的页面。
+同一模板的不同票据（只有明细和金额不同）哈希也非常接近，因此默认只标记疑似重复、照常识别；
+开启复用后，还需通过更高分辨率的逐块像素比对确认，才会复用已有结果
+"""
+
+import os
+import json
+import threading
+import numpy as np
+from PIL import Image, ImageFilter
+
+from PaddleOCRVL_main import ocr_image
+
+# 默认哈希边长，16x16 共256位；8x8 对版式相近的文档页区分度不足
+DEFAULT_HASH_SIZE = 16
+# 默认汉明距离阈值，小于等于该值视为疑似重复（同模板的不同票据实测距离可低至3~5）
+DEFAULT_HAMMING_THRESHOLD = 4
+# 是否默认复用疑似重复图片的识别结果；关闭时只标记重复来源，仍然重新识别
+REUSE_DUPLICATE_RESULTS = False
+# 像素比对前将图片长边缩放到该尺寸
+VERIFY_SIZE = 1024
+# 像素比对的分块边长
+VERIFY_TILE = 16
+# 模糊后灰度差超过该值的像素视为不同（容忍重新压缩和轻微错位）
+VERIFY_PIXEL_DIFF = 48
+# 任意分块中不同像素的比例超过该值即认为内容不同（一个数字的改动也会集中在少数分块中）
+VERIFY_MAX_TILE_RATIO = 0.01
+
+
+def compute_dhash(image_or_path, hash_size=DEFAULT_HASH_SIZE):
+    """
+    计算图片的差值哈希(dHash)
+
+    参数:
+        image_or_path: 图片路径或PIL.Image对象
+        hash_size: 哈希边长，结果位数为 hash_size * hash_size
+
+    返回:
+        整数形式的哈希值
+    """
+    if isinstance(image_or_path, Image.Image):
+        img = image_or_path
+    else:
+        img = Image.open(image_or_path)
+        # 对JPEG使用draft模式，解码时直接缩小，避免完整解码大图
+        try:
+            img.draft('L', (hash_size * 16, hash_size * 16))
+        except Exception:
+            pass
+
+    # 转为灰度并缩放到 (hash_size + 1) x hash_size
+    # 使用BOX滤波缩放，对压缩噪声不敏感
+    small = img.convert('L').resize((hash_size + 1, hash_size), Image.BOX)
+    pixels = list(small.tobytes())
+
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            # 左侧像素比右侧亮则记为1
+            value = (value << 1) | (1 if pixels[offset + col] > pixels[offset + col + 1] else 0)
+    return value
+
+
+def hamming_distance(hash_a, hash_b):
+    """计算两个哈希值之间的汉明距离"""
+    return bin(hash_a ^ hash_b).count('1')
+
+
+def _verify_array(image_or_path, size):
+    """缩放到统一尺寸并轻微模糊后的灰度数组"""
+    img = image_or_path if isinstance(image_or_path, Image.Image) else Image.open(image_or_path)
+    return np.asarray(img.convert('L').resize(size, Image.BILINEAR).filter(ImageFilter.GaussianBlur(1)),
+                      dtype=np.int16)
+
+
+def confirm_duplicate(image_a, image_b, verify_size=VERIFY_SIZE):
+    """
+    逐块像素比对，确认两张哈希相近的图片内容确实相同
+
+    参数:
+        image_a, image_b: 图片路径或PIL.Image对象
+
+    返回:
+        (是否相同, 差异最大分块中不同像素的比例)
+    """
+    try:
+        img_a = image_a if isinstance(image_a, Image.Image) else Image.open(image_a)
+        img_b = image_b if isinstance(image_b, Image.Image) else Image.open(image_b)
+        ratio_a = img_a.size[0] / float(img_a.size[1])
+        ratio_b = img_b.size[0] / float(img_b.size[1])
+        if abs(ratio_a - ratio_b) > 0.02 * max(ratio_a, ratio_b):
+            return False, 1.0
+        scale = verify_size / float(max(img_a.size))
+        size = (max(VERIFY_TILE, int(round(img_a.size[0] * scale))), max(VERIFY_TILE, int(round(img_a.size[1] * scale))))
+        diff = np.abs(_verify_array(img_a, size) - _verify_array(img_b, size)) > VERIFY_PIXEL_DIFF
+    except Exception as e:
+        print(f"像素比对失败: {str(e)}")
+        return False, 1.0
+
+    height = diff.shape[0] // VERIFY_TILE * VERIFY_TILE
+    width = diff.shape[1] // VERIFY_TILE * VERIFY_TILE
+    tiles = diff[:height, :width].reshape(height // VERIFY_TILE, VERIFY_TILE, width // VERIFY_TILE, VERIFY_TILE)
+    worst = float(tiles.mean(axis=(1, 3)).max()) if tiles.size else 0.0
+    return worst <= VERIFY_MAX_TILE_RATIO, worst
+
+
+class BKTree:
+    """
+    基于汉明距离的BK树
+    支持在给定距离阈值内查找近邻哈希
+    """
+
+    def __init__(self):
+        # 节点格式: [哈希值, 关联数据, {距离: 子节点}]
+        self.root = None
+        self.size = 0
+
+    def add(self, hash_value, item):
+        """插入一个哈希值及其关联数据"""
+        node = [hash_value, item, {}]
+        self.size += 1
+        if self.root is None:
+            self.root = node
+            return
+
+        current = self.root
+        while True:
+            distance = hamming_distance(hash_value, current[0])
+            child = current[2].get(distance)
+            if child is None:
+                current[2][distance] = node
+                return
+            current = child
+
+    def search(self, hash_value, max_distance):
+        """
+        查找距离不超过max_distance的所有条目
+
+        返回:
+            [(距离, 哈希值, 关联数据), ...]，按距离升序排列
+        """
+        if self.root is None:
+            return []
+
+        matches = []
+        candidates = [self.root]
+        while candidates:
+            node = candidates.pop()
+            distance = hamming_distance(hash_value, node[0])
+            if distance <= max_distance:
+                matches.append((distance, node[0], node[1]))
+            # 根据三角不等式，只需要访问距离在 [d - r, d + r] 范围内的子树
+            low = distance - max_distance
+            high = distance + max_distance
+            for child_distance, child in node[2].items():
+                if low <= child_distance <= high:
+                    candidates.append(child)
+
+        matches.sort(key=lambda x: x[0])
+        return matches
+
+    def __len__(self):
+        return self.size
+
+
+def config_namespace(pipeline_config=None):
+    """
+    根据pipeline配置生成索引命名空间，不同语言或模型的识别结果互不复用
+    """
+    return json.dumps(pipeline_config or {}, sort_keys=True, ensure_ascii=False, default=str)
+
+
+def _item_path(item):
+    """关联数据中的图片路径：GUI登记路径字符串，ocr_image_dedup登记 (路径, 结果)"""
+    if isinstance(item, (tuple, list)) and item:
+        return item[0]
+    return item
+
+
+class DedupIndex:
+    """
+    已处理图片的感知哈希索引
+    线程安全，可在GUI工作线程中共享；按命名空间（pipeline配置）分别建树
+    """
+
+    def __init__(self, threshold=DEFAULT_HAMMING_THRESHOLD, hash_size=DEFAULT_HASH_SIZE):
+        self.threshold = threshold
+        self.hash_size = hash_size
+        # 命名空间 -> BKTree
+        self.trees = {}
+        self.lock = threading.Lock()
+        # 统计信息
+        self.hits = 0
+        self.misses = 0
+
+    def compute_hash(self, image_or_path):
+        """计算图片哈希，失败时返回None"""
+        try:
+            return compute_dhash(image_or_path, self.hash_size)
+        except Exception as e:
+            print(f"计算图片哈希失败: {str(e)}")
+            return None
+
+    def find(self, hash_value, namespace=None, exclude_path=None):
+        """
+        查找最接近的已处理图片
+
+        参数:
+            namespace: 命名空间，通常为 config_namespace(pipeline_config)
+            exclude_path: 忽略登记为该路径的图片，重新识别同一文件时不会匹配到它自己
+
+        返回:
+            (距离, 关联数据)，未找到时返回None
+        """
+        if hash_value is None:
+            return None
+        with self.lock:
+            tree = self.trees.get(namespace)
+            matches = tree.search(hash_value, self.threshold) if tree is not None else []
+            if exclude_path is not None:
+                exclude_path = os.path.abspath(exclude_path)
+                matches = [m for m in matches if os.path.abspath(str(_item_path(m[2]))) != exclude_path]
+            if matches:
+                self.hits += 1
+                distance, _, item = matches[0]
+                return distance, item
+            self.misses += 1
+            return None
+
+    def add(self, hash_value, item, namespace=None):
+        """登记一张已处理的图片"""
+        if hash_value is None:
+            return
+        with self.lock:
+            tree = self.trees.get(namespace)
+            if tree is None:
+                tree = self.trees[namespace] = BKTree()
+            tree.add(hash_value, item)
+
+    def get_stats(self):
+        """返回命中统计"""
+        with self.lock:
+            return {
+                'indexed': sum(len(tree) for tree in self.trees.values()),
+                'hits': self.hits,
+                'misses': self.misses,
+                'threshold': self.threshold,
+            }
+
+
+# 全局默认索引，进程内共享
+_default_index = None
+
+
+def get_default_index():
+    """获取或创建全局默认去重索引"""
+    global _default_index
+    if _default_index is None:
+        _default_index = DedupIndex()
+    return _default_index
+
+
+def ocr_image_dedup(image_path, output_dir="output", print_result=True, index=None, pipeline_config=None,
+                    reuse=None):
+    """
+    带近似重复检测的OCR识别
+    默认只标记疑似重复并照常识别；reuse为True且像素比对确认内容相同时，直接复用之前的结果
+
+    参数:
+        image_path: 图片路径
+        output_dir: 结果保存目录
+        print_result: 是否打印识别结果
+        index: 去重索引，默认使用全局索引
+        pipeline_config: pipeline配置字典，为None时使用默认配置
+        reuse: 是否复用已确认重复图片的结果，为None时使用 REUSE_DUPLICATE_RESULTS
+
+    返回:
+        (识别结果, 重复来源路径)，非重复图片的重复来源路径为None
+    """
+    if reuse is None:
+        reuse = REUSE_DUPLICATE_RESULTS
+    if index is None:
+        index = get_default_index()
+
+    if not os.path.exists(image_path):
+        raise FileNotFoundError(f"图片文件不存在: {image_path}")
+
+    namespace = config_namespace(pipeline_config)
+    hash_value = index.compute_hash(image_path)
+    match = index.find(hash_value, namespace, exclude_path=image_path)
+    duplicate_of = None
+    if match is not None:
+        distance, (source_path, result) = match
+        duplicate_of = source_path
+        if reuse:
+            same, worst = confirm_duplicate(image_path, source_path)
+            if same:
+                print(f"检测到重复图片: {image_path} -> {source_path} (汉明距离: {distance})，复用已有结果")
+                return result, source_path
+            print(f"哈希相近但像素比对不一致（最大分块差异 {worst:.1%}），重新识别: {image_path}")
+        else:
+            print(f"疑似重复图片: {image_path} -> {source_path} (汉明距离: {distance})，照常识别")
+
+    # print_result为False时ocr_image不返回结果，通过return_details取得文本
+    details = ocr_image(image_path, output_dir=output_dir, print_result=print_result,
+                        pipeline_config=pipeline_config, return_details=True)
+    result = details['texts']
+    index.add(hash_value, (image_path, result), namespace)
+    return result, duplicate_of
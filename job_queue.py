@@ -0,0 +1,487 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基于SQLite的持久化OCR任务队列
+多台机器或多个进程可以共享同一个队列文件，通过租约领取任务：
+- 租约过期后任务会被其他工作进程重新领取，工作进程崩溃不会丢失任务
+- 完成任务时校验租约持有者，租约已被他人接管时不会重复提交结果
+- 失败的任务按重试次数重新排队，超过上限后进入死信列表
+
+队列中的图片路径保存为相对于共享根目录（--root 或环境变量 OCR_QUEUE_ROOT）的路径，
+各台机器按自己的挂载位置指定根目录即可。
+
+注意：SQLite依赖文件锁保证事务互斥，网络文件系统（SMB/NFS）上的文件锁实现常常不可靠，
+可能导致同一任务被重复领取甚至数据库损坏。推荐将数据库放在本机磁盘上，
+跨机器共享时需确认共享文件系统正确支持字节范围锁，并定期备份数据库文件。
+
+用法:
+    python job_queue.py enqueue queue.db 图片文件夹或文件... --root /mnt/scans
+    python job_queue.py work queue.db --root /mnt/scans --processes 4 --output ./output/queue_results
+    python job_queue.py status queue.db
+    python job_queue.py retry-dead queue.db
+"""
+
+import os
+import sys
+import time
+import uuid
+import socket
+import sqlite3
+import argparse
+import threading
+import traceback
+import multiprocessing
+
+# 任务状态
+STATUS_PENDING = "pending"
+STATUS_LEASED = "leased"
+STATUS_DONE = "done"
+STATUS_DEAD = "dead"
+
+# 默认租约时长（秒），工作进程在处理期间会定期续约
+DEFAULT_LEASE_SECONDS = 300
+# 默认最大尝试次数，超过后进入死信列表
+DEFAULT_MAX_ATTEMPTS = 3
+
+# 支持的图片扩展名，与GUI保持一致
+SUPPORTED_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.tif', '.webp', '.gif'}
+# 共享根目录的环境变量，未通过参数指定根目录时使用
+ROOT_ENV_VAR = "OCR_QUEUE_ROOT"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    image_path TEXT NOT NULL UNIQUE,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    last_error TEXT,
+    result_path TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, lease_expires);
+"""
+
+
+def _is_network_path(path):
+    """粗略判断路径是否位于网络共享上（UNC路径或Windows映射的网络驱动器）"""
+    path = os.path.abspath(path)
+    if path.startswith('\\\\') or path.startswith('//'):
+        return True
+    if os.name == 'nt':
+        try:
+            import ctypes
+            drive = os.path.splitdrive(path)[0] + '\\'
+            # DRIVE_REMOTE = 4
+            return ctypes.windll.kernel32.GetDriveTypeW(drive) == 4
+        except Exception:
+            return False
+    return False
+
+
+class JobQueue:
+    """
+    SQLite任务队列
+
+    参数:
+        db_path: 队列数据库文件路径，推荐放在本机磁盘上（网络文件系统上的SQLite文件锁不可靠）
+        lease_seconds: 租约时长（秒）
+        max_attempts: 最大尝试次数
+        root: 图片所在的共享根目录，任务中保存相对于该目录的路径；为None时使用环境变量
+              OCR_QUEUE_ROOT，两者都未设置时保存绝对路径（只适用于所有机器挂载位置一致的情况）
+    """
+
+    def __init__(self, db_path, lease_seconds=DEFAULT_LEASE_SECONDS, max_attempts=DEFAULT_MAX_ATTEMPTS, root=None):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        root = root or os.environ.get(ROOT_ENV_VAR)
+        self.root = os.path.abspath(root) if root else None
+        if _is_network_path(db_path):
+            print(f"[警告] 队列数据库位于网络共享上: {db_path}。SQLite在网络文件系统上的文件锁不可靠，"
+                  f"可能重复领取任务或损坏数据库，推荐使用本机磁盘上的数据库")
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.executescript(_SCHEMA)
+        finally:
+            conn.close()
+
+    def _connect(self):
+        """创建数据库连接；isolation_level=None 以便手动控制事务"""
+        conn = sqlite3.connect(self.db_path, timeout=60, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def to_stored_path(self, path):
+        """将图片路径转换为队列中保存的形式：根目录下的文件保存为使用'/'分隔的相对路径"""
+        path = os.path.abspath(path)
+        if self.root is not None:
+            try:
+                relative = os.path.relpath(path, self.root)
+            except ValueError:
+                # Windows下不在同一驱动器
+                relative = None
+            if relative is not None and not relative.startswith(os.pardir):
+                return relative.replace(os.sep, '/')
+            print(f"[警告] 图片不在共享根目录 {self.root} 下，保存为绝对路径: {path}")
+        return path
+
+    def resolve_path(self, stored_path):
+        """将队列中保存的路径转换为本机路径"""
+        if self.root is not None and not os.path.isabs(stored_path):
+            return os.path.join(self.root, *stored_path.split('/'))
+        return stored_path
+
+    def enqueue(self, image_paths):
+        """
+        添加任务，已存在的图片不会重复添加
+
+        返回:
+            新添加的任务数量
+        """
+        now = time.time()
+        added = 0
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for path in image_paths:
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO jobs (image_path, created_at, updated_at) VALUES (?, ?, ?)",
+                    (self.to_stored_path(path), now, now)
+                )
+                added += cursor.rowcount
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return added
+
+    def lease(self, owner):
+        """
+        领取一个任务：优先领取待处理任务，其次接管租约已过期的任务
+
+        返回:
+            任务字典，没有可领取的任务时返回None
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            # BEGIN IMMEDIATE 获取写锁，保证同一任务只会被一个工作进程领取
+            conn.execute("BEGIN IMMEDIATE")
+
+            # 租约过期且已用完重试次数的任务进入死信列表
+            conn.execute(
+                "UPDATE jobs SET status = ?, lease_owner = NULL, lease_expires = NULL, "
+                "last_error = COALESCE(last_error, '租约过期'), updated_at = ? "
+                "WHERE status = ? AND lease_expires < ? AND attempts >= ?",
+                (STATUS_DEAD, now, STATUS_LEASED, now, self.max_attempts)
+            )
+
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = ? OR (status = ? AND lease_expires < ?) "
+                "ORDER BY id LIMIT 1",
+                (STATUS_PENDING, STATUS_LEASED, now)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+
+            if row['status'] == STATUS_LEASED:
+                print(f"接管过期租约: 任务 {row['id']} (原持有者: {row['lease_owner']})")
+
+            conn.execute(
+                "UPDATE jobs SET status = ?, lease_owner = ?, lease_expires = ?, attempts = attempts + 1, "
+                "updated_at = ? WHERE id = ?",
+                (STATUS_LEASED, owner, now + self.lease_seconds, now, row['id'])
+            )
+            conn.execute("COMMIT")
+            job = dict(row)
+            job['attempts'] += 1
+            job['lease_owner'] = owner
+            return job
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def _update_leased(self, job_id, owner, sql, params):
+        """仅当租约仍由owner持有时更新任务，返回是否更新成功"""
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                sql + " WHERE id = ? AND status = ? AND lease_owner = ?",
+                tuple(params) + (job_id, STATUS_LEASED, owner)
+            )
+            return cursor.rowcount == 1
+        finally:
+            conn.close()
+
+    def renew(self, job_id, owner):
+        """续约，返回租约是否仍有效"""
+        now = time.time()
+        return self._update_leased(
+            job_id, owner,
+            "UPDATE jobs SET lease_expires = ?, updated_at = ?",
+            (now + self.lease_seconds, now)
+        )
+
+    def complete(self, job_id, owner, result_path=None):
+        """标记任务完成，租约已被其他工作进程接管时返回False"""
+        now = time.time()
+        return self._update_leased(
+            job_id, owner,
+            "UPDATE jobs SET status = ?, lease_owner = NULL, lease_expires = NULL, result_path = ?, "
+            "last_error = NULL, updated_at = ?",
+            (STATUS_DONE, result_path, now)
+        )
+
+    def fail(self, job_id, owner, error, attempts):
+        """标记任务失败：未超过重试次数时重新排队，否则进入死信列表"""
+        now = time.time()
+        status = STATUS_DEAD if attempts >= self.max_attempts else STATUS_PENDING
+        updated = self._update_leased(
+            job_id, owner,
+            "UPDATE jobs SET status = ?, lease_owner = NULL, lease_expires = NULL, last_error = ?, updated_at = ?",
+            (status, str(error), now)
+        )
+        return status if updated else None
+
+    def retry_dead(self):
+        """将死信列表中的任务重新排队并清零重试次数，返回重新排队的数量"""
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, attempts = 0, updated_at = ? WHERE status = ?",
+                (STATUS_PENDING, time.time(), STATUS_DEAD)
+            )
+            return cursor.rowcount
+        finally:
+            conn.close()
+
+    def counts(self):
+        """返回各状态的任务数量"""
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+            counts = {STATUS_PENDING: 0, STATUS_LEASED: 0, STATUS_DONE: 0, STATUS_DEAD: 0}
+            counts.update({row['status']: row['n'] for row in rows})
+            return counts
+        finally:
+            conn.close()
+
+    def dead_jobs(self):
+        """返回死信列表"""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT id, image_path, attempts, last_error FROM jobs WHERE status = ? ORDER BY id",
+                (STATUS_DEAD,)
+            ).fetchall()
+            return [dict(row) for row in rows]
+        finally:
+            conn.close()
+
+
+def job_output_dir(output_dir, stored_path):
+    """
+    按任务中保存的路径计算结果目录：保留图片所在的子目录结构，
+    不同子目录下的同名图片不会互相覆盖。绝对路径去掉驱动器号和开头的分隔符后同样保留目录结构
+    """
+    drive, path = os.path.splitdrive(stored_path.replace('\\', '/'))
+    parts = [part for part in path.split('/')[:-1] if part not in ('', '.', os.pardir)]
+    drive = drive.strip('/').replace(':', '')
+    if drive:
+        parts = drive.split('/') + parts
+    return os.path.join(output_dir, *parts)
+
+
+def _default_worker_id():
+    """生成全局唯一的工作进程标识：主机名-进程号-随机串"""
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+def run_worker(db_path, output_dir="output/queue_results", worker_id=None, lease_seconds=DEFAULT_LEASE_SECONDS,
+               max_attempts=DEFAULT_MAX_ATTEMPTS, idle_exit=True, poll_interval=2.0, pipeline_config=None,
+               root=None, process_fn=None):
+    """
+    工作进程主循环：领取任务，调用ocr_image识别，提交结果
+
+    参数:
+        db_path: 队列数据库文件路径
+        output_dir: 识别结果保存目录
+        worker_id: 工作进程标识，默认自动生成
+        lease_seconds: 租约时长（秒）
+        max_attempts: 最大尝试次数
+        idle_exit: 队列为空时是否退出；为False时持续等待新任务
+        poll_interval: 队列为空时的轮询间隔（秒）
+        pipeline_config: pipeline配置字典，为None时使用默认配置
+        root: 本机上的共享根目录，用于还原队列中保存的相对路径
+        process_fn: 处理函数 process_fn(image_path, output_dir, pipeline_config)，默认调用ocr_image；
+                    output_dir为该任务的结果目录（见job_output_dir），抛出异常时任务记为失败
+
+    返回:
+        (完成数量, 失败数量)
+    """
+    worker_id = worker_id or _default_worker_id()
+    queue = JobQueue(db_path, lease_seconds=lease_seconds, max_attempts=max_attempts, root=root)
+    completed = 0
+    failed = 0
+
+    if process_fn is None:
+        from PaddleOCRVL_main import get_pipeline, ocr_image
+
+        def process_fn(image_path, output_dir, pipeline_config):
+            details = ocr_image(image_path, output_dir=output_dir, print_result=True,
+                                pipeline_config=pipeline_config, return_details=True)
+            # ocr_image不会因保存失败抛出异常，结果没有写入磁盘时任务不能记为完成
+            if details['save_error'] is not None:
+                raise RuntimeError(f"保存结果失败: {details['save_error']}") from details['save_error']
+
+        # 先加载模型，避免领取任务后长时间初始化导致租约过期
+        get_pipeline(pipeline_config)
+    print(f"[{worker_id}] 工作进程已启动")
+
+    while True:
+        job = queue.lease(worker_id)
+        if job is None:
+            counts = queue.counts()
+            if idle_exit and counts[STATUS_PENDING] == 0 and counts[STATUS_LEASED] == 0:
+                break
+            time.sleep(poll_interval)
+            continue
+
+        image_path = queue.resolve_path(job['image_path'])
+        print(f"[{worker_id}] 领取任务 {job['id']}: {image_path} (第{job['attempts']}次尝试)")
+
+        # 处理期间定期续约
+        stop_heartbeat = threading.Event()
+
+        def heartbeat():
+            while not stop_heartbeat.wait(max(1.0, lease_seconds / 3.0)):
+                if not queue.renew(job['id'], worker_id):
+                    print(f"[{worker_id}] 任务 {job['id']} 的租约已失效")
+                    return
+
+        heartbeat_thread = threading.Thread(target=heartbeat, daemon=True)
+        heartbeat_thread.start()
+        try:
+            result_dir = job_output_dir(output_dir, job['image_path'])
+            process_fn(image_path, result_dir, pipeline_config)
+            image_name = os.path.splitext(os.path.basename(image_path))[0]
+            result_path = os.path.join(result_dir, image_name)
+            stop_heartbeat.set()
+            heartbeat_thread.join()
+            if queue.complete(job['id'], worker_id, result_path):
+                completed += 1
+            else:
+                print(f"[{worker_id}] 任务 {job['id']} 的租约已被其他工作进程接管，放弃提交")
+        except Exception as e:
+            stop_heartbeat.set()
+            heartbeat_thread.join()
+            failed += 1
+            traceback.print_exc()
+            status = queue.fail(job['id'], worker_id, e, job['attempts'])
+            if status == STATUS_DEAD:
+                print(f"[{worker_id}] 任务 {job['id']} 超过最大尝试次数，进入死信列表: {str(e)}")
+            elif status == STATUS_PENDING:
+                print(f"[{worker_id}] 任务 {job['id']} 失败，已重新排队: {str(e)}")
+
+    print(f"[{worker_id}] 工作进程退出: 完成 {completed} 个, 失败 {failed} 个")
+    return completed, failed
+
+
+def _worker_entry(kwargs):
+    """多进程入口"""
+    return run_worker(**kwargs)
+
+
+def collect_images(paths):
+    """展开文件夹，返回支持的图片文件列表"""
+    images = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root_dir, _, files in os.walk(path):
+                for file in sorted(files):
+                    if os.path.splitext(file)[1].lower() in SUPPORTED_EXTENSIONS:
+                        images.append(os.path.join(root_dir, file))
+        elif os.path.splitext(path)[1].lower() in SUPPORTED_EXTENSIONS:
+            images.append(path)
+    return images
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="基于SQLite的共享OCR任务队列")
+    subparsers = parser.add_subparsers(dest="command")
+
+    enqueue_parser = subparsers.add_parser("enqueue", help="添加任务")
+    enqueue_parser.add_argument("db", help="队列数据库文件")
+    enqueue_parser.add_argument("paths", nargs="+", help="图片文件或文件夹")
+    enqueue_parser.add_argument("--root", default=None, help="共享根目录，任务中保存相对于该目录的路径")
+
+    work_parser = subparsers.add_parser("work", help="启动工作进程")
+    work_parser.add_argument("db", help="队列数据库文件")
+    work_parser.add_argument("--output", default="output/queue_results", help="结果保存目录")
+    work_parser.add_argument("--processes", type=int, default=None,
+                             help="本机工作进程数量，默认使用autotune保存的配置")
+    work_parser.add_argument("--lease", type=float, default=DEFAULT_LEASE_SECONDS, help="租约时长（秒）")
+    work_parser.add_argument("--max-attempts", type=int, default=DEFAULT_MAX_ATTEMPTS, help="最大尝试次数")
+    work_parser.add_argument("--wait", action="store_true", help="队列为空时持续等待新任务")
+    work_parser.add_argument("--lang", default="ch", help="识别语言，如 ch、en、japan")
+    work_parser.add_argument("--root", default=None, help="本机上的共享根目录（各机器挂载位置可以不同）")
+
+    status_parser = subparsers.add_parser("status", help="查看队列状态")
+    status_parser.add_argument("db", help="队列数据库文件")
+
+    retry_parser = subparsers.add_parser("retry-dead", help="重新排队死信任务")
+    retry_parser.add_argument("db", help="队列数据库文件")
+
+    args = parser.parse_args()
+
+    if args.command == "enqueue":
+        images = collect_images(args.paths)
+        added = JobQueue(args.db, root=args.root).enqueue(images)
+        print(f"共找到 {len(images)} 个图片文件，新添加 {added} 个任务")
+    elif args.command == "work":
+        kwargs = {
+            'db_path': args.db,
+            'output_dir': args.output,
+            'lease_seconds': args.lease,
+            'max_attempts': args.max_attempts,
+            'idle_exit': not args.wait,
+            'pipeline_config': {'lang': args.lang},
+            'root': args.root,
+        }
+        processes = args.processes
+        if processes is None:
+            from pipeline_registry import load_tuned_config
+            processes = load_tuned_config().get('processes', 1)
+        if processes <= 1:
+            run_worker(**kwargs)
+        else:
+            with multiprocessing.Pool(processes) as pool:
+                results = pool.map(_worker_entry, [kwargs] * processes)
+            print(f"全部工作进程退出: 完成 {sum(r[0] for r in results)} 个, 失败 {sum(r[1] for r in results)} 个")
+    elif args.command == "status":
+        queue = JobQueue(args.db)
+        counts = queue.counts()
+        print(f"待处理: {counts[STATUS_PENDING]}  处理中: {counts[STATUS_LEASED]}  "
+              f"已完成: {counts[STATUS_DONE]}  死信: {counts[STATUS_DEAD]}")
+        for job in queue.dead_jobs():
+            print(f"  [死信] {job['id']} {job['image_path']} (尝试{job['attempts']}次): {job['last_error']}")
+    elif args.command == "retry-dead":
+        print(f"已重新排队 {JobQueue(args.db).retry_dead()} 个死信任务")
+    else:
+        parser.print_help()
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
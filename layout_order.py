@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+版面阅读顺序模块
+基于网格空间索引和递归XY切分(XY-cut)，把文本块按分栏、分块组织为正确的阅读顺序：
+先按整页宽度的水平空白切分为上下区域，再按贯穿区域的竖向空白切分为左右分栏，
+分栏内部按行分组。表格区域各列的行互相对齐，不做竖向切分，保持按行输出。
+"""
+
+from collections import defaultdict
+
+# 默认行分组阈值（像素），与原GUI行为一致
+DEFAULT_LINE_THRESHOLD = 15
+# 竖向切分所需的最小栏间距（像素）
+MIN_COLUMN_GAP = 10
+# 栏间距至少为文本行高的多少倍
+COLUMN_GAP_HEIGHT_RATIO = 1.0
+# 多个水平空白中，不小于最大空白该比例的都作为切分位置（一次切出多行，避免递归过深）
+ROW_GAP_KEEP_RATIO = 0.8
+# 两侧文本块中行对齐的比例超过该值，且文本块较短时视为表格，不做竖向切分
+TABLE_ALIGN_RATIO = 0.8
+# 表格单元格的典型宽高比上限，正文分栏中的文本行通常远大于该值
+TABLE_CELL_ASPECT = 10.0
+
+
+def block_bounds(block):
+    """
+    获取文本块的外接矩形
+
+    返回:
+        (x0, y0, x1, y1)，没有位置信息时返回 (0, 0, 0, 0)
+    """
+    try:
+        position = block.get('position', [])
+        if isinstance(position, (list, tuple)) and position:
+            if isinstance(position[0], (list, tuple)):
+                # 格式: [[x1, y1], [x2, y2], [x3, y3], [x4, y4]]
+                points = [p for p in position if isinstance(p, (list, tuple)) and len(p) >= 2]
+                xs = [float(p[0]) for p in points]
+                ys = [float(p[1]) for p in points]
+                return min(xs), min(ys), max(xs), max(ys)
+            if len(position) >= 4:
+                # 简化格式: [x0, y0, x1, y1]
+                x0, y0, x1, y1 = (float(v) for v in position[:4])
+                return min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1)
+    except Exception:
+        pass
+    return 0.0, 0.0, 0.0, 0.0
+
+
+class GridIndex:
+    """
+    均匀网格空间索引
+    每个矩形登记到其覆盖的所有网格中，矩形查询只检查相交的网格
+
+    参数:
+        cell_size: 网格边长（像素）
+    """
+
+    def __init__(self, cell_size=64):
+        self.cell_size = max(float(cell_size), 1.0)
+        self.cells = defaultdict(list)
+        self.bounds = {}
+
+    def _cell_range(self, x0, y0, x1, y1):
+        size = self.cell_size
+        return (int(x0 // size), int(y0 // size), int(x1 // size), int(y1 // size))
+
+    def insert(self, item, bounds):
+        """登记一个矩形 bounds=(x0, y0, x1, y1)"""
+        self.bounds[item] = bounds
+        cx0, cy0, cx1, cy1 = self._cell_range(*bounds)
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                self.cells[(cx, cy)].append(item)
+
+    def query(self, bounds):
+        """返回与矩形相交的所有条目"""
+        x0, y0, x1, y1 = bounds
+        cx0, cy0, cx1, cy1 = self._cell_range(x0, y0, x1, y1)
+        found = set()
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                for item in self.cells.get((cx, cy), ()):
+                    if item in found:
+                        continue
+                    bx0, by0, bx1, by1 = self.bounds[item]
+                    if bx0 <= x1 and bx1 >= x0 and by0 <= y1 and by1 >= y0:
+                        found.add(item)
+        return found
+
+
+def _median(values):
+    """中位数"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[len(ordered) // 2]
+
+
+def _find_gaps(intervals):
+    """
+    在一组区间的投影上查找空白
+
+    参数:
+        intervals: [(起点, 终点, 条目), ...]
+
+    返回:
+        ([(空白起点, 空白终点), ...], 按起点排序后的区间列表)
+    """
+    intervals = sorted(intervals, key=lambda iv: iv[0])
+    gaps = []
+    reach = None
+    for start, end, _ in intervals:
+        if reach is not None and start > reach:
+            gaps.append((reach, start))
+        reach = end if reach is None else max(reach, end)
+    return gaps, intervals
+
+
+def _split_at(intervals, cuts):
+    """按切分位置把已排序的区间分组"""
+    groups = [[]]
+    cut_idx = 0
+    for start, _, item in intervals:
+        while cut_idx < len(cuts) and start >= cuts[cut_idx]:
+            groups.append([])
+            cut_idx += 1
+        groups[-1].append(item)
+    return [group for group in groups if group]
+
+
+def _group_lines(items, bounds, line_threshold):
+    """按中心y坐标把文本块分组为行（与原GUI行分组逻辑一致）"""
+    centers = sorted(((bounds[i][1] + bounds[i][3]) / 2, i) for i in items)
+    lines = []
+    current_y = None
+    for y, item in centers:
+        if lines and abs(y - current_y) <= line_threshold:
+            lines[-1].append(item)
+        else:
+            lines.append([item])
+            current_y = y
+    return lines
+
+
+class _XYCutter:
+    """递归XY切分，生成按阅读顺序排列的行"""
+
+    def __init__(self, bounds, line_threshold):
+        self.bounds = bounds
+        self.line_threshold = line_threshold
+        heights = [b[3] - b[1] for b in bounds if b[3] > b[1]]
+        self.line_height = _median(heights) if heights else float(line_threshold)
+        self.grid = GridIndex(cell_size=max(self.line_height * 4, 16))
+        for item, b in enumerate(bounds):
+            self.grid.insert(item, b)
+
+    def _is_table_like(self, columns):
+        """判断竖向切分出的各栏是否为同一表格的不同列"""
+        if len(columns) < 2:
+            return False
+        column_of = {}
+        for idx, column in enumerate(columns):
+            for item in column:
+                column_of[item] = idx
+
+        left = min(self.bounds[item][0] for item in column_of)
+        right = max(self.bounds[item][2] for item in column_of)
+        aligned = 0
+        aspects = []
+        for item, idx in column_of.items():
+            x0, y0, x1, y1 = self.bounds[item]
+            height = max(y1 - y0, 1.0)
+            aspects.append((x1 - x0) / height)
+            # 在整行范围内查找相邻栏中与之垂直重叠过半的文本块
+            for other in self.grid.query((left, y0, right, y1)):
+                other_idx = column_of.get(other)
+                if other_idx is None or abs(other_idx - idx) != 1:
+                    continue
+                oy0, oy1 = self.bounds[other][1], self.bounds[other][3]
+                overlap = min(y1, oy1) - max(y0, oy0)
+                if overlap >= 0.5 * min(height, max(oy1 - oy0, 1.0)):
+                    aligned += 1
+                    break
+        return aligned >= TABLE_ALIGN_RATIO * len(column_of) and _median(aspects) < TABLE_CELL_ASPECT
+
+    def _vertical_split(self, items):
+        """按贯穿区域的竖向空白切分为左右分栏"""
+        gaps, intervals = _find_gaps([(self.bounds[i][0], self.bounds[i][2], i) for i in items])
+        min_gap = max(MIN_COLUMN_GAP, COLUMN_GAP_HEIGHT_RATIO * self.line_height)
+        cuts = [end for start, end in gaps if end - start >= min_gap]
+        if not cuts:
+            return None
+        columns = _split_at(intervals, cuts)
+        if self._is_table_like(columns):
+            return None
+        return columns
+
+    def _horizontal_split(self, items):
+        """按整个区域宽度的水平空白切分为上下区域"""
+        gaps, intervals = _find_gaps([(self.bounds[i][1], self.bounds[i][3], i) for i in items])
+        if not gaps:
+            return None
+        widest = max(end - start for start, end in gaps)
+        cuts = [end for start, end in gaps if end - start >= ROW_GAP_KEEP_RATIO * widest]
+        return _split_at(intervals, cuts)
+
+    def order(self, items):
+        """返回区域内按阅读顺序排列的行列表"""
+        lines = []
+        stack = [items]
+        # 使用显式栈代替递归，栈顶为下一个要输出的区域
+        while stack:
+            region = stack.pop()
+            leaf_lines = _group_lines(region, self.bounds, self.line_threshold)
+            if len(leaf_lines) <= 1 or len(region) <= 1:
+                lines.extend(leaf_lines)
+                continue
+            parts = self._vertical_split(region) or self._horizontal_split(region)
+            if parts is None or len(parts) <= 1:
+                lines.extend(leaf_lines)
+                continue
+            stack.extend(reversed(parts))
+        return lines
+
+
+def order_text_blocks(text_blocks, line_threshold=DEFAULT_LINE_THRESHOLD):
+    """
+    按版面阅读顺序把文本块组织为行
+
+    参数:
+        text_blocks: [{'text': 文本, 'position': 位置, ...}, ...]
+        line_threshold: 同一行文本块中心y坐标的最大差值（像素）
+
+    返回:
+        [[文本块, ...], ...]，每个子列表为一行，行内顺序未排序
+    """
+    blocks = [block for block in text_blocks if isinstance(block, dict) and 'text' in block]
+    if not blocks:
+        return []
+    bounds = [block_bounds(block) for block in blocks]
+    cutter = _XYCutter(bounds, line_threshold)
+    return [[blocks[i] for i in line] for line in cutter.order(list(range(len(blocks))))]
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+置信度驱动的两级模型级联
+先用轻量的mobile模型完成整页检测和识别，只有置信度低于阈值的文本行才裁剪出来，
+交给server识别模型重新识别，取两者中置信度更高的结果。
+清晰的印刷体文本大多不需要server模型，可显著降低每页的平均CPU开销。
+第二级只加载识别模型；PaddleOCR 2.x没有内置server模型，必须通过 --server-rec-model-dir 指定。
+
+用法:
+    python model_cascade.py 图片1.jpg 图片2.jpg ... --threshold 0.85
+"""
+
+import os
+import sys
+import argparse
+import threading
+import traceback
+
+import numpy as np
+
+from PaddleOCRVL_main import (
+    get_pipeline, is_using_fallback, load_image_array, predict_array,
+    parse_ocr_output, save_ocr_results, extract_pure_texts,
+    supports_staged_inference, detect_text_boxes, crop_text_box, recognize_crops
+)
+from pipeline_registry import has_distinct_server_recognizer
+import blank_filter
+from blank_filter import BLANK_PAGE_MARKER, is_blank_page
+
+# 低于该置信度的文本行交给server模型重新识别
+DEFAULT_ESCALATION_THRESHOLD = 0.85
+# 与PaddleOCR默认值一致，级联完成后仍低于该置信度的文本行被丢弃
+DEFAULT_DROP_SCORE = 0.5
+
+# 级联统计
+_stats = {'pages': 0, 'lines': 0, 'escalated': 0, 'improved': 0}
+_stats_lock = threading.Lock()
+
+
+def _first_stage(pipeline, img_array, using_fallback, use_cls):
+    """
+    mobile模型识别整页
+
+    返回:
+        [{'text', 'score', 'position'}, ...], [裁剪图或None, ...]
+    """
+    if supports_staged_inference(pipeline):
+        # 分阶段执行时保留所有文本行（包括低置信度的行）和裁剪图，供第二级复用
+        boxes = detect_text_boxes(pipeline, img_array)
+        crops = [crop_text_box(img_array, box) for box in boxes]
+        rec_results = recognize_crops(pipeline, crops, cls=use_cls)
+        items = [{'text': text, 'score': score, 'position': box}
+                 for box, (text, score) in zip(boxes, rec_results)]
+        return items, crops
+
+    output = predict_array(pipeline, img_array, using_fallback)
+    items = parse_ocr_output(output, using_fallback, print_result=False)
+    return items, [None] * len(items)
+
+
+def _crop_for_item(img_array, item):
+    """按识别结果中的四点坐标裁剪文本行，坐标格式不支持时返回None"""
+    try:
+        points = np.array(item.get('position'), dtype=np.float32)
+        if points.size != 8:
+            return None
+        return crop_text_box(img_array, points.reshape(4, 2))
+    except Exception:
+        return None
+
+
+def check_server_stage(server_config=None):
+    """
+    检查第二级能否使用与mobile不同的server识别模型，不能时抛出ValueError
+    （PaddleOCR 2.x未指定rec_model_dir时只会再加载一份相同的mobile模型，升级没有意义）
+    """
+    if not has_distinct_server_recognizer(server_config):
+        raise ValueError("当前PaddleOCR版本没有内置server识别模型，请通过 --server-rec-model-dir "
+                         "（或server_config中的rec_model_dir）指定server识别模型目录")
+
+
+def cascade_recognize(img_array, pipeline_config=None, server_config=None,
+                      threshold=DEFAULT_ESCALATION_THRESHOLD, drop_score=DEFAULT_DROP_SCORE):
+    """
+    对图片数组执行两级级联识别
+
+    参数:
+        img_array: 图片数组
+        pipeline_config: 两级共用的pipeline配置（语言等）
+        server_config: 第二级额外的配置，例如 {'rec_model_dir': ...}；PaddleOCR 2.x必须指定rec_model_dir
+        threshold: 低于该置信度的文本行升级到server模型
+        drop_score: 级联完成后丢弃低于该置信度的文本行
+
+    返回:
+        (standard_results, 统计字典 {'lines', 'escalated', 'improved'})
+    """
+    check_server_stage(server_config)
+    base_config = dict(pipeline_config or {})
+    use_cls = base_config.get('use_angle_cls', True)
+    fast = get_pipeline(base_config, model_variant='mobile')
+    using_fallback = is_using_fallback()
+
+    items, crops = _first_stage(fast, img_array, using_fallback, use_cls)
+    for item in items:
+        item['model'] = 'mobile'
+
+    # 收集需要升级的文本行
+    escalate = []
+    for idx, item in enumerate(items):
+        if float(item.get('score', 1.0)) >= threshold:
+            continue
+        crop = crops[idx] if crops[idx] is not None else _crop_for_item(img_array, item)
+        if crop is not None:
+            escalate.append((idx, crop))
+
+    improved = 0
+    if escalate:
+        config = dict(base_config)
+        config.update(server_config or {})
+        # 第二级只识别裁剪好的文本行，不需要检测模型
+        slow = get_pipeline(config, model_variant='server', recognition_only=True)
+        escalate_crops = [crop for _, crop in escalate]
+        classifier = getattr(fast, 'text_classifier', None)
+        if use_cls and not getattr(slow, 'use_angle_cls', False) and classifier is not None:
+            # 只含识别模型的第二级没有方向分类器，借用第一级的分类器把倒置的文本行转正
+            escalate_crops, _, _ = classifier(escalate_crops)
+        rec_results = recognize_crops(slow, escalate_crops, cls=use_cls)
+        for (idx, _), (text, score) in zip(escalate, rec_results):
+            item = items[idx]
+            item['escalated'] = True
+            if score > float(item.get('score', 0.0)):
+                item.update({'text': text, 'score': score, 'model': 'server'})
+                improved += 1
+
+    standard_results = [item for item in items if float(item.get('score', 1.0)) >= drop_score]
+    stats = {'lines': len(items), 'escalated': len(escalate), 'improved': improved}
+    with _stats_lock:
+        _stats['pages'] += 1
+        for key, value in stats.items():
+            _stats[key] += value
+    return standard_results, stats
+
+
+def ocr_image_cascade(image_path, output_dir="output", print_result=True, pipeline_config=None,
+                      server_config=None, threshold=DEFAULT_ESCALATION_THRESHOLD, skip_blank=None):
+    """
+    使用两级模型级联识别单张图片并保存结果
+
+    返回:
+        识别结果列表，空白页返回 [BLANK_PAGE_MARKER]
+    """
+    if not os.path.exists(image_path):
+        raise FileNotFoundError(f"图片文件不存在: {image_path}")
+    if skip_blank is None:
+        skip_blank = blank_filter.SKIP_BLANK_PAGES
+
+    image_name = os.path.splitext(os.path.basename(image_path))[0]
+    save_path = os.path.join(output_dir, image_name)
+    os.makedirs(save_path, exist_ok=True)
+
+    img_array = load_image_array(image_path)
+    if skip_blank and is_blank_page(img_array)[0]:
+        save_ocr_results([], save_path, image_name, True, blank=True)
+        return [BLANK_PAGE_MARKER]
+
+    standard_results, stats = cascade_recognize(img_array, pipeline_config, server_config, threshold)
+    if print_result:
+        for item in standard_results:
+            print(f"文本: {item['text']}, 置信度: {item['score']:.4f}, 模型: {item['model']}")
+    print(f"{os.path.basename(image_path)}: 共 {stats['lines']} 行，升级 {stats['escalated']} 行，"
+          f"其中 {stats['improved']} 行采用server结果")
+    save_ocr_results(standard_results, save_path, image_name, is_using_fallback())
+    return extract_pure_texts(standard_results)
+
+
+def get_cascade_stats():
+    """
+    返回级联统计
+    {'pages': 页数, 'lines': 文本行数, 'escalated': 升级行数, 'improved': 采用server结果的行数, 'escalation_rate': 升级比例}
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    stats['escalation_rate'] = stats['escalated'] / float(stats['lines']) if stats['lines'] else 0.0
+    return stats
+
+
+def reset_cascade_stats():
+    """清零级联统计"""
+    with _stats_lock:
+        for key in _stats:
+            _stats[key] = 0
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="mobile模型优先、低置信度文本行升级到server模型的级联识别")
+    parser.add_argument("images", nargs="+", help="待识别的图片文件")
+    parser.add_argument("--output", default="output/cascade_results", help="结果保存目录")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_ESCALATION_THRESHOLD,
+                        help="低于该置信度的文本行使用server模型重新识别")
+    parser.add_argument("--server-rec-model-dir", default=None,
+                        help="server识别模型目录（PaddleOCR 2.x需要指定）")
+    parser.add_argument("--lang", default="ch", help="识别语言，如 ch、en、japan")
+    args = parser.parse_args()
+
+    server_config = {}
+    if args.server_rec_model_dir:
+        server_config['rec_model_dir'] = args.server_rec_model_dir
+    try:
+        check_server_stage(server_config)
+    except ValueError as e:
+        print(str(e))
+        sys.exit(2)
+
+    failed = 0
+    for image_path in args.images:
+        try:
+            ocr_image_cascade(image_path, output_dir=args.output, print_result=False,
+                              pipeline_config={'lang': args.lang}, server_config=server_config,
+                              threshold=args.threshold)
+        except Exception as e:
+            failed += 1
+            print(f"处理失败 {image_path}: {str(e)}")
+            traceback.print_exc()
+
+    stats = get_cascade_stats()
+    print(f"处理完成: 成功 {len(args.images) - failed} 张, 失败 {failed} 张")
+    print(f"共 {stats['lines']} 行，升级到server模型 {stats['escalated']} 行 "
+          f"({stats['escalation_rate']:.1%})，其中 {stats['improved']} 行采用server结果")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
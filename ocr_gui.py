@@ -14,7 +14,13 @@ from tkinter import filedialog, messagebox, ttk
 from PIL import Image, ImageTk
 from datetime import datetime
 # 导入PaddleOCR-VL相关模块
-from PaddleOCRVL_main import get_pipeline, ocr_image
+from batch_scheduler import CostProgress, format_eta, plan_batch
+from image_dedup import DedupIndex, config_namespace, confirm_duplicate, REUSE_DUPLICATE_RESULTS
+from layout_order import DEFAULT_LINE_THRESHOLD, GridIndex, block_bounds, order_text_blocks
+from result_writer import ResultWriter
+from supervised_pool import (
+    SupervisedPool, TaskTimeoutError, WorkerCrashedError, DEFAULT_TASK_TIMEOUT, DEFAULT_MAX_TASKS_PER_WORKER
+)
 
 class OCRGUI:
     def __init__(self, root):
@@ -33,11 +39,25 @@ class OCRGUI:
         self.output_dir = "output/gui_results"
         os.makedirs(self.output_dir, exist_ok=True)
         self.ocr_running = False
-        self.ocr_pipeline = None  # PaddleOCR-VL模型实例
+        self.worker_pool = None  # 受监管的OCR工作进程，模型在工作进程中加载
+        self.task_timeout = DEFAULT_TASK_TIMEOUT  # 单张图片超时时间（秒），超时的工作进程会被结束并重启
+        self.max_tasks_per_worker = DEFAULT_MAX_TASKS_PER_WORKER  # 工作进程处理多少张图片后重启
+        self.max_worker_rss_mb = None  # 工作进程常驻内存上限（MB），None表示不限制
+        self.result_writer = ResultWriter()  # 结果文件由后台线程写入，识别流程不等待磁盘I/O
+        self.write_errors = []  # 结果文件写入失败的 (图片, 错误信息) 列表
+        self.result_tickets = {}  # 图片路径 -> 本界面提交的文本结果写入状态
+        self.committed_results = set()  # 工作进程已报告结构化结果写入完成的图片路径
+        self.dedup_index = DedupIndex()  # 近似重复图片索引，用于标记（开启复用时复用）重复图片
+        self.reuse_duplicates = REUSE_DUPLICATE_RESULTS  # 是否复用经像素比对确认的重复图片结果，默认只标记
+        self.lang_var = tk.StringVar(value="ch")  # 识别语言，切换后按需加载对应模型
+        self.line_threshold = DEFAULT_LINE_THRESHOLD  # 行高阈值，可根据需要调整
         
         # 创建主框架
         self.create_widgets()
         
+        # 关闭窗口时结束OCR工作进程
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        
         # 初始化状态栏
         self.update_status("正在初始化OCR模型...")
         
@@ -70,6 +90,12 @@ class OCRGUI:
         export_btn = ttk.Button(control_frame, text="导出结果", command=self.export_results)
         export_btn.pack(side=tk.LEFT, padx=5)
         
+        # 识别语言选择
+        ttk.Label(control_frame, text="识别语言:").pack(side=tk.LEFT, padx=(15, 2))
+        lang_combo = ttk.Combobox(control_frame, textvariable=self.lang_var, width=8, state="readonly",
+                                  values=("ch", "en", "japan", "korean", "chinese_cht"))
+        lang_combo.pack(side=tk.LEFT, padx=2)
+        
         # 创建分割线
         ttk.Separator(self.root, orient=tk.HORIZONTAL).pack(fill=tk.X, padx=10)
         
@@ -281,8 +307,12 @@ class OCRGUI:
     def initialize_ocr(self):
         """初始化OCR模型"""
         try:
-            # 初始化PaddleOCR-VL模型
-            self.ocr_pipeline = get_pipeline()
+            # 启动OCR工作进程并在其中初始化PaddleOCR-VL模型
+            pool = SupervisedPool(num_workers=1, task_timeout=self.task_timeout,
+                                  max_tasks_per_worker=self.max_tasks_per_worker,
+                                  max_rss_mb=self.max_worker_rss_mb)
+            pool.start(wait_ready=True)
+            self.worker_pool = pool
             self.root.after(0, lambda: self.update_status("PaddleOCR-VL模型初始化完成，就绪"))
             self.root.after(0, lambda: self.start_btn.config(state=tk.NORMAL))
         except Exception as e:
@@ -290,6 +320,10 @@ class OCRGUI:
             self.root.after(0, lambda: messagebox.showerror("错误", error_msg))
             self.root.after(0, lambda: self.update_status("PaddleOCR-VL模型初始化失败"))
     
+    def get_pipeline_config(self):
+        """根据界面选项生成pipeline配置"""
+        return {'lang': self.lang_var.get()}
+    
     def start_recognition(self):
         """开始OCR识别"""
         if not self.selected_files:
@@ -300,7 +334,7 @@ class OCRGUI:
             messagebox.showinfo("提示", "识别正在进行中，请稍候")
             return
         
-        if self.ocr_pipeline is None:
+        if self.worker_pool is None:
             messagebox.showinfo("提示", "OCR模型正在初始化，请稍候...")
             return
         
@@ -320,10 +354,17 @@ class OCRGUI:
         failed_count = 0
         start_time = time.time()
         
-        for i, file_path in enumerate(self.selected_files, 1):
+        # 只读取文件头估计每个文件的成本，进度和剩余时间按成本计算
+        # 图片逐张交给单个工作进程识别，重排顺序不会缩短总耗时，因此保持用户选择的顺序
+        plan = plan_batch(self.selected_files, longest_first=False)
+        progress_tracker = CostProgress(sum(cost for _, _, cost in plan))
+        succeeded = set()  # 识别成功的图片（绝对路径），用于核对结果文件写入失败
+        
+        for i, (index, file_path, cost) in enumerate(plan, 1):
             # 更新状态
             filename = os.path.basename(file_path)
-            self.root.after(0, lambda msg=f"正在识别 {i}/{total_files}: {filename}": self.update_status(msg))
+            eta_text = format_eta(progress_tracker.eta())
+            self.root.after(0, lambda msg=f"正在识别 {i}/{total_files}: {filename}（{eta_text}）": self.update_status(msg))
             
             try:
                 # 直接调用OCR模型进行识别
@@ -331,9 +372,10 @@ class OCRGUI:
                 
                 if result:
                     success_count += 1
+                    succeeded.add(os.path.abspath(file_path))
                     
                     # 更新UI
-                    self.root.after(0, lambda idx=i: self.highlight_processed_file(idx))
+                    self.root.after(0, lambda idx=index + 1: self.highlight_processed_file(idx))
                 else:
                     failed_count += 1
                     
@@ -343,9 +385,24 @@ class OCRGUI:
                 print(error_msg)
             
             # 更新进度条
-            progress = (i / total_files) * 100
+            progress_tracker.complete(cost)
+            progress = progress_tracker.fraction * 100
             self.root.after(0, lambda p=progress: self.progress_var.set(p))
         
+        # 等待结果文件写完，写入失败的图片计为失败（按图片路径核对，只调整识别成功的图片）
+        self.result_writer.flush()
+        for written, errors in self.worker_pool.flush():
+            self.committed_results.update(written)
+            self.write_errors.extend(errors)
+        write_failures = {os.path.abspath(ticket.tag) for ticket in self.result_writer.pop_errors()}
+        write_failures.update(os.path.abspath(tag) for tag, _ in self.write_errors)
+        self.write_errors = []
+        if write_failures:
+            print(f"[警告] {len(write_failures)} 个图片的结果文件写入失败: {', '.join(sorted(map(str, write_failures)))}")
+            moved = len(write_failures & succeeded)
+            success_count -= moved
+            failed_count += moved
+        
         # 计算总耗时
         end_time = time.time()
         elapsed_time = end_time - start_time
@@ -379,10 +436,29 @@ class OCRGUI:
             output_dir = os.path.join(self.output_dir, image_name)
             os.makedirs(output_dir, exist_ok=True)
             
+            # 近似重复检测：同一模板的不同票据哈希也很接近，默认只标记重复来源并照常识别；
+            # 开启复用时还需像素比对确认内容相同才复用结果
+            # 按识别配置分别索引，切换语言后不会复用其他语言的结果；忽略该文件自己之前的结果
+            dedup_namespace = config_namespace(self.get_pipeline_config())
+            hash_value = self.dedup_index.compute_hash(image_path)
+            match = self.dedup_index.find(hash_value, dedup_namespace, exclude_path=image_path)
+            duplicate_of = None
+            if match is not None:
+                distance, source_path = match
+                duplicate_of = (source_path, distance)
+                if self.reuse_duplicates:
+                    same, worst = confirm_duplicate(image_path, source_path)
+                    if same and self.reuse_duplicate_result(image_path, source_path, output_dir, distance):
+                        return True
+                    if not same:
+                        print(f"哈希相近但像素比对不一致（最大分块差异 {worst:.1%}），重新识别: {image_path}")
+                else:
+                    print(f"疑似重复图片: {image_path} -> {source_path} (汉明距离: {distance})，照常识别")
+            
             print(f"正在处理图片: {image_path}")
             
             # 使用PaddleOCR-VL进行识别
-            # 这里我们直接调用PaddleOCRVL_main中的ocr_image函数进行识别
+            # 这里在受监管的工作进程中调用PaddleOCRVL_main中的ocr_image函数进行识别
             # 注意：ocr_image函数会自动保存markdown和json格式的结果到指定目录
             texts = []
             result = None
@@ -390,23 +466,23 @@ class OCRGUI:
             try:
                 # 确保ocr_image函数被正确调用
                 print(f"开始调用ocr_image函数处理: {image_path}")
-                result = ocr_image(image_path, output_dir=output_dir, print_result=True)  # 设为True获取详细日志
+                # 在受监管的工作进程中执行，超时或进程崩溃时抛出异常
+                # 工作进程返回结构化结果，JSON/Markdown文件由其后台线程写入
+                details = self.worker_pool.call(image_path, output_dir, self.get_pipeline_config(), True)
+                result = details.get('texts')
+                # 工作进程不等待结果文件写完，随后续结果报告此前提交的写入状态
+                self.committed_results.update(details.get('written') or [])
+                self.write_errors.extend(details.get('write_errors') or [])
+                if details.get('save_error'):
+                    self.write_errors.append((image_path, details['save_error']))
                 
                 # 调试：打印原始结果
                 print(f"ocr_image返回结果类型: {type(result)}")
                 print(f"ocr_image返回结果: {result}")
                 
-                # 尝试读取JSON格式的结果，获取位置信息
-                structured_results = []
-                json_result_path = os.path.join(output_dir, f"{image_name}_result.json")
-                if os.path.exists(json_result_path):
-                    try:
-                        import json
-                        with open(json_result_path, 'r', encoding='utf-8') as f:
-                            structured_results = json.load(f)
-                        print(f"成功加载结构化结果，共 {len(structured_results)} 个文本块")
-                    except Exception as json_error:
-                        print(f"读取JSON结果失败: {json_error}")
+                # 使用结构化结果中的位置信息
+                structured_results = details.get('results') or []
+                print(f"收到结构化结果，共 {len(structured_results)} 个文本块")
                 
                 # 如果有结构化结果（带位置信息），按位置排序
                 if structured_results:
@@ -450,6 +526,9 @@ class OCRGUI:
                             print(f"  转换为字符串: '{text_str[:50]}...'" if len(text_str) > 50 else f"  转换为字符串: '{text_str}'")
                         else:
                             texts = ["OCR识别结果为空字符串"]
+            except (TaskTimeoutError, WorkerCrashedError):
+                # 超时和工作进程崩溃记为识别失败
+                raise
             except Exception as e:
                 error_msg = f"OCR处理异常: {str(e)}"
                 print(error_msg)
@@ -462,24 +541,26 @@ class OCRGUI:
                 print("[CRITICAL] 未能提取任何文本内容")
                 texts = ["OCR处理未能提取文本，请查看日志获取详细信息"]
             
-            # 保存原始结果用于调试
-            try:
-                with open(os.path.join(output_dir, 'raw_results.txt'), 'w', encoding='utf-8') as f:
-                    f.write(str(result))
-            except Exception as e:
-                print(f"保存原始结果时出错: {str(e)}")
-            
-            # 保存结果到文件
+            # 保存原始结果（用于调试）和文本结果，由后台线程写入
             output_file = os.path.join(output_dir, "ocr_result.txt")
-            with open(output_file, 'w', encoding='utf-8') as f:
-                if texts:
-                    for text in texts:
-                        f.write(f"{text}\n")
-                else:
-                    # 如果没有识别到文本，尝试从原始结果提取
-                    f.write(str(result))
+            if texts:
+                content = ''.join(f"{text}\n" for text in texts)
+            else:
+                # 如果没有识别到文本，尝试从原始结果提取
+                content = str(result)
+            files = {
+                os.path.join(output_dir, 'raw_results.txt'): str(result),
+                output_file: content,
+            }
+            if duplicate_of is not None:
+                # 只标记疑似重复来源，结果仍来自本次识别
+                files[os.path.join(output_dir, "possible_duplicate_of.txt")] = (
+                    f"{duplicate_of[0]}\n汉明距离: {duplicate_of[1]}\n")
+            self.result_tickets[image_path] = self.result_writer.submit(files, tag=image_path)
             
-            print(f"识别完成，保存结果到: {output_file}")
+            print(f"识别完成，结果将保存到: {output_file}")
+            if result is not None:
+                self.dedup_index.add(hash_value, image_path, dedup_namespace)
             return True
             
         except Exception as e:
@@ -502,6 +583,45 @@ class OCRGUI:
             
             return False
     
+    def reuse_duplicate_result(self, image_path, source_path, output_dir, distance):
+        """复用近似重复图片的识别结果，并写入重复标记文件"""
+        source_name = os.path.splitext(os.path.basename(source_path))[0]
+        source_dir = os.path.join(self.output_dir, source_name)
+        source_result = os.path.join(source_dir, "ocr_result.txt")
+        # 不等待写入：来源图片是本次运行识别的，其文本结果和工作进程写入的结构化结果都已确认写完才复用，
+        # 否则目录中可能还是旧文件，直接重新识别
+        ticket = self.result_tickets.get(source_path)
+        if ticket is not None and not (ticket.ok and source_path in self.committed_results):
+            return False
+        if not os.path.exists(source_result):
+            return False
+        if any(tag == source_path for tag, _ in self.write_errors):
+            # 来源图片的结构化结果写入失败，目录中可能是旧文件，重新识别
+            return False
+        
+        try:
+            print(f"检测到近似重复图片: {image_path} -> {source_path} (汉明距离: {distance})，复用已有结果")
+            image_name = os.path.splitext(os.path.basename(image_path))[0]
+            # 复制文本结果和结构化结果
+            with open(source_result, 'r', encoding='utf-8') as f:
+                content = f.read()
+            with open(os.path.join(output_dir, "ocr_result.txt"), 'w', encoding='utf-8') as f:
+                f.write(content)
+            source_json = os.path.join(source_dir, f"{source_name}_result.json")
+            if os.path.exists(source_json):
+                with open(source_json, 'r', encoding='utf-8') as f:
+                    json_content = f.read()
+                with open(os.path.join(output_dir, f"{image_name}_result.json"), 'w', encoding='utf-8') as f:
+                    f.write(json_content)
+            # 标记重复来源
+            with open(os.path.join(output_dir, "duplicate_of.txt"), 'w', encoding='utf-8') as f:
+                f.write(f"{source_path}\n")
+                f.write(f"汉明距离: {distance}\n")
+            return True
+        except Exception as e:
+            print(f"复用重复图片结果失败，将重新识别: {str(e)}")
+            return False
+    
     def get_text_block_center_y(self, text_block):
         """计算文本块的中心y坐标，用于行分组"""
         try:
@@ -533,45 +653,12 @@ class OCRGUI:
             return 0
     
     def group_text_by_lines(self, text_blocks):
-        """根据y坐标将文本块分组为行"""
+        """按版面阅读顺序将文本块分组为行，多栏页面先按栏输出"""
         if not text_blocks:
             return []
         
-        # 复制一份并添加中心y坐标
-        blocks_with_y = []
-        for block in text_blocks:
-            if isinstance(block, dict) and 'text' in block:
-                y_center = self.get_text_block_center_y(block)
-                blocks_with_y.append((block, y_center))
-        
-        # 按y坐标排序
-        blocks_with_y.sort(key=lambda x: x[1])
-        
-        # 分组行，相似y坐标的文本块视为同一行
-        lines = []
-        current_line = []
-        current_y = None
-        line_threshold = 15  # 行高阈值，可根据需要调整
-        
-        for block, y in blocks_with_y:
-            if current_line == []:
-                current_line.append(block)
-                current_y = y
-            else:
-                # 如果当前文本块的y坐标与当前行的平均y坐标相差不大，则视为同一行
-                if abs(y - current_y) <= line_threshold:
-                    current_line.append(block)
-                else:
-                    # 否则开始新行
-                    lines.append(current_line)
-                    current_line = [block]
-                    current_y = y
-        
-        # 添加最后一行
-        if current_line:
-            lines.append(current_line)
-        
-        return lines
+        # 通过XY切分识别分栏和区块，分栏内部按y坐标分组为行
+        return order_text_blocks(text_blocks, line_threshold=self.line_threshold)
     
     def detect_table_structure(self, line_groups):
         """检测表格结构，返回表格行和列信息"""
@@ -594,16 +681,7 @@ class OCRGUI:
                 # 检查列对齐情况
                 avg_columns = sum(column_counts) / len(column_counts)
                 if avg_columns >= 2:  # 至少2列
-                    # 提取每列的平均x坐标位置
-                    max_columns = max(column_counts)
-                    avg_column_positions = []
-                    for col_idx in range(max_columns):
-                        col_positions = []
-                        for row_positions in column_positions:
-                            if col_idx < len(row_positions):
-                                col_positions.append(row_positions[col_idx])
-                        if col_positions:
-                            avg_column_positions.append(sum(col_positions) / len(col_positions))
+                    avg_column_positions = self.find_aligned_columns(line_groups)
                     
                     # 如果表格有足够的列，返回表格结构
                     if len(avg_column_positions) >= 2:
@@ -611,6 +689,52 @@ class OCRGUI:
         
         return False, [], []
     
+    def find_aligned_columns(self, line_groups):
+        """
+        通过网格索引查找左边缘对齐的文本块，把跨越至少两行的对齐组作为表格列
+        
+        返回:
+            各列左边缘的平均x坐标（从左到右）
+        """
+        rows = [line for line in line_groups if len(line) > 1]
+        bounds = []
+        row_of = []
+        for row_idx, line in enumerate(rows):
+            for block in line:
+                bounds.append(block_bounds(block))
+                row_of.append(row_idx)
+        if not bounds:
+            return []
+        
+        # 以左边缘线段登记，对齐查询只检查左边缘附近的网格，不再逐个比较所有文本块
+        tolerance = max(float(self.line_threshold), 1.0)
+        grid = GridIndex(cell_size=max(tolerance * 4, 16))
+        for idx, (x0, y0, _, y1) in enumerate(bounds):
+            grid.insert(idx, (x0, y0, x0, y1))
+        top = min(b[1] for b in bounds)
+        bottom = max(b[3] for b in bounds)
+        
+        column_of = {}
+        columns = []
+        for start in sorted(range(len(bounds)), key=lambda idx: bounds[idx][0]):
+            if start in column_of:
+                continue
+            column_of[start] = len(columns)
+            members = [start]
+            pending = [start]
+            while pending:
+                x = bounds[pending.pop()][0]
+                for other in grid.query((x - tolerance, top, x + tolerance, bottom)):
+                    if other not in column_of:
+                        column_of[other] = len(columns)
+                        members.append(other)
+                        pending.append(other)
+            columns.append(members)
+        
+        positions = [sum(bounds[idx][0] for idx in members) / len(members)
+                     for members in columns if len({row_of[idx] for idx in members}) >= 2]
+        return sorted(positions)
+    
     def format_table_text(self, line_groups, column_positions):
         """格式化表格文本，使用|分隔符"""
         table_lines = []
@@ -742,6 +866,22 @@ class OCRGUI:
                 messagebox.showerror("错误", f"导出失败: {str(e)}")
                 self.update_status("导出失败")
     
+    def on_close(self):
+        """关闭窗口：结束OCR工作进程并写完剩余结果文件"""
+        if self.ocr_running and not messagebox.askyesno("确认", "识别正在进行中，确定要退出吗？"):
+            return
+        self.update_status("正在关闭OCR工作进程...")
+        self.root.update_idletasks()
+        pool, self.worker_pool = self.worker_pool, None
+        if pool is not None:
+            try:
+                # 识别进行中时不等待当前图片完成
+                pool.close(timeout=5 if self.ocr_running else 60)
+            except Exception as e:
+                print(f"关闭OCR工作进程失败: {str(e)}")
+        self.result_writer.close()
+        self.root.destroy()
+    
     def update_status(self, message):
         """更新状态栏消息"""
         self.status_var.set(f"  {message}")
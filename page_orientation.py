@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+整页方向检测模块
+在缩小后的页面上用投影轮廓判断文字是横排（0°/180°）还是被旋转了90°，
+再从页面中取几条文本行交给方向分类器判断是否倒置，整页旋转到正向后
+关闭逐行方向分类。多栏页面的栏间空白也会让列投影起伏明显，因此判定为90°时
+还要用原方向裁剪的文本行交叉验证，原方向的文本行同样能被可靠分类时不旋转。
+绝大多数页面本来就是正向的，每行少调用一次分类模型；
+判断不确定或各行方向不一致的页面仍使用逐行分类。
+"""
+
+import threading
+import numpy as np
+from PIL import Image
+
+from blank_filter import _block_reduce, ink_threshold
+
+# 是否默认启用整页方向检测
+DETECT_PAGE_ORIENTATION = True
+# 判断前将图片长边缩小到不超过该尺寸
+ORIENTATION_CHECK_SIZE = 1024
+# 一个方向的投影轮廓起伏需达到另一方向的该倍数才认为文字方向明确
+PROFILE_RATIO = 1.5
+# 缩小后墨迹像素少于该数量时不做判断
+MIN_INK_PIXELS = 200
+# 交给方向分类器的文本行数量
+SAMPLE_LINES = 5
+# 分类结果置信度低于该值的文本行不参与投票
+CLS_MIN_SCORE = 0.9
+# 判定为倒置（或正向）需要的一致比例，介于两者之间视为混合方向
+FLIP_AGREEMENT = 0.8
+
+# 方向检测统计
+_stats = {'pages': 0, 'upright': 0, 'rotated_90': 0, 'rotated_180': 0, 'rotated_270': 0, 'fallback': 0}
+_stats_lock = threading.Lock()
+
+
+def _ink_mask(img_array, check_size=ORIENTATION_CHECK_SIZE):
+    """
+    缩小页面并二值化
+
+    返回:
+        (墨迹bool数组, 缩小倍数)
+    """
+    img = Image.fromarray(img_array)
+    if img.mode != 'L':
+        img = img.convert('L')
+    gray = np.asarray(img)
+    factor = max(1, int(np.ceil(max(gray.shape) / float(check_size))))
+    # 最小值池化保留细笔画
+    darkest, _ = _block_reduce(gray, factor)
+    background = float(np.median(darkest))
+    threshold, _ = ink_threshold(gray)
+    return darkest.astype(np.int16) < background - threshold, factor
+
+
+def _profile_score(profile):
+    """投影轮廓的起伏程度（变异系数的平方），与页面尺寸无关"""
+    mean = float(profile.mean())
+    if mean <= 0:
+        return 0.0
+    return float(profile.var()) / (mean * mean)
+
+
+def _sample_line_crops(img_array, ink, factor, count=SAMPLE_LINES):
+    """
+    根据行投影找出墨迹最多的几条文本行，从原图中裁剪出来
+
+    返回:
+        单行文本图片列表
+    """
+    rows = ink.sum(axis=1)
+    threshold = max(1, int(ink.shape[1] * 0.01))
+    bands = []
+    start = None
+    for y, value in enumerate(list(rows) + [0]):
+        if value >= threshold and start is None:
+            start = y
+        elif value < threshold and start is not None:
+            if y - start >= 2:
+                bands.append((int(rows[start:y].sum()), start, y))
+            start = None
+
+    crops = []
+    height, width = img_array.shape[:2]
+    for _, y0, y1 in sorted(bands, reverse=True)[:count]:
+        cols = np.nonzero(ink[y0:y1].any(axis=0))[0]
+        if cols.size == 0:
+            continue
+        pad = factor * 2
+        top, bottom = max(0, y0 * factor - pad), min(height, y1 * factor + pad)
+        left = max(0, int(cols[0]) * factor - pad)
+        # 分类器输入宽高比有限，过长的行只取开头一段
+        right = min(width, (int(cols[-1]) + 1) * factor + pad, left + (bottom - top) * 8)
+        if right - left > 2 and bottom - top > 2:
+            crops.append(np.ascontiguousarray(img_array[top:bottom, left:right]))
+    return crops
+
+
+def _confident_labels(cls_res):
+    """返回置信度足够的分类标签"""
+    return [str(label) for label, score in cls_res if float(score) >= CLS_MIN_SCORE]
+
+
+def _reads_as_lines(cls_res):
+    """多数裁剪图被置信地分类且方向一致时，认为它们是正常的横排文本行"""
+    labels = _confident_labels(cls_res)
+    if not cls_res or len(labels) < FLIP_AGREEMENT * len(cls_res):
+        return False
+    majority = max(labels.count(label) for label in set(labels))
+    return majority >= FLIP_AGREEMENT * len(labels)
+
+
+def _record(rotation, upright):
+    """更新统计"""
+    with _stats_lock:
+        _stats['pages'] += 1
+        if not upright:
+            _stats['fallback'] += 1
+        elif rotation == 0:
+            _stats['upright'] += 1
+        else:
+            _stats[f'rotated_{rotation}'] += 1
+
+
+def detect_page_orientation(img_array, pipeline):
+    """
+    检测整页方向
+
+    参数:
+        img_array: 图片数组
+        pipeline: 提供 text_classifier 的PaddleOCR实例
+
+    返回:
+        {'rotation': 需要逆时针旋转的角度(0/90/180/270), 'upright': 旋转后是否确定为正向,
+         'method': 'profile'/'classifier'/'fallback', 'reason': 说明}
+    """
+    classifier = getattr(pipeline, 'text_classifier', None)
+    if classifier is None:
+        return {'rotation': 0, 'upright': False, 'method': 'fallback', 'reason': '没有方向分类器'}
+
+    ink, factor = _ink_mask(img_array)
+    if int(ink.sum()) < MIN_INK_PIXELS:
+        return {'rotation': 0, 'upright': False, 'method': 'fallback', 'reason': '文字过少'}
+
+    # 横排文字的行投影起伏明显（行与行间距交替），列投影较平缓
+    row_score = _profile_score(ink.sum(axis=1))
+    col_score = _profile_score(ink.sum(axis=0))
+    unrotated_crops = []
+    if row_score >= PROFILE_RATIO * col_score:
+        rotation = 0
+    elif col_score >= PROFILE_RATIO * row_score:
+        rotation = 90
+        # 原方向的文本行留作交叉验证
+        unrotated_crops = _sample_line_crops(img_array, ink, factor)
+        img_array = np.rot90(img_array)
+        ink = np.rot90(ink)
+    else:
+        return {'rotation': 0, 'upright': False, 'method': 'fallback', 'reason': '投影方向不明确'}
+
+    crops = _sample_line_crops(img_array, ink, factor)
+    if not crops:
+        return {'rotation': 0, 'upright': False, 'method': 'fallback', 'reason': '未找到文本行'}
+    # 两组裁剪图合并为一次分类调用
+    _, cls_res, _ = classifier(crops + unrotated_crops)
+    cls_res = list(cls_res)
+    cls_res, unrotated_res = cls_res[:len(crops)], cls_res[len(crops):]
+    votes = _confident_labels(cls_res)
+    if not votes:
+        return {'rotation': 0, 'upright': False, 'method': 'fallback', 'reason': '分类置信度不足'}
+
+    if rotation == 90:
+        # 只有旋转后的文本行能被可靠分类、原方向的不能时，才认为页面被旋转了90°
+        if len(votes) < FLIP_AGREEMENT * len(crops):
+            return {'rotation': 0, 'upright': False, 'method': 'fallback', 'reason': '旋转后的文本行分类置信度不足'}
+        if _reads_as_lines(unrotated_res):
+            return {'rotation': 0, 'upright': False, 'method': 'fallback',
+                    'reason': '投影判断为旋转90°，但原方向的文本行也能被可靠分类（可能是多栏页面）'}
+
+    flipped = sum(1 for label in votes if label == '180') / float(len(votes))
+    if flipped >= FLIP_AGREEMENT:
+        rotation = (rotation + 180) % 360
+    elif flipped > 1 - FLIP_AGREEMENT:
+        return {'rotation': 0, 'upright': False, 'method': 'fallback', 'reason': '各行方向不一致'}
+    return {'rotation': rotation, 'upright': True, 'method': 'classifier',
+            'reason': f"投影 行/列 {row_score:.2f}/{col_score:.2f}，{len(votes)} 行中倒置比例 {flipped:.0%}"}
+
+
+def normalize_page(pipeline, img_array):
+    """
+    检测整页方向并旋转到正向
+
+    返回:
+        (旋转后的图片数组, 是否仍需逐行方向分类, 检测结果字典)
+        旋转后的识别坐标基于正向页面
+    """
+    try:
+        info = detect_page_orientation(img_array, pipeline)
+    except Exception as e:
+        info = {'rotation': 0, 'upright': False, 'method': 'fallback', 'reason': f"检测失败: {str(e)}"}
+    _record(info['rotation'], info['upright'])
+    if info['rotation']:
+        img_array = np.ascontiguousarray(np.rot90(img_array, k=info['rotation'] // 90))
+    return img_array, not info['upright'], info
+
+
+def get_page_orientation_stats():
+    """
+    返回方向检测统计
+    {'pages': 检测页数, 'upright': 正向页数, 'rotated_90'/'rotated_180'/'rotated_270': 整页旋转页数,
+     'fallback': 使用逐行分类的页数, 'line_cls_skip_rate': 关闭逐行分类的页面比例}
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    skipped = stats['pages'] - stats['fallback']
+    stats['line_cls_skip_rate'] = skipped / float(stats['pages']) if stats['pages'] else 0.0
+    return stats
+
+
+def reset_page_orientation_stats():
+    """清零方向检测统计"""
+    with _stats_lock:
+        for key in _stats:
+            _stats[key] = 0
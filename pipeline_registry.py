@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+OCR pipeline 注册表
+按配置（语言、方向分类器、检测尺寸限制、模型规格等）缓存已加载的PaddleOCR实例，
+空闲或超出内存限制时按LRU顺序卸载，初始化失败的配置按指数退避重试
+"""
+
+import gc
+import os
+import json
+import threading
+import time
+import traceback
+from collections import OrderedDict
+
+# 默认pipeline配置，与原先 PaddleOCR(use_angle_cls=True, lang='ch') 保持一致
+DEFAULT_CONFIG = {
+    'lang': 'ch',
+    'use_angle_cls': True,
+    'det_limit_side_len': None,
+    'model_variant': None,
+}
+
+# 支持的模型规格
+MODEL_VARIANTS = ('mobile', 'server')
+
+# 自动调优结果文件，可通过环境变量 OCR_TUNING_FILE 指定其他路径
+TUNING_FILE = os.environ.get(
+    'OCR_TUNING_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ocr_tuning.json')
+)
+# 调优结果中作用于pipeline构造参数的配置项
+TUNED_PIPELINE_KEYS = ('cpu_threads', 'rec_batch_num')
+
+# 已加载的调优结果缓存，None表示尚未读取
+_tuned_config = None
+
+# 全局注册表的默认限制，可分别通过环境变量 OCR_MEMORY_LIMIT_MB、OCR_IDLE_TIMEOUT、OCR_SWEEP_INTERVAL 覆盖，
+# 设为0表示不限制
+# 进程常驻内存超过该值(MB)时卸载最久未使用的pipeline（至少保留一个）
+DEFAULT_MEMORY_LIMIT_MB = 4096
+# pipeline空闲超过该秒数后卸载
+DEFAULT_IDLE_TIMEOUT = 1800.0
+# 后台检查空闲pipeline的间隔秒数
+DEFAULT_SWEEP_INTERVAL = 60.0
+
+
+def load_tuned_config(path=None, reload=False):
+    """
+    读取autotune保存的最佳配置
+    调优结果与当前机器的CPU核数不一致时忽略
+
+    返回:
+        最佳配置字典，例如 {'processes': 2, 'cpu_threads': 4, 'rec_batch_num': 16}；没有可用结果时返回空字典
+    """
+    global _tuned_config
+    if _tuned_config is not None and not reload and path is None:
+        return _tuned_config
+
+    path = path or TUNING_FILE
+    tuned = {}
+    if os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('cpu_count') not in (None, os.cpu_count()):
+                print(f"调优结果来自 {data.get('cpu_count')} 核机器，与当前机器不一致，已忽略: {path}")
+            else:
+                tuned = dict(data.get('best') or {})
+                print(f"已加载调优配置: {tuned}")
+        except Exception as e:
+            print(f"读取调优配置失败: {str(e)}")
+
+    if path == TUNING_FILE:
+        _tuned_config = tuned
+    return tuned
+
+
+def _read_rss_mb():
+    """读取当前进程的常驻内存(MB)，无法获取时返回None"""
+    try:
+        import psutil
+        return psutil.Process(os.getpid()).memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        # Linux下无需psutil也可以读取
+        with open('/proc/self/statm', 'r') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except Exception:
+        return None
+
+
+def _env_limit(name, default, environ=None):
+    """读取数值型环境变量，未设置时返回默认值，0或负数表示不限制（返回None）"""
+    environ = os.environ if environ is None else environ
+    value = environ.get(name)
+    if value is None or value.strip() == '':
+        return default
+    try:
+        value = float(value)
+    except ValueError:
+        print(f"环境变量 {name} 的值无效: {environ.get(name)}，使用默认值 {default}")
+        return default
+    return value if value > 0 else None
+
+
+def default_registry_settings(environ=None):
+    """
+    全局注册表的内存上限、空闲超时和后台检查间隔
+
+    返回:
+        {'memory_limit_mb', 'idle_timeout', 'sweep_interval'}，值为None表示不限制
+    """
+    return {
+        'memory_limit_mb': _env_limit('OCR_MEMORY_LIMIT_MB', DEFAULT_MEMORY_LIMIT_MB, environ),
+        'idle_timeout': _env_limit('OCR_IDLE_TIMEOUT', DEFAULT_IDLE_TIMEOUT, environ),
+        'sweep_interval': _env_limit('OCR_SWEEP_INTERVAL', DEFAULT_SWEEP_INTERVAL, environ),
+    }
+
+
+def normalize_config(config=None, **overrides):
+    """
+    合并默认配置、调优配置与用户配置，返回规范化后的配置字典
+    值为None的项表示使用PaddleOCR默认值
+    """
+    merged = dict(DEFAULT_CONFIG)
+    tuned = load_tuned_config()
+    for key in TUNED_PIPELINE_KEYS:
+        if tuned.get(key) is not None:
+            merged[key] = tuned[key]
+    if config:
+        merged.update(config)
+    merged.update(overrides)
+
+    variant = merged.get('model_variant')
+    if variant is not None and variant not in MODEL_VARIANTS:
+        raise ValueError(f"不支持的模型规格: {variant}，可选值: {', '.join(MODEL_VARIANTS)}")
+    return merged
+
+
+def config_key(config):
+    """将配置字典转换为可哈希的缓存键"""
+    return tuple(sorted((k, repr(v)) for k, v in config.items()))
+
+
+def _paddleocr_major_version():
+    """返回已安装paddleocr的主版本号，无法识别时返回None"""
+    try:
+        import paddleocr
+        return int(str(getattr(paddleocr, '__version__', '')).split('.')[0])
+    except Exception:
+        return None
+
+
+def build_paddleocr_kwargs(config):
+    """
+    将注册表配置转换为PaddleOCR构造参数
+    """
+    kwargs = {}
+    for key, value in config.items():
+        if value is None or key in ('model_variant', 'recognition_only'):
+            continue
+        kwargs[key] = value
+
+    variant = config.get('model_variant')
+    if variant is not None:
+        major = _paddleocr_major_version()
+        if major is not None and major >= 3:
+            # PaddleOCR 3.x 通过模型名称选择 mobile/server 模型
+            kwargs['text_detection_model_name'] = f"PP-OCRv5_{variant}_det"
+            kwargs['text_recognition_model_name'] = f"PP-OCRv5_{variant}_rec"
+        else:
+            # PaddleOCR 2.x 内置模型为mobile规格，server规格需要通过det_model_dir/rec_model_dir指定
+            if variant == 'server' and 'det_model_dir' not in kwargs and 'rec_model_dir' not in kwargs:
+                print("当前PaddleOCR版本需要通过det_model_dir/rec_model_dir指定server模型，将使用默认模型")
+    return kwargs
+
+
+def has_distinct_server_recognizer(config):
+    """
+    判断server规格的识别模型是否与默认的mobile模型不同：
+    PaddleOCR 3.x按模型名称选择，2.x必须通过rec_model_dir指定server识别模型
+    """
+    major = _paddleocr_major_version()
+    if major is not None and major >= 3:
+        return True
+    return bool((config or {}).get('rec_model_dir'))
+
+
+class _TextRecognizerAdapter:
+    """把PaddleOCR 3.x的TextRecognition模型包装为2.x text_recognizer的调用方式"""
+
+    def __init__(self, model, rec_batch_num=6):
+        self.model = model
+        self.rec_batch_num = rec_batch_num
+
+    def __call__(self, crops):
+        start = time.time()
+        results = self.model.predict(list(crops), batch_size=self.rec_batch_num)
+        rec_res = [(res['rec_text'], float(res['rec_score'])) for res in results]
+        return rec_res, time.time() - start
+
+
+class RecognitionOnlyPipeline:
+    """
+    只包含文字识别模型的pipeline，提供与PaddleOCR 2.x相同的text_recognizer接口，
+    供只需识别裁剪好的文本行的场景（例如模型级联的第二级）使用，不加载检测和方向分类模型
+    """
+
+    use_angle_cls = False
+
+    def __init__(self, text_recognizer):
+        self.text_recognizer = text_recognizer
+
+
+def create_recognition_pipeline(config):
+    """
+    按配置创建只用于识别裁剪文本行的pipeline
+    PaddleOCR 3.x只加载识别模型；2.x没有独立的识别模型接口，仍创建完整的PaddleOCR实例
+    """
+    major = _paddleocr_major_version()
+    if major is not None and major >= 3:
+        from paddleocr import TextRecognition
+        variant = config.get('model_variant') or 'mobile'
+        kwargs = {'model_name': f"PP-OCRv5_{variant}_rec"}
+        if config.get('rec_model_dir'):
+            kwargs['model_dir'] = config['rec_model_dir']
+        model = TextRecognition(**kwargs)
+        return RecognitionOnlyPipeline(_TextRecognizerAdapter(model, config.get('rec_batch_num') or 6))
+
+    from paddleocr import PaddleOCR
+    return PaddleOCR(**build_paddleocr_kwargs(config))
+
+
+class PipelineRegistry:
+    """
+    多配置pipeline缓存
+
+    参数:
+        max_pipelines: 最多同时保留的pipeline数量
+        memory_limit_mb: 进程内存上限(MB)，超出时卸载最久未使用的pipeline；None表示不限制
+        idle_timeout: pipeline空闲超过该秒数后被卸载；None表示不按空闲时间卸载
+        retry_base_delay: 初始化失败后的首次重试等待秒数，之后按指数增长
+        retry_max_delay: 重试等待的最大秒数
+        sweep_interval: 后台检查空闲pipeline的间隔秒数；None表示不启动后台线程，
+                        此时只在get()或evict_idle()时卸载，不再请求pipeline的进程不会释放空闲模型
+    """
+
+    def __init__(self, max_pipelines=2, memory_limit_mb=None, idle_timeout=None,
+                 retry_base_delay=5.0, retry_max_delay=300.0, factory=None, sweep_interval=None):
+        self.max_pipelines = max_pipelines
+        self.memory_limit_mb = memory_limit_mb
+        self.idle_timeout = idle_timeout
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.factory = factory or self._create_paddleocr
+
+        # 缓存键 -> {'pipeline', 'config', 'last_used'}，按最近使用顺序排列
+        self._entries = OrderedDict()
+        # 缓存键 -> {'attempts', 'next_retry', 'error'}
+        self._failures = {}
+        self._lock = threading.Lock()
+        # 每个配置独立的加载锁，避免同一配置被并发重复加载；配置被卸载时一并删除
+        self._loading_locks = {}
+        self._sweeper = None
+        self._sweeper_stop = threading.Event()
+        if sweep_interval is not None:
+            self.start_idle_sweeper(sweep_interval)
+
+    @staticmethod
+    def _create_paddleocr(config):
+        """使用标准PaddleOCR创建pipeline实例，配置中recognition_only为True时只创建识别模型"""
+        if config.get('recognition_only'):
+            return create_recognition_pipeline(config)
+        from paddleocr import PaddleOCR
+        print("成功导入PaddleOCR")
+        return PaddleOCR(**build_paddleocr_kwargs(config))
+
+    def get(self, config=None, **overrides):
+        """
+        获取指定配置的pipeline，未加载时创建
+
+        返回:
+            pipeline实例
+        """
+        config = normalize_config(config, **overrides)
+        key = config_key(config)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry['last_used'] = time.time()
+                self._entries.move_to_end(key)
+                if self.idle_timeout is not None:
+                    self._evict_locked(keep=key)
+                return entry['pipeline']
+
+            failure = self._failures.get(key)
+            if failure is not None and time.time() < failure['next_retry']:
+                wait = failure['next_retry'] - time.time()
+                raise RuntimeError(
+                    f"OCR初始化失败({failure['attempts']}次): {failure['error']}，请在{wait:.0f}秒后重试"
+                )
+            loading_lock = self._loading_locks.setdefault(key, threading.Lock())
+
+        with loading_lock:
+            # 等待期间可能已被其他线程加载完成
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry['last_used'] = time.time()
+                    self._entries.move_to_end(key)
+                    return entry['pipeline']
+
+                # 加载新模型前先按空闲时间和内存上限腾出空间
+                self._evict_locked()
+
+            print(f"正在初始化OCR模型, 配置: {config}")
+            try:
+                pipeline = self.factory(config)
+            except Exception as e:
+                with self._lock:
+                    failure = self._failures.get(key, {'attempts': 0})
+                    attempts = failure['attempts'] + 1
+                    delay = min(self.retry_max_delay, self.retry_base_delay * (2 ** (attempts - 1)))
+                    self._failures[key] = {
+                        'attempts': attempts,
+                        'next_retry': time.time() + delay,
+                        'error': str(e),
+                    }
+                error_msg = f"OCR初始化失败: {str(e)}"
+                print(f"{error_msg}，{delay:.0f}秒后允许重试")
+                traceback.print_exc()
+                raise RuntimeError(error_msg) from e
+
+            print("成功初始化标准PaddleOCR")
+            with self._lock:
+                self._failures.pop(key, None)
+                self._entries[key] = {
+                    'pipeline': pipeline,
+                    'config': config,
+                    'last_used': time.time(),
+                }
+                self._entries.move_to_end(key)
+                self._evict_locked(keep=key)
+            return pipeline
+
+    def _pop_entry_locked(self, key):
+        """移除一个已加载的pipeline及其加载锁，返回其配置，调用方需持有锁"""
+        lock = self._loading_locks.get(key)
+        # 加载锁被占用说明有线程正在等待或加载该配置，保留给它们使用
+        if lock is not None and not lock.locked():
+            del self._loading_locks[key]
+        return self._entries.pop(key)['config']
+
+    def _evict_locked(self, keep=None):
+        """按LRU顺序卸载pipeline，调用方需持有锁"""
+        evicted = []
+        now = time.time()
+
+        # 卸载空闲超时的pipeline
+        if self.idle_timeout is not None:
+            for key, entry in list(self._entries.items()):
+                if key != keep and now - entry['last_used'] > self.idle_timeout:
+                    evicted.append(self._pop_entry_locked(key))
+
+        # 超出数量上限
+        while len(self._entries) > max(1, self.max_pipelines):
+            key = next(iter(self._entries))
+            if key == keep:
+                break
+            evicted.append(self._pop_entry_locked(key))
+
+        if evicted:
+            gc.collect()
+
+        # 超出内存上限时继续卸载最久未使用的pipeline
+        if self.memory_limit_mb is not None:
+            while len(self._entries) > 1:
+                rss = _read_rss_mb()
+                if rss is None or rss <= self.memory_limit_mb:
+                    break
+                key = next(iter(self._entries))
+                if key == keep:
+                    break
+                evicted.append(self._pop_entry_locked(key))
+                gc.collect()
+
+        for config in evicted:
+            print(f"已卸载OCR模型: {config}")
+        return evicted
+
+    def evict_idle(self):
+        """主动卸载空闲超时或超出限制的pipeline"""
+        with self._lock:
+            return self._evict_locked()
+
+    def start_idle_sweeper(self, interval=60.0):
+        """
+        启动后台线程，每隔interval秒卸载一次空闲超时或超出限制的pipeline
+        不再调用get()的进程（例如长时间空闲的GUI工作进程）也能及时释放模型内存
+        """
+        if self._sweeper is not None and self._sweeper.is_alive():
+            return
+        self._sweeper_stop.clear()
+
+        def sweep():
+            while not self._sweeper_stop.wait(interval):
+                try:
+                    self.evict_idle()
+                except Exception:
+                    traceback.print_exc()
+
+        self._sweeper = threading.Thread(target=sweep, name="PipelineRegistrySweeper", daemon=True)
+        self._sweeper.start()
+
+    def stop_idle_sweeper(self):
+        """停止后台空闲检查线程"""
+        self._sweeper_stop.set()
+        if self._sweeper is not None:
+            self._sweeper.join()
+            self._sweeper = None
+
+    def clear(self):
+        """卸载全部pipeline并清除失败记录"""
+        with self._lock:
+            self._entries.clear()
+            self._failures.clear()
+            for key, lock in list(self._loading_locks.items()):
+                if not lock.locked():
+                    del self._loading_locks[key]
+        gc.collect()
+
+    @classmethod
+    def from_defaults(cls, **kwargs):
+        """使用default_registry_settings中的默认限制创建注册表，关键字参数优先"""
+        settings = default_registry_settings()
+        settings.update(kwargs)
+        return cls(**settings)
+
+    def loaded_configs(self):
+        """返回当前已加载的配置列表（最久未使用的在前）"""
+        with self._lock:
+            return [dict(entry['config']) for entry in self._entries.values()]
+
+    def failure_info(self, config=None, **overrides):
+        """返回指定配置的失败记录，没有失败时返回None"""
+        key = config_key(normalize_config(config, **overrides))
+        with self._lock:
+            failure = self._failures.get(key)
+            return dict(failure) if failure else None
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+结果文件后台写入模块
+识别线程只把待写入的文件内容放入有界队列，由后台线程批量写入磁盘，
+每个文件先写入同目录下的临时文件再原子重命名，读取方不会看到写了一半的结果。
+网络共享等慢速文件系统上的I/O不再阻塞模型推理。
+"""
+
+import os
+import queue
+import atexit
+import threading
+
+# 默认队列长度，队列满时提交方等待，限制未写入结果占用的内存
+DEFAULT_QUEUE_SIZE = 256
+# 后台线程每批最多写入的任务数
+DEFAULT_BATCH_SIZE = 32
+
+
+def atomic_write(path, content, encoding='utf-8', durable=False):
+    """
+    原子写入文件：先写同目录下的临时文件，再重命名为目标文件
+
+    参数:
+        path: 目标文件路径
+        content: 文本或字节内容
+        encoding: 文本编码
+        durable: 是否在重命名前把数据同步到磁盘
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = os.path.join(directory, f".{os.path.basename(path)}.{os.getpid()}.{threading.get_ident()}.tmp")
+    mode = 'wb' if isinstance(content, (bytes, bytearray)) else 'w'
+    try:
+        if mode == 'wb':
+            with open(tmp_path, mode) as f:
+                f.write(content)
+                if durable:
+                    f.flush()
+                    os.fsync(f.fileno())
+        else:
+            with open(tmp_path, mode, encoding=encoding) as f:
+                f.write(content)
+                if durable:
+                    f.flush()
+                    os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _fsync_directory(directory):
+    """同步目录项，保证重命名在断电后仍然有效（Windows下不支持，忽略）"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class WriteTicket:
+    """
+    一次提交的写入状态
+
+    属性:
+        tag: 提交时指定的标识（例如图片路径）
+        paths: 本次写入的文件路径列表
+        error: 写入失败时的异常对象，成功或尚未完成时为None
+    """
+
+    def __init__(self, tag, paths):
+        self.tag = tag
+        self.paths = list(paths)
+        self.error = None
+        self._done = threading.Event()
+
+    @property
+    def done(self):
+        """是否已写入完成（无论成功与否）"""
+        return self._done.is_set()
+
+    @property
+    def ok(self):
+        """是否已成功写入"""
+        return self._done.is_set() and self.error is None
+
+    def wait(self, timeout=None):
+        """等待写入完成，返回是否成功；超时返回False"""
+        if not self._done.wait(timeout):
+            return False
+        return self.error is None
+
+
+class ResultWriter:
+    """
+    后台结果写入器
+
+    参数:
+        max_queue: 队列长度上限
+        batch_size: 每批最多写入的任务数
+        durable: 是否在每批写入后同步文件和目录到磁盘
+    """
+
+    def __init__(self, max_queue=DEFAULT_QUEUE_SIZE, batch_size=DEFAULT_BATCH_SIZE, durable=False):
+        self.batch_size = max(1, int(batch_size))
+        self.durable = durable
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._errors = []
+        self._errors_lock = threading.Lock()
+        self._closed = False
+
+        # 统计信息
+        self.written = 0
+        self.failed = 0
+
+        self._thread = threading.Thread(target=self._run, name="ResultWriter", daemon=True)
+        self._thread.start()
+
+    def submit(self, files, tag=None):
+        """
+        提交一组文件写入
+
+        参数:
+            files: {文件路径: 文本或字节内容}
+            tag: 标识，写入失败时随错误一起返回
+
+        返回:
+            WriteTicket
+        """
+        if self._closed:
+            raise RuntimeError("结果写入器已关闭")
+        ticket = WriteTicket(tag, files.keys())
+        self._queue.put((ticket, dict(files)))
+        return ticket
+
+    def _run(self):
+        """后台线程：批量取出任务并写入"""
+        while True:
+            item = self._queue.get()
+            batch = [item]
+            # 不等待地取出队列中已有的任务，合并为一批
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = False
+            directories = set()
+            for entry in batch:
+                if entry is None:
+                    stop = True
+                    continue
+                ticket, files = entry
+                try:
+                    for path, content in files.items():
+                        atomic_write(path, content, durable=self.durable)
+                        directories.add(os.path.dirname(os.path.abspath(path)))
+                    self.written += 1
+                except Exception as e:
+                    ticket.error = e
+                    self.failed += 1
+                    print(f"写入结果文件失败 {ticket.tag or ''}: {str(e)}")
+                    with self._errors_lock:
+                        self._errors.append(ticket)
+                finally:
+                    ticket._done.set()
+
+            if self.durable:
+                for directory in directories:
+                    _fsync_directory(directory)
+
+            for _ in batch:
+                self._queue.task_done()
+            if stop:
+                return
+
+    def flush(self):
+        """等待已提交的写入全部完成"""
+        if self._thread.is_alive():
+            self._queue.join()
+
+    def pop_errors(self):
+        """返回并清空此前写入失败的WriteTicket列表"""
+        with self._errors_lock:
+            errors, self._errors = self._errors, []
+        return errors
+
+    def close(self):
+        """写完队列中剩余的任务后停止后台线程"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+
+# 进程内共享的默认写入器
+_default_writer = None
+_default_writer_lock = threading.Lock()
+
+
+def get_default_writer():
+    """获取进程内共享的默认写入器，首次调用时创建，进程退出前自动写完剩余结果"""
+    global _default_writer
+    with _default_writer_lock:
+        if _default_writer is None:
+            _default_writer = ResultWriter()
+            atexit.register(_default_writer.close)
+        return _default_writer
+
+
+def flush_default_writer():
+    """等待默认写入器写完已提交的结果（未创建时直接返回）"""
+    writer = _default_writer
+    if writer is not None:
+        writer.flush()
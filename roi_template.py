@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+固定版式文档的区域模板识别模块
+按模板中定义的命名区域裁剪图片，只对这些区域执行OCR，返回 字段->文本 字典
+
+模板文件为JSON格式，例如:
+{
+    "name": "增值税发票",
+    "reference_size": [2480, 1754],
+    "regions": [
+        {"name": "invoice_number", "box": [1800, 60, 2400, 140], "single_line": true},
+        {"name": "buyer", "box": [150, 300, 1200, 520]}
+    ]
+}
+box 为 [x1, y1, x2, y2]，坐标基于 reference_size；省略 reference_size 时按实际像素坐标处理。
+single_line 为 true 时表示该区域只包含一行文本，直接跳过文字检测，仅执行文字识别。
+"""
+
+import os
+import sys
+import json
+import argparse
+
+from PaddleOCRVL_main import (
+    get_pipeline, is_using_fallback, load_image_array, predict_array,
+    parse_ocr_output, recognize_crops
+)
+
+# 裁剪区域时向外扩展的像素，避免文字贴边影响识别
+DEFAULT_PADDING = 4
+
+
+def load_template(template_path):
+    """
+    读取并校验区域模板文件
+
+    返回:
+        模板字典
+    """
+    if not os.path.exists(template_path):
+        raise FileNotFoundError(f"模板文件不存在: {template_path}")
+
+    with open(template_path, 'r', encoding='utf-8') as f:
+        template = json.load(f)
+
+    regions = template.get('regions')
+    if not isinstance(regions, list) or not regions:
+        raise ValueError(f"模板中没有定义任何区域: {template_path}")
+
+    names = set()
+    for region in regions:
+        name = region.get('name')
+        box = region.get('box')
+        if not name:
+            raise ValueError("模板区域缺少name字段")
+        if name in names:
+            raise ValueError(f"模板区域名称重复: {name}")
+        if not isinstance(box, (list, tuple)) or len(box) != 4:
+            raise ValueError(f"区域 {name} 的box必须为 [x1, y1, x2, y2]")
+        if box[2] <= box[0] or box[3] <= box[1]:
+            raise ValueError(f"区域 {name} 的box坐标无效: {box}")
+        names.add(name)
+
+    reference_size = template.get('reference_size')
+    if reference_size is not None and (not isinstance(reference_size, (list, tuple)) or len(reference_size) != 2):
+        raise ValueError("reference_size必须为 [宽度, 高度]")
+
+    return template
+
+
+def get_region_crops(img_array, template, padding=DEFAULT_PADDING):
+    """
+    按模板裁剪图片区域
+
+    返回:
+        [(区域定义, 裁剪后的numpy数组), ...]
+    """
+    height, width = img_array.shape[:2]
+    reference_size = template.get('reference_size')
+    if reference_size:
+        scale_x = width / float(reference_size[0])
+        scale_y = height / float(reference_size[1])
+    else:
+        scale_x = scale_y = 1.0
+
+    crops = []
+    for region in template['regions']:
+        x1, y1, x2, y2 = region['box']
+        # 四条边使用相同的取整方式，缩放后区域不会向某一侧偏移
+        left = max(0, int(round(x1 * scale_x)) - padding)
+        top = max(0, int(round(y1 * scale_y)) - padding)
+        right = min(width, int(round(x2 * scale_x)) + padding)
+        bottom = min(height, int(round(y2 * scale_y)) + padding)
+        if right <= left or bottom <= top:
+            print(f"区域 {region['name']} 超出图片范围，已跳过")
+            crops.append((region, None))
+            continue
+        crops.append((region, img_array[top:bottom, left:right]))
+    return crops
+
+
+def _join_region_lines(standard_results):
+    """将区域内的多个文本块按从上到下、从左到右的顺序合并"""
+    def sort_key(item):
+        position = item.get('position') or []
+        points = [p for p in position if isinstance(p, (list, tuple)) and len(p) >= 2]
+        if not points:
+            return (0, 0)
+        return (min(p[1] for p in points), min(p[0] for p in points))
+
+    items = [item for item in standard_results if isinstance(item.get('text'), str)]
+    items.sort(key=sort_key)
+    return '\n'.join(item['text'] for item in items if item['text'].strip())
+
+
+def ocr_regions(image_path, template, output_dir=None, print_result=True, padding=DEFAULT_PADDING,
+                pipeline_config=None):
+    """
+    只对模板定义的区域执行OCR识别
+
+    参数:
+        image_path: 图片路径
+        template: 模板字典或模板文件路径
+        output_dir: 结果保存目录，为None时不保存
+        print_result: 是否打印识别结果
+        padding: 裁剪区域外扩像素
+        pipeline_config: pipeline配置字典，为None时使用默认配置
+
+    返回:
+        {字段名: 识别文本} 字典
+    """
+    if isinstance(template, str):
+        template = load_template(template)
+
+    if not os.path.exists(image_path):
+        raise FileNotFoundError(f"图片文件不存在: {image_path}")
+
+    pipeline = get_pipeline(pipeline_config)
+    using_fallback = is_using_fallback()
+    img_array = load_image_array(image_path)
+
+    fields = {}
+    region_crops = get_region_crops(img_array, template, padding)
+
+    # 单行区域合并为一批，仅执行文字识别
+    single_line = [(region, crop) for region, crop in region_crops if crop is not None and region.get('single_line')]
+    if single_line:
+        rec_results = recognize_crops(pipeline, [crop for _, crop in single_line])
+        for (region, _), (text, score) in zip(single_line, rec_results):
+            fields[region['name']] = text
+            if print_result:
+                print(f"{region['name']}: {text} (置信度: {score:.4f})")
+
+    # 多行区域在裁剪图上执行完整的检测+识别
+    for region, crop in region_crops:
+        name = region['name']
+        if crop is None:
+            fields[name] = ""
+            continue
+        if region.get('single_line'):
+            continue
+        output = predict_array(pipeline, crop, using_fallback)
+        standard_results = parse_ocr_output(output, using_fallback, print_result=False)
+        fields[name] = _join_region_lines(standard_results)
+        if print_result:
+            print(f"{name}: {fields[name]}")
+
+    # 按模板中的区域顺序输出
+    fields = {region['name']: fields.get(region['name'], "") for region in template['regions']}
+
+    if output_dir is not None:
+        image_name = os.path.splitext(os.path.basename(image_path))[0]
+        save_path = os.path.join(output_dir, image_name)
+        os.makedirs(save_path, exist_ok=True)
+        fields_path = os.path.join(save_path, f"{image_name}_fields.json")
+        with open(fields_path, 'w', encoding='utf-8') as f:
+            json.dump(fields, f, ensure_ascii=False, indent=2)
+        if print_result:
+            print(f"[完成] 字段结果已保存到 {fields_path}")
+
+    return fields
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="按区域模板识别固定版式文档")
+    parser.add_argument("template", help="区域模板JSON文件")
+    parser.add_argument("images", nargs="+", help="待识别的图片文件")
+    parser.add_argument("--output", default="output/fields", help="结果保存目录")
+    parser.add_argument("--lang", default="ch", help="识别语言，如 ch、en、japan")
+    args = parser.parse_args()
+
+    try:
+        template = load_template(args.template)
+    except Exception as e:
+        print(f"加载模板失败: {str(e)}")
+        sys.exit(1)
+
+    failed = 0
+    for image_path in args.images:
+        try:
+            ocr_regions(image_path, template, output_dir=args.output, pipeline_config={'lang': args.lang})
+        except Exception as e:
+            failed += 1
+            print(f"处理失败 {image_path}: {str(e)}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
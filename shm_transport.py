@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基于共享内存的图片传输模块
+解码进程先读取文件头确定解码后的大小，再将图片直接解码到固定数量的共享内存槽中，
+队列中只传递形状/类型/偏移等元数据，
+推理进程以零拷贝方式把共享内存包装为NumPy视图进行识别，识别完成后槽位回收复用。
+槽位数量固定，解码进度领先推理过多时解码进程会阻塞等待，从而限制内存占用；
+解码后超过槽位大小的图片直接报错，不会绕过槽位占用额外内存。
+
+需要 Python 3.8 及以上版本（multiprocessing.shared_memory）
+"""
+
+import os
+import sys
+import time
+import queue
+import argparse
+import traceback
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+from PIL import Image
+
+# 默认槽位数量和单个槽位大小
+DEFAULT_SLOT_COUNT = 4
+DEFAULT_SLOT_MB = 64
+# 解码后逐段复制到槽位时每段的行数，限制临时内存
+DECODE_STRIP_ROWS = 256
+
+
+class SharedFramePool:
+    """
+    固定槽位的共享内存图片池
+
+    参数:
+        slot_count: 槽位数量
+        slot_bytes: 每个槽位的字节数，需不小于单张解码后图片的大小
+        ctx: multiprocessing上下文
+    """
+
+    def __init__(self, slot_count=DEFAULT_SLOT_COUNT, slot_bytes=DEFAULT_SLOT_MB * 1024 * 1024, ctx=None):
+        ctx = ctx or multiprocessing.get_context('spawn')
+        self.slot_count = slot_count
+        self.slot_bytes = slot_bytes
+        self.shm = shared_memory.SharedMemory(create=True, size=slot_count * slot_bytes)
+        self.name = self.shm.name
+        self._owner = True
+        self.free_slots = ctx.Queue()
+        for slot in range(slot_count):
+            self.free_slots.put(slot)
+
+    def __getstate__(self):
+        # 传递给子进程时只传递名称和空闲槽队列，由子进程重新挂载
+        return {
+            'name': self.name,
+            'slot_count': self.slot_count,
+            'slot_bytes': self.slot_bytes,
+            'free_slots': self.free_slots,
+        }
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.shm = shared_memory.SharedMemory(name=self.name)
+        # 子进程只挂载，不负责删除共享内存
+        self._owner = False
+
+    def acquire(self, timeout=None):
+        """获取一个空闲槽位，没有空闲槽位时阻塞"""
+        return self.free_slots.get(timeout=timeout)
+
+    def release(self, slot):
+        """归还槽位"""
+        self.free_slots.put(slot)
+
+    def slot_array(self, slot, shape, dtype):
+        """
+        把槽位包装为指定形状的可写NumPy数组，用于直接解码到共享内存
+
+        返回:
+            (数组, 元数据字典 {'slot', 'shape', 'dtype', 'offset', 'nbytes'})
+        """
+        dtype = np.dtype(dtype)
+        nbytes = int(np.prod(shape)) * dtype.itemsize
+        if nbytes > self.slot_bytes:
+            raise ValueError(f"图片大小 {nbytes} 字节超过槽位大小 {self.slot_bytes} 字节")
+        offset = slot * self.slot_bytes
+        target = np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=offset)
+        return target, {
+            'slot': slot,
+            'shape': tuple(shape),
+            'dtype': dtype.str,
+            'offset': offset,
+            'nbytes': nbytes,
+        }
+
+    def write(self, slot, array):
+        """
+        将数组写入指定槽位
+
+        返回:
+            元数据字典 {'slot', 'shape', 'dtype', 'offset', 'nbytes'}
+        """
+        array = np.ascontiguousarray(array)
+        if array.nbytes > self.slot_bytes:
+            raise ValueError(f"图片大小 {array.nbytes} 字节超过槽位大小 {self.slot_bytes} 字节")
+        offset = slot * self.slot_bytes
+        target = np.ndarray(array.shape, dtype=array.dtype, buffer=self.shm.buf, offset=offset)
+        target[...] = array
+        del target
+        return {
+            'slot': slot,
+            'shape': array.shape,
+            'dtype': array.dtype.str,
+            'offset': offset,
+            'nbytes': array.nbytes,
+        }
+
+    def view(self, meta):
+        """按元数据把槽位包装为NumPy视图（不拷贝数据），使用完毕后需先释放视图再归还槽位"""
+        return np.ndarray(meta['shape'], dtype=np.dtype(meta['dtype']), buffer=self.shm.buf, offset=meta['offset'])
+
+    def close(self):
+        """关闭共享内存，创建方同时负责删除"""
+        self.shm.close()
+        if self._owner:
+            self.shm.unlink()
+
+
+def _decoded_layout(img):
+    """
+    只根据文件头计算解码后数组的形状和类型，与load_image_array的结果一致（RGBA转换为RGB）
+
+    返回:
+        (形状, dtype, 需要转换到的模式或None)
+    """
+    mode = 'RGB' if img.mode == 'RGBA' else None
+    probe = np.asarray(Image.new(mode or img.mode, (1, 1)))
+    return (img.height, img.width) + probe.shape[2:], probe.dtype, mode
+
+
+def decode_into(img, target, convert_mode=None, strip_rows=DECODE_STRIP_ROWS):
+    """按行分段把解码后的图片直接复制到目标数组（共享内存槽位），不生成整张图片大小的中间数组"""
+    img.load()
+    for top in range(0, img.height, strip_rows):
+        bottom = min(img.height, top + strip_rows)
+        strip = img.crop((0, top, img.width, bottom))
+        if convert_mode is not None:
+            strip = strip.convert(convert_mode)
+        target[top:bottom] = np.asarray(strip)
+
+
+def _decode_worker(pool, task_queue, frame_queue):
+    """
+    解码进程：读取文件头确定解码后的大小，获取槽位后把图片直接解码到共享内存中
+    """
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+        index, image_path = task
+        try:
+            with Image.open(image_path) as img:
+                shape, dtype, convert_mode = _decoded_layout(img)
+                nbytes = int(np.prod(shape)) * dtype.itemsize
+                if nbytes > pool.slot_bytes:
+                    # 超出槽位大小的图片不再绕过槽位传输，否则内存占用不受槽位数量限制
+                    raise ValueError(f"解码后 {nbytes} 字节超过共享内存槽位大小 {pool.slot_bytes} 字节，"
+                                     f"请增大 --slot-mb")
+                # 没有空闲槽位时在此阻塞，限制解码领先推理的图片数量
+                slot = pool.acquire()
+                try:
+                    target, meta = pool.slot_array(slot, shape, dtype)
+                    decode_into(img, target, convert_mode)
+                    del target
+                except Exception:
+                    pool.release(slot)
+                    raise
+            meta.update({'index': index, 'path': image_path})
+            frame_queue.put(meta)
+        except Exception as e:
+            frame_queue.put({'index': index, 'path': image_path, 'error': str(e)})
+    pool.shm.close()
+
+
+def run_shared_memory_batch(image_paths, output_dir="output", decode_workers=2, slot_count=DEFAULT_SLOT_COUNT,
+                            slot_mb=DEFAULT_SLOT_MB, print_result=True, pipeline_config=None):
+    """
+    使用独立解码进程和共享内存槽位批量识别图片
+
+    参数:
+        image_paths: 图片路径列表
+        output_dir: 结果保存目录
+        decode_workers: 解码进程数量
+        slot_count: 共享内存槽位数量
+        slot_mb: 单个槽位大小（MB）
+        print_result: 是否打印识别结果
+        pipeline_config: pipeline配置字典，为None时使用默认配置
+
+    返回:
+        {图片路径: 识别结果列表}，处理失败的图片对应的值为异常对象
+    """
+    from PaddleOCRVL_main import (
+        get_pipeline, is_using_fallback, predict_array, parse_ocr_output,
+        save_ocr_results, extract_pure_texts
+    )
+
+    pipeline = get_pipeline(pipeline_config)
+    using_fallback = is_using_fallback()
+    os.makedirs(output_dir, exist_ok=True)
+
+    # 主进程已加载Paddle，fork出的子进程继承其线程和锁状态并不可靠，与supervised_pool一样使用spawn
+    ctx = multiprocessing.get_context('spawn')
+    pool = SharedFramePool(slot_count, slot_mb * 1024 * 1024, ctx)
+    task_queue = ctx.Queue()
+    frame_queue = ctx.Queue()
+    for index, image_path in enumerate(image_paths):
+        task_queue.put((index, image_path))
+    decode_workers = max(1, min(decode_workers, len(image_paths)))
+    for _ in range(decode_workers):
+        task_queue.put(None)
+
+    workers = [ctx.Process(target=_decode_worker, args=(pool, task_queue, frame_queue), daemon=True)
+               for _ in range(decode_workers)]
+    for worker in workers:
+        worker.start()
+
+    results = {}
+    try:
+        for _ in range(len(image_paths)):
+            meta = None
+            while meta is None:
+                try:
+                    meta = frame_queue.get(timeout=1.0)
+                except queue.Empty:
+                    # 解码进程全部异常退出时不再等待
+                    if not any(worker.is_alive() for worker in workers) and frame_queue.empty():
+                        break
+            if meta is None:
+                print("解码进程已全部退出，剩余图片未能处理")
+                break
+            image_path = meta['path']
+            if 'error' in meta:
+                print(f"解码失败 {image_path}: {meta['error']}")
+                results[image_path] = RuntimeError(meta['error'])
+                continue
+
+            start = time.time()
+            try:
+                img_array = pool.view(meta)
+                try:
+                    output = predict_array(pipeline, img_array, using_fallback)
+                finally:
+                    # 识别完成后立即释放视图并归还槽位
+                    del img_array
+                    pool.release(meta['slot'])
+
+                standard_results = parse_ocr_output(output, using_fallback, print_result)
+                image_name = os.path.splitext(os.path.basename(image_path))[0]
+                save_path = os.path.join(output_dir, image_name)
+                os.makedirs(save_path, exist_ok=True)
+                save_ocr_results(standard_results, save_path, image_name, using_fallback, output)
+                results[image_path] = extract_pure_texts(standard_results)
+                print(f"[完成] {image_path}，耗时 {time.time() - start:.2f}秒")
+            except Exception as e:
+                print(f"识别失败 {image_path}: {str(e)}")
+                traceback.print_exc()
+                results[image_path] = e
+    finally:
+        for worker in workers:
+            worker.join(timeout=5)
+            if worker.is_alive():
+                worker.terminate()
+        pool.close()
+
+    for image_path in image_paths:
+        if image_path not in results:
+            results[image_path] = RuntimeError("解码进程异常退出")
+    return {image_path: results[image_path] for image_path in image_paths}
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="使用共享内存在解码进程与推理进程之间传递图片")
+    parser.add_argument("images", nargs="+", help="待识别的图片文件")
+    parser.add_argument("--output", default="output/shm_results", help="结果保存目录")
+    parser.add_argument("--decoders", type=int, default=2, help="解码进程数量")
+    parser.add_argument("--slots", type=int, default=DEFAULT_SLOT_COUNT, help="共享内存槽位数量")
+    parser.add_argument("--slot-mb", type=int, default=DEFAULT_SLOT_MB, help="单个槽位大小（MB）")
+    parser.add_argument("--lang", default="ch", help="识别语言，如 ch、en、japan")
+    args = parser.parse_args()
+
+    results = run_shared_memory_batch(args.images, output_dir=args.output, decode_workers=args.decoders,
+                                      slot_count=args.slots, slot_mb=args.slot_mb, print_result=False,
+                                      pipeline_config={'lang': args.lang})
+    failed = [path for path, result in results.items() if isinstance(result, Exception)]
+    print(f"处理完成: 成功 {len(results) - len(failed)} 张, 失败 {len(failed)} 张")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,550 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+受监管的OCR工作进程池
+每个工作进程一次只处理一张图片，主进程作为看门狗：
+- 单张图片超过超时时间仍未完成时，强制结束该工作进程并重新启动，超时记为失败
+- 工作进程崩溃退出时，当前图片记为失败并重新启动工作进程
+- 工作进程处理达到指定数量的图片或常驻内存超过上限后主动退出，由新进程接替，限制长时间运行的内存增长
+
+用法:
+    python supervised_pool.py 图片1.jpg 图片2.jpg ... --workers 2 --timeout 120 --max-tasks 200 --max-rss-mb 3000
+"""
+
+import os
+import sys
+import time
+import pickle
+import argparse
+import traceback
+import multiprocessing
+import multiprocessing.connection
+
+from batch_scheduler import plan_batch
+from pipeline_registry import _read_rss_mb
+
+# 默认单张图片超时时间（秒）
+DEFAULT_TASK_TIMEOUT = 300.0
+# 默认每个工作进程处理多少张图片后重启
+DEFAULT_MAX_TASKS_PER_WORKER = 200
+# 默认工作进程启动（加载模型）超时时间（秒）
+DEFAULT_START_TIMEOUT = 600.0
+# 默认等待工作进程执行收尾函数的超时时间（秒）
+DEFAULT_FLUSH_TIMEOUT = 120.0
+
+# 主进程要求工作进程执行收尾函数的消息
+_FLUSH = 'flush'
+
+
+class TaskTimeoutError(TimeoutError):
+    """单个任务超过超时时间未完成"""
+
+
+class WorkerCrashedError(RuntimeError):
+    """工作进程在处理任务时异常退出"""
+
+
+# 工作进程中尚未报告写入结果的 [(WriteTicket, 图片路径), ...]
+_unreported_writes = []
+
+
+def _report_writes(wait=False):
+    """
+    取出已写完的结果文件状态，wait为True时先等待全部写完
+
+    返回:
+        (写入成功的图片路径列表, 写入失败的 [(图片路径, 错误信息), ...])
+    """
+    written = []
+    errors = []
+    remaining = []
+    for ticket, image_path in _unreported_writes:
+        if wait:
+            ticket.wait()
+        if not ticket.done:
+            remaining.append((ticket, image_path))
+        elif ticket.ok:
+            written.append(image_path)
+        else:
+            errors.append((image_path, str(ticket.error)))
+    _unreported_writes[:] = remaining
+    return written, errors
+
+
+def ocr_task(image_path, output_dir, pipeline_config=None, return_details=False):
+    """
+    默认任务：在工作进程中调用ocr_image
+
+    返回:
+        纯文本结果列表；return_details为True时结果文件交给后台线程写入，返回结构化结果字典。
+        识别线程不等待写入完成，此前提交的结果中已写完的随本次结果一起报告：
+        written为结果文件已落盘的图片路径列表，write_errors为写入失败的 [(图片路径, 错误信息), ...]；
+        其余的在收尾函数（进程池flush、回收或关闭时）中报告
+    """
+    from PaddleOCRVL_main import ocr_image
+    if not return_details:
+        return ocr_image(image_path, output_dir=output_dir, print_result=True, pipeline_config=pipeline_config)
+
+    from result_writer import get_default_writer
+    writer = get_default_writer()
+    details = ocr_image(image_path, output_dir=output_dir, print_result=True, pipeline_config=pipeline_config,
+                        writer=writer, return_details=True)
+    # 写入状态对象无法跨进程传递，记录下来之后按图片路径报告
+    ticket = details.pop('write_status', None)
+    if ticket is not None:
+        _unreported_writes.append((ticket, image_path))
+    # 失败的写入已通过写入状态对象跟踪，清空写入器自己的错误列表
+    writer.pop_errors()
+    if details.get('save_error') is not None:
+        details['save_error'] = str(details['save_error'])
+    details['written'], details['write_errors'] = _report_writes()
+    return details
+
+
+def load_pipeline(pipeline_config=None):
+    """默认初始化函数：在工作进程启动时预先加载模型"""
+    from PaddleOCRVL_main import get_pipeline
+    get_pipeline(pipeline_config)
+
+
+def flush_results():
+    """
+    默认收尾函数：写完后台队列中的结果文件
+
+    返回:
+        尚未报告的写入结果 (写入成功的图片路径列表, 写入失败的 [(图片路径, 错误信息), ...])
+    """
+    from result_writer import flush_default_writer
+    flush_default_writer()
+    return _report_writes(wait=True)
+
+
+def _portable_error(error):
+    """异常对象无法序列化时转换为RuntimeError"""
+    try:
+        pickle.dumps(error)
+        return error
+    except Exception:
+        return RuntimeError(f"{type(error).__name__}: {str(error)}")
+
+
+def _send(conn, message):
+    """向主进程发送消息，结果无法序列化时改为发送错误"""
+    try:
+        conn.send(message)
+    except (pickle.PicklingError, TypeError, AttributeError) as e:
+        kind, worker_id, task_id, _ = message
+        conn.send(('error', worker_id, task_id, RuntimeError(f"任务结果无法序列化: {str(e)}")))
+
+
+def _run_finalizer(finalizer):
+    """执行收尾函数并返回其结果，出错时返回None"""
+    if finalizer is None:
+        return None
+    try:
+        return finalizer()
+    except Exception:
+        traceback.print_exc()
+        return None
+
+
+def _worker_main(worker_id, conn, task_fn, initializer, init_args, finalizer, max_tasks, max_rss_mb):
+    """
+    工作进程主循环，通过独立的管道与主进程通信，消息格式: (类型, 工作进程编号, 任务编号, 内容)
+    """
+    try:
+        if initializer is not None:
+            initializer(*init_args)
+    except Exception as e:
+        traceback.print_exc()
+        _send(conn, ('init_error', worker_id, None, _portable_error(e)))
+        return
+    _send(conn, ('ready', worker_id, None, os.getpid()))
+
+    handled = 0
+    retire_reason = None
+    while retire_reason is None:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        if task == _FLUSH:
+            _send(conn, ('flushed', worker_id, None, _run_finalizer(finalizer)))
+            continue
+        task_id, args = task
+        try:
+            _send(conn, ('done', worker_id, task_id, task_fn(*args)))
+        except Exception as e:
+            traceback.print_exc()
+            _send(conn, ('error', worker_id, task_id, _portable_error(e)))
+
+        handled += 1
+        rss = _read_rss_mb()
+        if handled >= max_tasks:
+            retire_reason = f"已处理 {handled} 个任务"
+        elif max_rss_mb is not None and rss is not None and rss > max_rss_mb:
+            retire_reason = f"常驻内存 {rss:.0f}MB 超过上限 {max_rss_mb}MB"
+
+    # 子进程退出时不会执行atexit，需要显式收尾；收尾结果在主进程关闭管道前送回
+    report = _run_finalizer(finalizer)
+    try:
+        _send(conn, ('flushed', worker_id, None, report))
+        if retire_reason is not None:
+            _send(conn, ('retire', worker_id, None, retire_reason))
+    except (OSError, EOFError):
+        pass
+
+
+class SupervisedPool:
+    """
+    受监管的工作进程池
+
+    参数:
+        num_workers: 工作进程数量
+        task_fn: 任务函数，需为模块级函数（可被序列化），默认为ocr_task
+        initializer: 工作进程启动时调用的初始化函数，默认预先加载模型
+        init_args: 初始化函数参数
+        finalizer: 收尾函数，默认写完后台队列中的结果文件；在工作进程正常退出（包括回收）前和flush时调用，
+                   返回值（需可序列化，None除外）由flush返回
+        task_timeout: 单个任务超时时间（秒），None表示不限制
+        max_tasks_per_worker: 每个工作进程处理多少个任务后重启
+        max_rss_mb: 工作进程常驻内存上限（MB），超过后处理完当前任务即重启，None表示不限制
+        start_method: 进程启动方式，默认spawn（Paddle在fork后的子进程中并不可靠）
+        start_timeout: 工作进程启动（加载模型）超时时间（秒），运行中重启的工作进程超时后强制结束，
+                       已分配给它的任务记为超时；None表示不限制
+    """
+
+    def __init__(self, num_workers=1, task_fn=ocr_task, initializer=load_pipeline, init_args=(),
+                 finalizer=flush_results, task_timeout=DEFAULT_TASK_TIMEOUT, max_tasks_per_worker=DEFAULT_MAX_TASKS_PER_WORKER,
+                 max_rss_mb=None, start_method='spawn', start_timeout=DEFAULT_START_TIMEOUT):
+        self.num_workers = max(1, int(num_workers))
+        self.task_fn = task_fn
+        self.initializer = initializer
+        self.init_args = tuple(init_args)
+        self.finalizer = finalizer
+        self.task_timeout = task_timeout
+        self.max_tasks_per_worker = max(1, int(max_tasks_per_worker))
+        self.max_rss_mb = max_rss_mb
+        self.start_timeout = start_timeout
+        self.ctx = multiprocessing.get_context(start_method)
+
+        # 工作进程编号 -> {'process', 'conn', 'closed', 'ready', 'spawned', 'task_id', 'started'}
+        self._workers = {}
+        self._next_worker_id = 0
+        self._next_task_id = 0
+
+        # 统计信息
+        self.stats = {'spawned': 0, 'timeouts': 0, 'crashes': 0, 'recycled': 0}
+        # 尚未被flush取走的收尾函数返回值
+        self._finalizer_results = []
+
+    def _spawn_worker(self):
+        """启动一个新的工作进程"""
+        worker_id = self._next_worker_id
+        self._next_worker_id += 1
+        # 每个工作进程使用独立的管道；共享队列的锁可能被强制结束的进程占住，导致其他进程全部阻塞
+        parent_conn, child_conn = self.ctx.Pipe()
+        process = self.ctx.Process(
+            target=_worker_main,
+            args=(worker_id, child_conn, self.task_fn, self.initializer, self.init_args,
+                  self.finalizer, self.max_tasks_per_worker, self.max_rss_mb),
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        self._workers[worker_id] = {
+            'process': process, 'conn': parent_conn, 'closed': False, 'ready': False,
+            'spawned': time.time(), 'task_id': None, 'started': None,
+        }
+        self.stats['spawned'] += 1
+        return worker_id
+
+    def _kill_worker(self, worker_id):
+        """强制结束工作进程并移出进程池"""
+        worker = self._workers.pop(worker_id, None)
+        if worker is None:
+            return
+        process = worker['process']
+        if process.is_alive():
+            process.terminate()
+            process.join(2)
+            if process.is_alive():
+                process.kill()
+        process.join(2)
+        worker['conn'].close()
+
+    def _record_finalizer_result(self, payload):
+        """保存工作进程送回的收尾函数返回值"""
+        if payload is not None:
+            self._finalizer_results.append(payload)
+
+    def _retire_worker(self, worker_id, timeout=5):
+        """等待主动退出的工作进程结束，读取其退出前送回的收尾结果"""
+        worker = self._workers.pop(worker_id, None)
+        if worker is not None:
+            deadline = time.time() + timeout
+            while not worker['closed']:
+                try:
+                    if not worker['conn'].poll(max(0.0, deadline - time.time())):
+                        break
+                    kind, _, _, payload = worker['conn'].recv()
+                except (EOFError, OSError):
+                    break
+                if kind == 'flushed':
+                    self._record_finalizer_result(payload)
+            worker['process'].join(max(0.0, deadline - time.time()))
+            if worker['process'].is_alive():
+                worker['process'].terminate()
+            worker['conn'].close()
+
+    def _receive(self, timeout):
+        """等待任一工作进程的消息，返回消息列表"""
+        conns = {worker['conn']: worker_id for worker_id, worker in self._workers.items() if not worker['closed']}
+        if not conns:
+            time.sleep(timeout)
+            return []
+        messages = []
+        for conn in multiprocessing.connection.wait(list(conns), timeout):
+            try:
+                messages.append(conn.recv())
+            except (EOFError, OSError):
+                # 工作进程已退出，之后由存活检查处理
+                self._workers[conns[conn]]['closed'] = True
+        return messages
+
+    def start(self, wait_ready=True, timeout=DEFAULT_START_TIMEOUT):
+        """
+        启动工作进程；wait_ready为True时等待所有进程完成初始化，初始化失败时抛出RuntimeError
+        """
+        while len(self._workers) < self.num_workers:
+            self._spawn_worker()
+        if not wait_ready:
+            return
+        deadline = time.time() + timeout if timeout is not None else None
+        while not all(worker['ready'] for worker in self._workers.values()):
+            remaining = None if deadline is None else deadline - time.time()
+            if remaining is not None and remaining <= 0:
+                raise TaskTimeoutError(f"工作进程在 {timeout} 秒内未完成初始化")
+            messages = self._receive(min(1.0, remaining) if remaining else 1.0)
+            if not messages:
+                self._check_dead_idle_workers()
+            for kind, worker_id, _, payload in messages:
+                if kind == 'init_error':
+                    self._kill_worker(worker_id)
+                    raise RuntimeError(f"工作进程初始化失败: {payload}")
+                if kind == 'ready' and worker_id in self._workers:
+                    self._workers[worker_id]['ready'] = True
+
+    def _check_dead_idle_workers(self):
+        """重新启动空闲时意外退出的工作进程"""
+        for worker_id, worker in list(self._workers.items()):
+            if worker['task_id'] is None and not worker['process'].is_alive():
+                print(f"工作进程 {worker_id} 意外退出（退出码 {worker['process'].exitcode}），重新启动")
+                self._kill_worker(worker_id)
+                self._spawn_worker()
+
+    def imap_unordered(self, task_args):
+        """
+        分发任务并按完成顺序返回结果
+
+        参数:
+            task_args: 任务参数元组的可迭代对象
+
+        返回:
+            生成器，产生 (任务序号, 结果或异常对象)
+        """
+        pending = list(enumerate(task_args))
+        pending.reverse()
+        running = {}  # 任务编号 -> (任务序号, 参数)
+        self.start(wait_ready=False)
+
+        while pending or running:
+            # 把任务分配给空闲的工作进程
+            for worker_id, worker in list(self._workers.items()):
+                if not pending:
+                    break
+                if worker['task_id'] is None and worker['process'].is_alive() and not worker['closed']:
+                    index, args = pending.pop()
+                    task_id = self._next_task_id
+                    self._next_task_id += 1
+                    worker['task_id'] = task_id
+                    worker['started'] = None
+                    running[task_id] = (index, args)
+                    try:
+                        worker['conn'].send((task_id, tuple(args)))
+                    except (OSError, ValueError):
+                        # 管道已断开，任务重新排队，由存活检查重启进程
+                        pending.append(running.pop(task_id))
+                        worker['task_id'] = None
+                        worker['closed'] = True
+
+            for kind, worker_id, task_id, payload in self._receive(0.5):
+                worker = self._workers.get(worker_id)
+                if kind == 'ready' and worker is not None:
+                    worker['ready'] = True
+                    if worker['task_id'] is not None:
+                        # 初始化完成后才开始计算任务超时
+                        worker['started'] = time.time()
+                elif kind == 'init_error':
+                    print(f"工作进程 {worker_id} 初始化失败: {payload}")
+                    if worker is not None and worker['task_id'] is not None:
+                        yield running.pop(worker['task_id'])[0], RuntimeError(f"工作进程初始化失败: {payload}")
+                    self._kill_worker(worker_id)
+                    if pending or running:
+                        self._spawn_worker()
+                elif kind == 'flushed':
+                    self._record_finalizer_result(payload)
+                elif kind in ('done', 'error'):
+                    if task_id in running:
+                        yield running.pop(task_id)[0], payload
+                    if worker is not None and worker['task_id'] == task_id:
+                        worker['task_id'] = None
+                        worker['started'] = None
+                elif kind == 'retire' and worker is not None:
+                    print(f"工作进程 {worker_id} 回收: {payload}")
+                    self.stats['recycled'] += 1
+                    if worker['task_id'] in running:
+                        # 退出前刚分配给该进程的任务不会被处理，重新排队
+                        pending.append(running.pop(worker['task_id']))
+                    self._retire_worker(worker_id)
+                    self._spawn_worker()
+
+            # 看门狗：检查超时和崩溃
+            self._check_dead_idle_workers()
+            now = time.time()
+            for worker_id, worker in list(self._workers.items()):
+                task_id = worker['task_id']
+                if (not worker['ready'] and self.start_timeout is not None and worker['process'].is_alive()
+                        and now - worker['spawned'] > self.start_timeout):
+                    # 运行中重启的工作进程加载模型卡住时，任务超时不会开始计时，需要单独限制
+                    self.stats['timeouts'] += 1
+                    print(f"工作进程 {worker_id} 超过 {self.start_timeout} 秒未完成初始化，强制结束并重新启动")
+                    self._kill_worker(worker_id)
+                    self._spawn_worker()
+                    if task_id in running:
+                        yield running.pop(task_id)[0], TaskTimeoutError(
+                            f"工作进程初始化超时（超过 {self.start_timeout} 秒）")
+                    continue
+                if task_id is None:
+                    continue
+                if worker['started'] is None and worker['ready']:
+                    worker['started'] = now
+                if not worker['process'].is_alive():
+                    # 管道中可能还有退出前提交的结果，读完之后再判断
+                    if task_id not in running or not worker['closed']:
+                        continue
+                    self.stats['crashes'] += 1
+                    exitcode = worker['process'].exitcode
+                    print(f"工作进程 {worker_id} 异常退出（退出码 {exitcode}），重新启动")
+                    self._kill_worker(worker_id)
+                    self._spawn_worker()
+                    yield running.pop(task_id)[0], WorkerCrashedError(f"工作进程异常退出，退出码 {exitcode}")
+                elif (self.task_timeout is not None and worker['started'] is not None
+                      and now - worker['started'] > self.task_timeout):
+                    self.stats['timeouts'] += 1
+                    print(f"工作进程 {worker_id} 处理任务超过 {self.task_timeout} 秒，强制结束并重新启动")
+                    self._kill_worker(worker_id)
+                    self._spawn_worker()
+                    yield running.pop(task_id)[0], TaskTimeoutError(f"处理超时（超过 {self.task_timeout} 秒）")
+
+    def map(self, task_args):
+        """分发任务，按输入顺序返回结果列表，失败的任务对应异常对象"""
+        task_args = list(task_args)
+        results = [None] * len(task_args)
+        for index, result in self.imap_unordered(task_args):
+            results[index] = result
+        return results
+
+    def call(self, *args):
+        """执行单个任务并返回结果，任务失败、超时或工作进程崩溃时抛出对应异常"""
+        result = self.map([args])[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def flush(self, timeout=DEFAULT_FLUSH_TIMEOUT):
+        """
+        在空闲的工作进程中执行收尾函数（默认写完结果文件），不能与imap_unordered同时调用
+
+        返回:
+            收尾函数返回值的列表，包括此前回收或关闭的工作进程送回的结果
+        """
+        waiting = set()
+        for worker_id, worker in self._workers.items():
+            if (worker['task_id'] is None and worker['ready'] and not worker['closed']
+                    and worker['process'].is_alive()):
+                try:
+                    worker['conn'].send(_FLUSH)
+                    waiting.add(worker_id)
+                except (OSError, ValueError):
+                    worker['closed'] = True
+        deadline = time.time() + timeout if timeout is not None else None
+        while waiting:
+            remaining = None if deadline is None else deadline - time.time()
+            if remaining is not None and remaining <= 0:
+                print(f"等待工作进程收尾超过 {timeout} 秒，部分结果的写入状态未知")
+                break
+            for kind, worker_id, _, payload in self._receive(min(0.5, remaining) if remaining else 0.5):
+                if kind == 'flushed':
+                    self._record_finalizer_result(payload)
+                    waiting.discard(worker_id)
+            waiting = {worker_id for worker_id in waiting if worker_id in self._workers
+                       and not self._workers[worker_id]['closed'] and self._workers[worker_id]['process'].is_alive()}
+        results, self._finalizer_results = self._finalizer_results, []
+        return results
+
+    def close(self, timeout=60):
+        """通知工作进程退出并等待结束（包括写完后台队列中的结果文件），收尾结果之后仍可通过flush取走"""
+        for worker in self._workers.values():
+            try:
+                worker['conn'].send(None)
+            except Exception:
+                pass
+        for worker_id in list(self._workers):
+            self._retire_worker(worker_id, timeout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="在受监管的工作进程中批量识别图片")
+    parser.add_argument("images", nargs="+", help="待识别的图片文件")
+    parser.add_argument("--output", default="output/supervised_results", help="结果保存目录")
+    parser.add_argument("--workers", type=int, default=1, help="工作进程数量")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TASK_TIMEOUT, help="单张图片超时时间（秒）")
+    parser.add_argument("--max-tasks", type=int, default=DEFAULT_MAX_TASKS_PER_WORKER,
+                        help="每个工作进程处理多少张图片后重启")
+    parser.add_argument("--max-rss-mb", type=float, default=None, help="工作进程常驻内存上限（MB）")
+    parser.add_argument("--lang", default="ch", help="识别语言，如 ch、en、japan")
+    args = parser.parse_args()
+
+    pipeline_config = {'lang': args.lang}
+    failed = 0
+    with SupervisedPool(num_workers=args.workers, init_args=(pipeline_config,), task_timeout=args.timeout,
+                        max_tasks_per_worker=args.max_tasks, max_rss_mb=args.max_rss_mb) as pool:
+        # 多个工作进程时成本大的图片先分发，空闲的工作进程依次领取，避免超大文件排在最后
+        plan = plan_batch(args.images, longest_first=pool.num_workers > 1)
+        tasks = [(image_path, args.output, pipeline_config) for _, image_path, _ in plan]
+        for index, result in pool.imap_unordered(tasks):
+            image_path = plan[index][1]
+            if isinstance(result, Exception):
+                failed += 1
+                print(f"[失败] {image_path}: {str(result)}")
+            else:
+                print(f"[完成] {image_path}")
+        stats = pool.stats
+
+    print(f"处理完成: 成功 {len(args.images) - failed} 张, 失败 {failed} 张")
+    print(f"超时 {stats['timeouts']} 次, 崩溃 {stats['crashes']} 次, 回收 {stats['recycled']} 次")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""autotune 的标定进程超时、最佳配置选择和调优文件加载测试"""
+
+import os
+import json
+import time
+
+import pytest
+
+import autotune
+import pipeline_registry
+from autotune import run_trial, select_best
+from pipeline_registry import normalize_config
+
+
+def _fast_trial(image_paths, cpu_threads, rec_batch_num, pipeline_config, barrier, result_queue, load_timeout):
+    """假的标定进程：每张图片耗时10毫秒"""
+    barrier.wait(load_timeout)
+    start = time.time()
+    latencies = []
+    for _ in image_paths:
+        time.sleep(0.01)
+        latencies.append(0.01)
+    result_queue.put({'latencies': latencies, 'start': start, 'end': time.time(), 'error': None})
+
+
+def _hanging_trial(image_paths, cpu_threads, rec_batch_num, pipeline_config, barrier, result_queue, load_timeout):
+    barrier.wait(load_timeout)
+    time.sleep(60)
+
+
+def _crashing_trial(image_paths, cpu_threads, rec_batch_num, pipeline_config, barrier, result_queue, load_timeout):
+    os._exit(2)
+
+
+def test_run_trial_measures_all_images():
+    trial = run_trial(['a.png', 'b.png', 'c.png'], 2, 1, 6, trial_fn=_fast_trial)
+
+    assert 'error' not in trial
+    # 图片轮流分配给两个进程
+    assert trial['images'] == 3
+    assert trial['throughput'] > 0 and trial['p95_latency'] == pytest.approx(0.01)
+
+
+def test_run_trial_terminates_hung_workers():
+    start = time.time()
+    trial = run_trial(['a.png'], 1, 1, 6, load_timeout=1, run_timeout=1, trial_fn=_hanging_trial)
+
+    assert '超时' in trial['error']
+    assert trial['throughput'] == 0.0
+    assert time.time() - start < 30
+
+
+def test_run_trial_reports_crashed_workers():
+    trial = run_trial(['a.png'], 2, 1, 6, load_timeout=2, run_timeout=5, trial_fn=_crashing_trial)
+    assert '退出码 2' in trial['error']
+
+
+def test_select_best_prefers_throughput_within_latency_limit():
+    trials = [
+        {'processes': 1, 'throughput': 2.0, 'p95_latency': 0.5, 'images': 10},
+        {'processes': 2, 'throughput': 3.0, 'p95_latency': 2.0, 'images': 10},
+        {'processes': 4, 'throughput': 9.0, 'p95_latency': None, 'images': 0, 'error': '超时'},
+    ]
+    assert select_best(trials)['processes'] == 2
+    assert select_best(trials, max_p95=1.0)['processes'] == 1
+    # 没有配置满足延迟限制时忽略限制
+    assert select_best(trials, max_p95=0.1)['processes'] == 2
+    assert select_best(trials[2:]) is None
+
+
+def test_saved_tuning_is_loaded_by_normalize_config(tmp_path, monkeypatch):
+    tuning_file = str(tmp_path / 'ocr_tuning.json')
+    monkeypatch.setattr(pipeline_registry, 'TUNING_FILE', tuning_file)
+    monkeypatch.setattr(pipeline_registry, '_tuned_config', None)
+
+    def fake_run_trial(image_paths, processes, cpu_threads, rec_batch_num, pipeline_config=None, rounds=1):
+        return {'processes': processes, 'cpu_threads': cpu_threads, 'rec_batch_num': rec_batch_num,
+                'images': 4, 'throughput': float(processes * rec_batch_num), 'p95_latency': 0.1}
+
+    monkeypatch.setattr(autotune, 'run_trial', fake_run_trial)
+    best, trials = autotune.autotune(['a.png'], [1], [1], [6, 16], save_path=tuning_file)
+
+    assert best == {'processes': 1, 'cpu_threads': 1, 'rec_batch_num': 16}
+    assert len(trials) == 2
+    config = normalize_config({'lang': 'en'})
+    assert config['cpu_threads'] == 1 and config['rec_batch_num'] == 16 and config['lang'] == 'en'
+
+    # 其他机器上标定的结果不会被加载
+    with open(tuning_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    data['cpu_count'] = (os.cpu_count() or 1) + 1
+    with open(tuning_file, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    monkeypatch.setattr(pipeline_registry, '_tuned_config', None)
+    assert 'cpu_threads' not in normalize_config()
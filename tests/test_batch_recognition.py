@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""batch_recognition 跨图片批量识别测试"""
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+import PaddleOCRVL_main
+import batch_recognition
+from pipeline_registry import PipelineRegistry
+
+
+class FakeRecognizer:
+    def __init__(self):
+        self.rec_batch_num = 6
+        self.seen_batch_nums = []
+
+    def __call__(self, crops):
+        self.seen_batch_nums.append(self.rec_batch_num)
+        return [(f"w{crop.shape[1]}", 0.9) for crop in crops], 0.0
+
+
+class FakeStagedPipeline:
+    use_angle_cls = False
+    drop_score = 0.5
+
+    def __init__(self, config):
+        self.config = config
+        self.text_recognizer = FakeRecognizer()
+
+    def text_detector(self, img):
+        return np.array([[[10, 10], [110, 10], [110, 30], [10, 30]],
+                         [[10, 50], [60, 50], [60, 70], [10, 70]]], dtype=np.float32), 0.0
+
+
+def _write_page(path):
+    img = Image.new('RGB', (200, 100), 'white')
+    ImageDraw.Draw(img).rectangle([12, 12, 100, 28], fill='black')
+    img.save(path)
+
+
+def test_batch_size_does_not_load_a_second_pipeline(tmp_path, monkeypatch):
+    registry = PipelineRegistry(factory=FakeStagedPipeline)
+    monkeypatch.setattr(PaddleOCRVL_main, '_registry', registry)
+    paths = []
+    for idx in range(3):
+        path = str(tmp_path / f"page{idx}.png")
+        _write_page(path)
+        paths.append(path)
+
+    default_pipeline = PaddleOCRVL_main.get_pipeline({'lang': 'ch'})
+    results = batch_recognition.ocr_images_batched(paths, output_dir=str(tmp_path / 'out'), rec_batch_size=4,
+                                                   print_result=False, pipeline_config={'lang': 'ch'},
+                                                   skip_blank=False)
+
+    assert len(registry.loaded_configs()) == 1
+    recognizer = default_pipeline.text_recognizer
+    assert recognizer.seen_batch_nums == [4, 4]
+    assert recognizer.rec_batch_num == 6
+    assert [len(texts) for texts in results.values()] == [2, 2, 2]
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""batch_scheduler 成本估计、LPT调度和进度估计测试"""
+
+from PIL import Image
+
+import batch_scheduler
+from batch_scheduler import (CostProgress, estimate_cost, format_eta, plan_batch, probe_image,
+                             schedule_lpt, simulate_makespan)
+
+
+def _write(path, size, fmt='PNG'):
+    Image.new('RGB', size, 'white').save(path, format=fmt)
+    return str(path)
+
+
+def test_probe_reads_header_without_decoding(tmp_path, monkeypatch):
+    path = _write(tmp_path / 'page.png', (300, 200))
+
+    def fail_load(self):
+        raise AssertionError("不应解码像素数据")
+
+    monkeypatch.setattr(Image.Image, 'load', fail_load)
+    info = probe_image(path)
+
+    assert (info['width'], info['height'], info['format'], info['frames']) == (300, 200, 'PNG', 1)
+    assert info['error'] is None
+
+
+def test_unreadable_file_gets_only_the_fixed_overhead(tmp_path):
+    path = tmp_path / 'broken.png'
+    path.write_bytes(b'not an image')
+    info = probe_image(str(path))
+
+    assert info['error']
+    assert estimate_cost(info) == batch_scheduler.FILE_OVERHEAD_MEGAPIXELS
+
+
+def test_plan_batch_orders_longest_first_or_keeps_selection_order(tmp_path):
+    small = _write(tmp_path / 'small.png', (100, 100))
+    large = _write(tmp_path / 'large.png', (2000, 1500))
+    medium = _write(tmp_path / 'medium.png', (800, 600))
+
+    ordered = plan_batch([small, large, medium])
+    kept = plan_batch([small, large, medium], longest_first=False)
+
+    assert [index for index, _, _ in ordered] == [1, 2, 0]
+    assert [path for _, path, _ in kept] == [small, large, medium]
+    assert sorted(cost for _, _, cost in ordered) == sorted(cost for _, _, cost in kept)
+
+
+def test_lpt_balances_loads_and_beats_arrival_order():
+    costs = [1, 1, 1, 1, 1, 1, 6]
+
+    assignments, loads = schedule_lpt(costs, 2)
+
+    assert sorted(loads) == [6, 6]
+    assert sorted(i for worker in assignments for i in worker) == list(range(len(costs)))
+    assert simulate_makespan(costs, 2) == 9
+    assert simulate_makespan(sorted(costs, reverse=True), 2) == 6
+
+
+def test_cost_progress_and_eta():
+    progress = CostProgress(10)
+    assert progress.eta() is None
+    progress.start_time -= 4
+    progress.complete(2)
+
+    assert progress.fraction == 0.2
+    assert 15 <= progress.eta() <= 17
+    assert format_eta(None) == "剩余时间估算中"
+    assert format_eta(75) == "剩余约 1分15秒"
+    assert format_eta(3720) == "剩余约 1小时02分"
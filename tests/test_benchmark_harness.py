@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""benchmark_harness 字体回退和百分位统计测试"""
+
+import random
+
+from PIL import ImageFont
+
+import benchmark_harness
+from autotune import percentile
+
+
+def test_builtin_font_falls_back_on_old_pillow(monkeypatch):
+    original = ImageFont.load_default
+    calls = []
+
+    def old_load_default(*args, **kwargs):
+        calls.append(kwargs)
+        if kwargs:
+            raise TypeError("load_default() got an unexpected keyword argument 'size'")
+        return original()
+
+    monkeypatch.setattr(ImageFont, 'load_default', old_load_default)
+    font = benchmark_harness.load_font(None, 32)
+
+    assert font is not None
+    assert calls == [{'size': 32}, {}]
+
+
+def test_percentile_uses_nearest_rank():
+    values = [5.0, 1.0, 4.0, 2.0, 3.0]
+    assert percentile(values, 50) == 3.0
+    assert percentile(values, 95) == 5.0
+    assert percentile([], 95) == 0.0
+
+
+def test_rotated_documents_cover_quarter_turns():
+    rng = random.Random(0)
+    seen = {}
+    for _ in range(20):
+        img, truth = benchmark_harness.render_document('rotated', rng, None, ['alpha', 'beta', 'gamma'],
+                                                       page_size=(200, 300), font_size=12)
+        seen[truth['rotation']] = img.size
+    assert seen == {90: (300, 200), 180: (200, 300), 270: (300, 200)}
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""blank_filter 空白页判断测试：噪声、透印、浅色文字和深色背景"""
+
+import io
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+from blank_filter import is_blank_page
+
+
+def _page(background=245, ink=None, mirrored=False, blur=0, noise=0, jpeg_quality=None):
+    """生成A4（150dpi）页面，ink为文字灰度，None表示空白页"""
+    img = Image.new('L', (1240, 1754), background)
+    if ink is not None:
+        draw = ImageDraw.Draw(img)
+        font = ImageFont.load_default(size=20)
+        for row in range(20):
+            draw.text((120, 150 + row * 60), "The quick brown fox jumps over the lazy dog 0123", fill=ink, font=font)
+    if mirrored:
+        img = img.transpose(Image.FLIP_LEFT_RIGHT)
+    if blur:
+        img = img.filter(ImageFilter.GaussianBlur(blur))
+    if noise:
+        pixels = np.asarray(img).astype(np.float32) + np.random.RandomState(0).normal(0, noise, (1754, 1240))
+        img = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+    if jpeg_quality is not None:
+        buffer = io.BytesIO()
+        img.save(buffer, 'JPEG', quality=jpeg_quality)
+        img = Image.open(buffer)
+    return np.asarray(img.convert('RGB'))
+
+
+def test_clean_blank_page():
+    assert is_blank_page(_page())[0]
+
+
+def test_noisy_jpeg_blank_page():
+    blank, metrics = is_blank_page(_page(noise=12, jpeg_quality=60))
+    assert blank, metrics
+
+
+def test_bleed_through_is_blank():
+    # 背面文字透过纸张，模糊且只比背景暗20多
+    blank, metrics = is_blank_page(_page(ink=220, mirrored=True, blur=1.5, noise=4, jpeg_quality=70))
+    assert blank, metrics
+
+
+def test_faint_text_is_not_blank():
+    assert not is_blank_page(_page(ink=185))[0]
+    assert not is_blank_page(_page(ink=185, noise=6, jpeg_quality=70))[0]
+
+
+def test_dark_background():
+    assert is_blank_page(_page(background=40))[0]
+    assert not is_blank_page(_page(background=40, ink=200))[0]
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""folder_watcher 的写入检测和延迟统计测试"""
+
+import os
+import time
+
+from PIL import Image
+
+import folder_watcher
+from folder_watcher import FolderWatcher
+
+
+def test_latency_counts_from_file_arrival_not_first_scan(tmp_path, monkeypatch):
+    processed = []
+    monkeypatch.setattr(folder_watcher, 'ocr_image', lambda path, **kwargs: processed.append(path))
+    watch_dir = tmp_path / 'inbox'
+    watch_dir.mkdir()
+    path = str(watch_dir / 'scan.png')
+    Image.new('RGB', (20, 20), 'white').save(path)
+
+    # 文件到达后过了一段时间才被第一次扫描到
+    time.sleep(0.5)
+    watcher = FolderWatcher(str(watch_dir), output_dir=str(tmp_path / 'out'), settle_time=0, use_events=False)
+    assert watcher._scan() == []
+    ready = watcher._scan()
+    assert ready == [path]
+    watcher.process_file(path)
+
+    assert processed == [path]
+    assert watcher.latencies[0] >= 0.5
+    assert os.path.exists(os.path.join(watcher.done_dir, 'scan.png'))
+    assert watcher._arrivals == {}
+
+
+def test_file_still_being_written_is_not_ready(tmp_path):
+    watch_dir = tmp_path / 'inbox'
+    watch_dir.mkdir()
+    path = watch_dir / 'partial.png'
+    path.write_bytes(b'\x89PNG')
+    watcher = FolderWatcher(str(watch_dir), output_dir=str(tmp_path / 'out'), settle_time=0, use_events=False)
+    watcher._scan()
+    with open(path, 'ab') as f:
+        f.write(b'more')
+    assert watcher._scan() == []
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""frame_stream 帧差分和局部重新识别测试"""
+
+import numpy as np
+
+import PaddleOCRVL_main
+import frame_stream
+from frame_stream import FrameStreamOCR, changed_tiles, _tile_regions, _merge_regions
+from pipeline_registry import PipelineRegistry
+
+
+class FakeOcrPipeline:
+    """把输入中所有深色像素识别为一个文本框"""
+    use_angle_cls = False
+
+    def __init__(self, config):
+        pass
+
+    def ocr(self, img, cls=None):
+        ys, xs = np.nonzero(img.min(axis=2) < 128)
+        if not len(xs):
+            return [[]]
+        x0, y0, x1, y1 = int(xs.min()), int(ys.min()), int(xs.max()) + 1, int(ys.max()) + 1
+        box = [[x0, y0], [x1, y0], [x1, y1], [x0, y1]]
+        return [[[box, (f"{x1 - x0}x{y1 - y0}", 0.9)]]]
+
+
+def test_changed_tiles_marks_only_tiles_with_large_differences():
+    previous = np.zeros((64, 96, 3), dtype=np.uint8)
+    current = previous.copy()
+    current[40, 70] = 200   # 第1行第2列的块
+    current[5, 5] = 10      # 低于阈值的噪声
+
+    tiles = changed_tiles(previous, current, threshold=24, tile_size=32)
+
+    assert tiles.shape == (2, 3)
+    assert tiles.tolist() == [[False, False, False], [False, False, True]]
+
+
+def test_tile_regions_merge_adjacent_tiles_and_clip_to_frame():
+    tiles = np.array([[True, True, False],
+                      [False, False, False],
+                      [False, False, True]])
+
+    regions = _tile_regions(tiles, 32, (80, 90))
+
+    assert sorted(regions) == [(0, 0, 64, 32), (64, 64, 90, 80)]
+    assert _merge_regions([(0, 0, 10, 10), (5, 5, 20, 20), (30, 30, 40, 40)]) == [(0, 0, 20, 20),
+                                                                                  (30, 30, 40, 40)]
+
+
+def test_reused_frame_buffer_is_still_diffed(monkeypatch):
+    registry = PipelineRegistry(factory=FakeOcrPipeline)
+    monkeypatch.setattr(PaddleOCRVL_main, '_registry', registry)
+    frame_stream.reset_frame_stream_stats()
+    stream = FrameStreamOCR(pipeline_config={'use_angle_cls': False}, margin=0)
+
+    # 截图循环在同一个缓冲区里写入每一帧
+    buffer = np.full((128, 256, 3), 255, dtype=np.uint8)
+    first = stream.process(buffer)
+    assert first['full']
+
+    unchanged = stream.process(buffer)
+    assert not unchanged['full'] and unchanged['regions'] == [] and unchanged['recognized'] == 0
+
+    buffer[70:90, 200:230] = 0
+    changed = stream.process(buffer)
+    assert not changed['full']
+    assert changed['regions'] and changed['recognized'] == 1
+    assert changed['texts'] == ['30x20']
+    assert frame_stream.get_frame_stream_stats()['partial_frames'] == 1
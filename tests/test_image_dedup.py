@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""image_dedup 的BK树和去重索引测试"""
+
+import os
+import random
+
+from PIL import Image, ImageDraw, ImageFont
+
+import image_dedup
+from image_dedup import BKTree, DedupIndex, compute_dhash, config_namespace, hamming_distance
+
+
+def _page(text_offset=0):
+    img = Image.new('L', (400, 300), 255)
+    draw = ImageDraw.Draw(img)
+    for row in range(6):
+        draw.rectangle([40 + text_offset, 30 + row * 40, 300 + text_offset, 45 + row * 40], fill=0)
+    return img
+
+
+def test_bktree_search_matches_brute_force():
+    rng = random.Random(0)
+    tree = BKTree()
+    values = [rng.getrandbits(64) for _ in range(300)]
+    for idx, value in enumerate(values):
+        tree.add(value, idx)
+    query = values[17] ^ 0b1011
+    expected = sorted(idx for idx, value in enumerate(values) if hamming_distance(query, value) <= 10)
+    assert sorted(item for _, _, item in tree.search(query, 10)) == expected
+    assert len(tree) == 300
+
+
+def test_near_duplicate_images_have_close_hashes():
+    same = hamming_distance(compute_dhash(_page()), compute_dhash(_page().resize((410, 305))))
+    different = hamming_distance(compute_dhash(_page()), compute_dhash(_page(text_offset=60).rotate(90)))
+    assert same <= image_dedup.DEFAULT_HAMMING_THRESHOLD < different
+
+
+def test_find_excludes_own_path_and_separates_namespaces(tmp_path):
+    index = DedupIndex()
+    path = str(tmp_path / 'a.png')
+    hash_value = compute_dhash(_page())
+    ch = config_namespace({'lang': 'ch'})
+    index.add(hash_value, path, ch)
+
+    assert index.find(hash_value, ch)[1] == path
+    assert index.find(hash_value, ch, exclude_path=path) is None
+    assert index.find(hash_value, config_namespace({'lang': 'en'})) is None
+    assert config_namespace({'lang': 'ch', 'x': 1}) == config_namespace({'x': 1, 'lang': 'ch'})
+
+
+def test_ocr_image_dedup_caches_real_result(tmp_path, monkeypatch):
+    calls = []
+
+    def fake_ocr_image(image_path, **kwargs):
+        calls.append(image_path)
+        assert kwargs.get('return_details')
+        return {'texts': ['hello']}
+
+    monkeypatch.setattr(image_dedup, 'ocr_image', fake_ocr_image)
+    first, second = str(tmp_path / 'a.png'), str(tmp_path / 'b.png')
+    _page().save(first)
+    _page().save(second)
+    index = DedupIndex()
+
+    run = lambda path: image_dedup.ocr_image_dedup(path, str(tmp_path), print_result=False, index=index, reuse=True)
+    assert run(first) == (['hello'], None)
+    assert run(second) == (['hello'], first)
+    # 同一文件重新识别时不复用自己的结果
+    run(first)
+    assert calls == [first, first]
+
+
+def _invoice(seed, total):
+    """同一模板的票据，明细和金额随seed变化"""
+    rng = random.Random(seed)
+    img = Image.new('L', (1240, 1754), 255)
+    draw = ImageDraw.Draw(img)
+    font = ImageFont.load_default(size=28)
+    draw.rectangle([60, 60, 1180, 200], outline=0, width=4)
+    draw.text((400, 110), "INVOICE", fill=0, font=font)
+    for row in range(12):
+        y = 300 + row * 70
+        draw.line([60, y, 1180, y], fill=0, width=2)
+        draw.text((80, y + 20), f"item {rng.randint(100, 999)}", fill=0, font=font)
+        draw.text((900, y + 20), f"{rng.randint(1, 9999)}.00", fill=0, font=font)
+    draw.text((900, 1500), total, fill=0, font=font)
+    return img
+
+
+def test_same_template_invoices_are_not_merged(tmp_path, monkeypatch):
+    calls = []
+
+    def fake_ocr_image(image_path, **kwargs):
+        calls.append(image_path)
+        return {'texts': [os.path.basename(image_path)]}
+
+    monkeypatch.setattr(image_dedup, 'ocr_image', fake_ocr_image)
+    first, second = str(tmp_path / 'a.png'), str(tmp_path / 'b.png')
+    _invoice(1, "1234.00").save(first)
+    _invoice(2, "1284.00").save(second)
+    index = DedupIndex()
+
+    image_dedup.ocr_image_dedup(first, str(tmp_path), print_result=False, index=index, reuse=True)
+    result, source = image_dedup.ocr_image_dedup(second, str(tmp_path), print_result=False, index=index,
+                                                 reuse=True)
+
+    assert result == ['b.png']
+    assert calls == [first, second]
+    assert not image_dedup.confirm_duplicate(first, second)[0]
+    # 只有一个数字不同也不能复用
+    assert not image_dedup.confirm_duplicate(_invoice(1, "1234.00"), _invoice(1, "1284.00"))[0]
+
+
+def test_duplicates_are_only_flagged_by_default(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(image_dedup, 'ocr_image', lambda path, **kwargs: calls.append(path) or {'texts': ['x']})
+    first, second = str(tmp_path / 'a.png'), str(tmp_path / 'b.jpg')
+    _invoice(1, "1234.00").save(first)
+    _invoice(1, "1234.00").save(second, quality=70)
+    index = DedupIndex()
+
+    image_dedup.ocr_image_dedup(first, str(tmp_path), print_result=False, index=index)
+    assert image_dedup.ocr_image_dedup(second, str(tmp_path), print_result=False, index=index) == (['x'], first)
+    assert calls == [first, second]
+    # 重新压缩的同一页面可以通过像素比对确认
+    assert image_dedup.confirm_duplicate(first, second)[0]
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""job_queue 的多进程领取、租约接管和相对路径测试"""
+
+import os
+import time
+import multiprocessing
+
+import PaddleOCRVL_main
+from job_queue import JobQueue, job_output_dir, run_worker, STATUS_DONE, STATUS_DEAD, STATUS_LEASED
+
+
+def _record_process(image_path, output_dir, pipeline_config):
+    """假的识别函数：记录处理过的图片，文件名含bad的图片总是失败"""
+    if 'bad' in os.path.basename(image_path):
+        raise ValueError("无法识别")
+    if not os.path.exists(image_path):
+        raise FileNotFoundError(image_path)
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, 'processed.log'), 'a', encoding='utf-8') as f:
+        f.write(image_path + '\n')
+
+
+def _worker(db_path, output_dir, root):
+    run_worker(db_path, output_dir=output_dir, lease_seconds=1, max_attempts=2, poll_interval=0.1,
+               root=root, process_fn=_record_process)
+
+
+def _make_images(root, count):
+    paths = []
+    for i in range(count):
+        path = os.path.join(root, 'batch', f'page_{i:03d}.png')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        open(path, 'wb').close()
+        paths.append(path)
+    return paths
+
+
+def test_enqueue_stores_paths_relative_to_root(tmp_path):
+    root = tmp_path / 'share'
+    paths = _make_images(str(root), 2)
+    queue = JobQueue(str(tmp_path / 'queue.db'), root=str(root))
+    assert queue.enqueue(paths + paths) == 2
+
+    job = queue.lease('worker-a')
+    assert job['image_path'] == 'batch/page_000.png'
+
+    # 另一台机器上共享目录挂载在不同位置
+    other = JobQueue(str(tmp_path / 'queue.db'), root='/mnt/elsewhere')
+    assert other.resolve_path(job['image_path']) == os.path.join('/mnt/elsewhere', 'batch', 'page_000.png')
+
+
+def test_expired_lease_is_taken_over(tmp_path):
+    queue = JobQueue(str(tmp_path / 'queue.db'), lease_seconds=0.2)
+    queue.enqueue(_make_images(str(tmp_path), 1))
+    job = queue.lease('crashed')
+    assert queue.lease('other') is None
+
+    time.sleep(0.3)
+    taken = queue.lease('other')
+    assert taken['id'] == job['id']
+    assert taken['attempts'] == 2
+    # 原持有者的租约已失效，不能再提交结果
+    assert not queue.complete(job['id'], 'crashed', 'result')
+    assert queue.complete(taken['id'], 'other', 'result')
+
+
+def test_multiple_processes_drain_queue_exactly_once(tmp_path):
+    root = str(tmp_path / 'share')
+    output_dir = str(tmp_path / 'out')
+    os.makedirs(output_dir)
+    db_path = str(tmp_path / 'queue.db')
+    paths = _make_images(root, 60)
+    bad = os.path.join(root, 'batch', 'bad.png')
+    open(bad, 'wb').close()
+
+    queue = JobQueue(db_path, lease_seconds=1, max_attempts=2, root=root)
+    queue.enqueue(paths + [bad])
+    # 模拟崩溃的工作进程：领取任务后不再续约
+    orphan = queue.lease('crashed-worker')
+    assert orphan is not None
+
+    ctx = multiprocessing.get_context('spawn')
+    workers = [ctx.Process(target=_worker, args=(db_path, output_dir, root)) for _ in range(6)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join(timeout=120)
+        assert process.exitcode == 0
+
+    with open(os.path.join(output_dir, 'batch', 'processed.log'), encoding='utf-8') as f:
+        processed = f.read().split()
+    assert sorted(processed) == sorted(paths)
+
+    counts = queue.counts()
+    assert counts[STATUS_DONE] == 60
+    assert counts[STATUS_DEAD] == 1
+    assert counts[STATUS_LEASED] == 0
+    assert [job['image_path'] for job in queue.dead_jobs()] == ['batch/bad.png']
+
+
+def test_same_name_in_different_folders_gets_separate_results(tmp_path):
+    root = tmp_path / 'share'
+    paths = []
+    for folder in ('2023', '2024'):
+        path = root / folder / 'scan.png'
+        path.parent.mkdir(parents=True)
+        path.write_bytes(b'')
+        paths.append(str(path))
+    db_path = str(tmp_path / 'queue.db')
+    queue = JobQueue(db_path, root=str(root))
+    queue.enqueue(paths)
+    output_dir = str(tmp_path / 'out')
+
+    assert run_worker(db_path, output_dir=output_dir, root=str(root), process_fn=_record_process) == (2, 0)
+
+    for folder in ('2023', '2024'):
+        with open(os.path.join(output_dir, folder, 'processed.log'), encoding='utf-8') as f:
+            assert f.read().split() == [os.path.join(str(root), folder, 'scan.png')]
+    assert job_output_dir('out', '/data/scans/a.png') == os.path.join('out', 'data', 'scans')
+    assert job_output_dir('out', '../x/a.png') == os.path.join('out', 'x')
+
+
+def test_default_process_fails_job_when_results_are_not_saved(tmp_path, monkeypatch):
+    image = tmp_path / 'page.png'
+    image.write_bytes(b'')
+    monkeypatch.setattr(PaddleOCRVL_main, 'get_pipeline', lambda config=None: None)
+    monkeypatch.setattr(PaddleOCRVL_main, 'ocr_image',
+                        lambda *args, **kwargs: {'texts': ['x'], 'save_error': OSError("磁盘已满")})
+    db_path = str(tmp_path / 'queue.db')
+    queue = JobQueue(db_path, max_attempts=1)
+    queue.enqueue([str(image)])
+
+    assert run_worker(db_path, output_dir=str(tmp_path / 'out'), max_attempts=1) == (0, 1)
+    assert '磁盘已满' in queue.dead_jobs()[0]['last_error']
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""layout_order 的XY切分阅读顺序和网格索引测试"""
+
+from layout_order import GridIndex, block_bounds, order_text_blocks
+
+
+def _block(text, x0, y0, x1, y1):
+    return {'text': text, 'position': [[x0, y0], [x1, y0], [x1, y1], [x0, y1]]}
+
+
+def _texts(lines):
+    return [[block['text'] for block in sorted(line, key=lambda b: block_bounds(b)[0])] for line in lines]
+
+
+def test_two_columns_are_read_column_by_column_after_full_width_title():
+    blocks = [_block('标题', 50, 10, 550, 40)]
+    for row in range(4):
+        y = 80 + row * 30
+        blocks.append(_block(f'左{row}', 20, y, 280, y + 20))
+        blocks.append(_block(f'右{row}', 320, y, 580, y + 20))
+    blocks.append(_block('页脚', 50, 250, 550, 280))
+
+    lines = order_text_blocks(blocks)
+
+    assert _texts(lines) == [['标题'], ['左0'], ['左1'], ['左2'], ['左3'],
+                             ['右0'], ['右1'], ['右2'], ['右3'], ['页脚']]
+
+
+def test_table_columns_stay_in_rows():
+    blocks = []
+    for row in range(4):
+        y = 20 + row * 30
+        for col, x in enumerate((20, 120, 220)):
+            blocks.append(_block(f'{row}-{col}', x, y, x + 60, y + 20))
+
+    lines = order_text_blocks(blocks)
+
+    assert _texts(lines) == [[f'{row}-{col}' for col in range(3)] for row in range(4)]
+
+
+def test_single_column_keeps_line_grouping():
+    blocks = [_block('a', 10, 10, 100, 30), _block('b', 108, 12, 200, 32), _block('c', 10, 50, 100, 70)]
+
+    assert _texts(order_text_blocks(blocks)) == [['a', 'b'], ['c']]
+
+
+def test_blocks_without_text_or_position_are_handled():
+    assert order_text_blocks([]) == []
+    assert order_text_blocks([{'position': []}, 'x']) == []
+    assert block_bounds({'position': [30, 40, 10, 20]}) == (10.0, 20.0, 30.0, 40.0)
+    assert block_bounds({}) == (0.0, 0.0, 0.0, 0.0)
+
+
+def test_grid_index_query_returns_only_intersecting_items():
+    grid = GridIndex(cell_size=10)
+    grid.insert('a', (0, 0, 5, 5))
+    grid.insert('b', (25, 25, 45, 30))
+    grid.insert('c', (100, 100, 110, 110))
+
+    assert grid.query((4, 4, 30, 26)) == {'a', 'b'}
+    assert grid.query((50, 50, 90, 90)) == set()
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""model_cascade 两级级联测试"""
+
+import numpy as np
+import pytest
+
+import PaddleOCRVL_main
+import model_cascade
+import pipeline_registry
+from pipeline_registry import PipelineRegistry, RecognitionOnlyPipeline
+
+
+class FakeRecognizer:
+    def __init__(self, text, score):
+        self.text = text
+        self.score = score
+        self.calls = 0
+
+    def __call__(self, crops):
+        self.calls += 1
+        return [(self.text, self.score) for _ in crops], 0.0
+
+
+class FakeMobilePipeline:
+    use_angle_cls = False
+
+    def __init__(self):
+        self.text_recognizer = FakeRecognizer('m0bile', 0.6)
+
+    def text_detector(self, img):
+        return np.array([[[10, 10], [110, 10], [110, 30], [10, 30]]], dtype=np.float32), 0.0
+
+
+class FakePredictPipeline:
+    """PaddleOCR 3.x形式的整页结果，只有predict方法"""
+
+    def predict(self, img):
+        polys = [np.array([[10, 5], [150, 5], [150, 25], [10, 25]], dtype=np.int16),
+                 np.array([[10, 30], [150, 30], [150, 50], [10, 50]], dtype=np.int16)]
+        return [{'rec_texts': ['清晰', '模糊'], 'rec_scores': np.array([0.98, 0.41]), 'rec_polys': polys}]
+
+
+def _factory(configs, fast=FakeMobilePipeline):
+    def factory(config):
+        configs.append(config)
+        if config.get('recognition_only'):
+            return RecognitionOnlyPipeline(FakeRecognizer('server', 0.95))
+        return fast()
+    return factory
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    configs = []
+    registry = PipelineRegistry(factory=_factory(configs))
+    registry.created = configs
+    monkeypatch.setattr(PaddleOCRVL_main, '_registry', registry)
+    model_cascade.reset_cascade_stats()
+    return registry
+
+
+def test_paddleocr2_without_server_model_dir_is_rejected(registry, monkeypatch):
+    monkeypatch.setattr(pipeline_registry, '_paddleocr_major_version', lambda: 2)
+    img = np.full((60, 200, 3), 255, dtype=np.uint8)
+    with pytest.raises(ValueError, match="server"):
+        model_cascade.cascade_recognize(img)
+    assert registry.created == []
+
+
+def test_low_confidence_lines_use_recognition_only_server_stage(registry, monkeypatch):
+    monkeypatch.setattr(pipeline_registry, '_paddleocr_major_version', lambda: 2)
+    img = np.full((60, 200, 3), 255, dtype=np.uint8)
+    results, stats = model_cascade.cascade_recognize(img, server_config={'rec_model_dir': '/models/server_rec'})
+
+    assert stats == {'lines': 1, 'escalated': 1, 'improved': 1}
+    assert results[0]['text'] == 'server' and results[0]['model'] == 'server'
+    slow_config = registry.created[1]
+    assert slow_config['recognition_only'] is True
+    assert slow_config['model_variant'] == 'server'
+    assert slow_config['rec_model_dir'] == '/models/server_rec'
+
+
+def test_paddleocr3_builds_server_stage_without_model_dir(registry, monkeypatch):
+    monkeypatch.setattr(pipeline_registry, '_paddleocr_major_version', lambda: 3)
+    img = np.full((60, 200, 3), 255, dtype=np.uint8)
+    _, stats = model_cascade.cascade_recognize(img)
+
+    assert stats['improved'] == 1
+    assert registry.created[1]['recognition_only'] is True
+
+
+def test_confident_lines_do_not_load_server_stage(registry, monkeypatch):
+    monkeypatch.setattr(pipeline_registry, '_paddleocr_major_version', lambda: 3)
+    img = np.full((60, 200, 3), 255, dtype=np.uint8)
+    _, stats = model_cascade.cascade_recognize(img, threshold=0.5)
+
+    assert stats['escalated'] == 0
+    assert len(registry.created) == 1
+
+
+def test_paddleocr3_page_result_escalates_low_score_lines(monkeypatch):
+    monkeypatch.setattr(pipeline_registry, '_paddleocr_major_version', lambda: 3)
+    configs = []
+    monkeypatch.setattr(PaddleOCRVL_main, '_registry',
+                        PipelineRegistry(factory=_factory(configs, fast=FakePredictPipeline)))
+    img = np.full((60, 200, 3), 255, dtype=np.uint8)
+    results, stats = model_cascade.cascade_recognize(img)
+
+    assert stats == {'lines': 2, 'escalated': 1, 'improved': 1}
+    assert [(item['text'], item['model']) for item in results] == [('清晰', 'mobile'), ('server', 'server')]
+    assert results[0]['position'] == [[10, 5], [150, 5], [150, 25], [10, 25]]
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""ocr_image 与 ocr_input 共用识别流程的测试"""
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+import PaddleOCRVL_main
+from PaddleOCRVL_main import ocr_image, ocr_input
+from pipeline_registry import PipelineRegistry
+
+
+class FakeOcrPipeline:
+    use_angle_cls = False
+
+    def __init__(self, config):
+        self.texts = ['第一行', '第二行']
+
+    def ocr(self, img, cls=None):
+        return [[[[[0, 10 * i], [50, 10 * i], [50, 10 * i + 8], [0, 10 * i + 8]], (text, 0.9)]
+                 for i, text in enumerate(self.texts)]]
+
+
+def _write_page(path):
+    img = Image.new('RGB', (120, 60), 'white')
+    ImageDraw.Draw(img).rectangle([10, 10, 100, 40], fill='black')
+    img.save(path)
+    return np.array(img)
+
+
+def _use_fake_pipeline(monkeypatch):
+    registry = PipelineRegistry(factory=FakeOcrPipeline)
+    monkeypatch.setattr(PaddleOCRVL_main, '_registry', registry)
+    return registry
+
+
+def test_path_and_memory_inputs_give_the_same_details(tmp_path, monkeypatch):
+    _use_fake_pipeline(monkeypatch)
+    path = str(tmp_path / 'page.png')
+    img_array = _write_page(path)
+
+    from_path = ocr_image(path, output_dir=str(tmp_path / 'a'), print_result=False, skip_blank=False,
+                          return_details=True)
+    from_memory = ocr_input(img_array, name='page', output_dir=str(tmp_path / 'b'), skip_blank=False,
+                            return_details=True)
+
+    assert from_path['image_path'] == path
+    assert from_memory['image_path'] is None
+    for key in ('texts', 'results', 'blank', 'rotation', 'save_error'):
+        assert from_path[key] == from_memory[key]
+    assert (tmp_path / 'a' / 'page' / 'page_result.json').exists()
+    assert (tmp_path / 'b' / 'page' / 'page_result.json').exists()
+
+
+def test_ocr_image_keeps_its_placeholder_and_quiet_mode(tmp_path, monkeypatch):
+    registry = _use_fake_pipeline(monkeypatch)
+    path = str(tmp_path / 'page.png')
+    img_array = _write_page(path)
+    PaddleOCRVL_main.get_pipeline().texts = []
+
+    assert ocr_image(path, output_dir=str(tmp_path), print_result=False, skip_blank=False) is None
+    assert ocr_image(path, output_dir=str(tmp_path), skip_blank=False) == ["未识别到明确的文本内容"]
+    # 内存输入不保存结果，也不使用占位文本
+    assert ocr_input(img_array, skip_blank=False) == []
+    assert len(registry.loaded_configs()) == 1
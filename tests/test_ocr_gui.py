@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+"""ocr_gui 表格检测测试（不创建窗口）"""
+
+from layout_order import DEFAULT_LINE_THRESHOLD
+from ocr_gui import OCRGUI
+
+
+def _gui():
+    gui = object.__new__(OCRGUI)
+    gui.line_threshold = DEFAULT_LINE_THRESHOLD
+    return gui
+
+
+def _block(text, x0, y0, x1, y1):
+    return {'text': text, 'position': [[x0, y0], [x1, y0], [x1, y1], [x0, y1]]}
+
+
+def test_aligned_cells_form_table_columns():
+    rows = [[_block(f'{row}-{col}', x + (row % 2) * 3, 20 + row * 30, x + 60, 40 + row * 30)
+             for col, x in enumerate((20, 200, 400))] for row in range(4)]
+
+    is_table, lines, columns = _gui().detect_table_structure(rows)
+
+    assert is_table and lines == rows
+    assert [round(x) for x in columns] == [22, 202, 402]
+
+
+def test_unaligned_multi_block_lines_are_not_a_table():
+    rows = [[_block('a', 20, 20, 80, 40), _block('b', 150, 20, 300, 40)],
+            [_block('c', 90, 50, 140, 70), _block('d', 330, 50, 500, 70)]]
+
+    assert _gui().detect_table_structure(rows) == (False, [], [])
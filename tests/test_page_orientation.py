@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""page_orientation 整页方向检测测试"""
+
+import numpy as np
+
+from page_orientation import detect_page_orientation, _profile_score, _ink_mask
+
+
+class FakePipeline:
+    """假的方向分类器：宽扁的裁剪图视为正向文本行，其他形状置信度很低"""
+
+    def __init__(self):
+        self.batches = []
+
+    def text_classifier(self, crops):
+        self.batches.append(len(crops))
+        results = []
+        for crop in crops:
+            height, width = crop.shape[:2]
+            results.append(('0', 0.99) if width >= 3 * height else ('0', 0.4))
+        return crops, results, 0.0
+
+
+def _column_page():
+    """三栏正向页面：栏内行距很小，栏间空白很宽"""
+    page = np.full((900, 900, 3), 255, dtype=np.uint8)
+    for x0 in (40, 340, 640):
+        for y in range(40, 860, 22):
+            page[y:y + 20, x0:x0 + 100] = 0
+    return page
+
+
+def _rotated_page():
+    """单栏正向页面逆时针旋转90°"""
+    page = np.full((900, 700, 3), 255, dtype=np.uint8)
+    for y in range(60, 840, 60):
+        page[y:y + 20, 60:640] = 0
+    return np.ascontiguousarray(np.rot90(page, k=-1))
+
+
+def test_multi_column_page_is_not_rotated_on_projection_alone():
+    page = _column_page()
+    ink, _ = _ink_mask(page)
+    # 栏间空白让列投影起伏明显，单看投影会判定为旋转90°
+    assert _profile_score(ink.sum(axis=0)) >= 1.5 * _profile_score(ink.sum(axis=1))
+
+    pipeline = FakePipeline()
+    info = detect_page_orientation(page, pipeline)
+
+    assert info['rotation'] == 0
+    assert info['upright'] is False
+    assert '多栏' in info['reason']
+    assert len(pipeline.batches) == 1
+
+
+def test_rotated_page_is_detected_when_only_rotated_lines_classify():
+    info = detect_page_orientation(_rotated_page(), FakePipeline())
+
+    assert info['upright'] is True
+    assert info['rotation'] == 90
+
+
+def test_upright_page_needs_no_cross_check():
+    pipeline = FakePipeline()
+    info = detect_page_orientation(np.ascontiguousarray(np.rot90(_rotated_page())), pipeline)
+
+    assert (info['rotation'], info['upright']) == (0, True)
+    assert pipeline.batches == [5]
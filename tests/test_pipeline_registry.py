@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""pipeline_registry 的缓存、卸载和重试测试"""
+
+import time
+
+import pytest
+
+import PaddleOCRVL_main
+import pipeline_registry
+from pipeline_registry import PipelineRegistry, default_registry_settings
+
+
+class FakePipeline:
+    def __init__(self, config):
+        self.config = config
+
+
+def test_lru_eviction_drops_loading_locks():
+    registry = PipelineRegistry(max_pipelines=2, factory=FakePipeline)
+    for lang in ('ch', 'en', 'japan'):
+        registry.get({'lang': lang})
+    assert [c['lang'] for c in registry.loaded_configs()] == ['en', 'japan']
+    assert len(registry._loading_locks) == 2
+
+
+def test_cached_instance_is_reused():
+    registry = PipelineRegistry(factory=FakePipeline)
+    assert registry.get({'lang': 'ch'}) is registry.get(lang='ch')
+
+
+def test_idle_sweeper_frees_models_without_get_calls():
+    registry = PipelineRegistry(idle_timeout=0.05, factory=FakePipeline, sweep_interval=0.02)
+    try:
+        registry.get({'lang': 'ch'})
+        deadline = time.time() + 2
+        while registry.loaded_configs() and time.time() < deadline:
+            time.sleep(0.02)
+        assert registry.loaded_configs() == []
+        assert registry._loading_locks == {}
+    finally:
+        registry.stop_idle_sweeper()
+
+
+def test_failed_initialization_backs_off():
+    calls = []
+
+    def failing_factory(config):
+        calls.append(config)
+        raise OSError("模型文件缺失")
+
+    registry = PipelineRegistry(factory=failing_factory, retry_base_delay=60)
+    with pytest.raises(RuntimeError):
+        registry.get({'lang': 'ch'})
+    with pytest.raises(RuntimeError, match="秒后重试"):
+        registry.get({'lang': 'ch'})
+    assert len(calls) == 1
+    assert registry.failure_info({'lang': 'ch'})['attempts'] == 1
+
+
+@pytest.fixture
+def global_registry(monkeypatch):
+    """使用真实的全局注册表，只替换模型工厂"""
+    registry = PaddleOCRVL_main.get_registry()
+    registry.clear()
+    monkeypatch.setattr(registry, 'factory', FakePipeline)
+    yield registry
+    registry.clear()
+
+
+def test_global_registry_has_limits_enabled_by_default():
+    registry = PaddleOCRVL_main.get_registry()
+    assert registry.memory_limit_mb == pipeline_registry.DEFAULT_MEMORY_LIMIT_MB
+    assert registry.idle_timeout == pipeline_registry.DEFAULT_IDLE_TIMEOUT
+    assert registry._sweeper is not None and registry._sweeper.is_alive()
+
+    settings = default_registry_settings({'OCR_MEMORY_LIMIT_MB': '0', 'OCR_IDLE_TIMEOUT': '90',
+                                          'OCR_SWEEP_INTERVAL': 'abc'})
+    assert settings == {'memory_limit_mb': None, 'idle_timeout': 90.0,
+                        'sweep_interval': pipeline_registry.DEFAULT_SWEEP_INTERVAL}
+
+
+def test_global_registry_unloads_least_recent_pipeline_over_memory_limit(global_registry, monkeypatch):
+    monkeypatch.setattr(pipeline_registry, '_read_rss_mb', lambda: global_registry.memory_limit_mb + 1)
+    PaddleOCRVL_main.get_pipeline({'lang': 'ch'})
+    PaddleOCRVL_main.get_pipeline({'lang': 'en'})
+    assert [c['lang'] for c in global_registry.loaded_configs()] == ['en']
+
+
+def test_global_registry_unloads_idle_pipeline(global_registry, monkeypatch):
+    monkeypatch.setattr(global_registry, 'idle_timeout', 0.05)
+    PaddleOCRVL_main.get_pipeline({'lang': 'ch'})
+    time.sleep(0.1)
+    # 没有新的请求时由evict_idle（后台线程定期调用）卸载
+    assert [c['lang'] for c in global_registry.evict_idle()] == ['ch']
+    assert global_registry.loaded_configs() == []
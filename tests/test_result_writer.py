@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""result_writer 原子写入和工作进程写入错误回传测试"""
+
+import os
+import threading
+
+import pytest
+
+import PaddleOCRVL_main
+import result_writer
+import supervised_pool
+from result_writer import ResultWriter, atomic_write
+
+
+def test_atomic_write_replaces_file_without_leaving_temp_files(tmp_path):
+    path = tmp_path / 'out' / 'result.json'
+    atomic_write(str(path), '{"v": 1}')
+    atomic_write(str(path), b'{"v": 2}', durable=True)
+
+    assert path.read_bytes() == b'{"v": 2}'
+    assert os.listdir(path.parent) == ['result.json']
+
+
+def test_failed_write_keeps_previous_file_and_removes_temp(tmp_path, monkeypatch):
+    path = tmp_path / 'result.txt'
+    path.write_text('old', encoding='utf-8')
+
+    def broken_replace(src, dst):
+        raise OSError("共享目录已断开")
+
+    monkeypatch.setattr(os, 'replace', broken_replace)
+    with pytest.raises(OSError):
+        atomic_write(str(path), 'new')
+
+    assert path.read_text(encoding='utf-8') == 'old'
+    assert os.listdir(tmp_path) == ['result.txt']
+
+
+def test_writer_reports_failed_tickets_by_tag(tmp_path):
+    blocker = tmp_path / 'blocker'
+    blocker.write_text('', encoding='utf-8')
+    writer = ResultWriter()
+    try:
+        good = writer.submit({str(tmp_path / 'a.txt'): 'a'}, tag='a.png')
+        bad = writer.submit({str(blocker / 'b.txt'): 'b'}, tag='b.png')
+        writer.flush()
+
+        assert good.ok and not bad.ok
+        assert [ticket.tag for ticket in writer.pop_errors()] == ['b.png']
+        assert writer.pop_errors() == []
+    finally:
+        writer.close()
+
+
+def test_ocr_task_does_not_wait_for_writes_and_reports_them_later(tmp_path, monkeypatch):
+    release = threading.Event()
+    real_atomic_write = result_writer.atomic_write
+
+    def slow_atomic_write(path, content, **kwargs):
+        release.wait(5)
+        real_atomic_write(path, content, **kwargs)
+
+    def fake_ocr_image(image_path, output_dir, writer=None, **kwargs):
+        name = os.path.splitext(os.path.basename(image_path))[0]
+        ticket = writer.submit({os.path.join(output_dir, f'{name}_result.json'): '{}'}, tag=name)
+        return {'texts': ['x'], 'write_status': ticket, 'save_error': None}
+
+    monkeypatch.setattr(result_writer, 'atomic_write', slow_atomic_write)
+    monkeypatch.setattr(PaddleOCRVL_main, 'ocr_image', fake_ocr_image)
+    monkeypatch.setattr(supervised_pool, '_unreported_writes', [])
+
+    details = supervised_pool.ocr_task('/scans/a.png', str(tmp_path), return_details=True)
+    # 识别结果返回时文件仍在写入队列中
+    assert details['written'] == [] and details['write_errors'] == []
+    assert 'write_status' not in details
+    release.set()
+    assert supervised_pool.flush_results() == (['/scans/a.png'], [])
+    assert (tmp_path / 'a_result.json').exists()
+
+    blocker = tmp_path / 'blocker'
+    blocker.write_text('', encoding='utf-8')
+    supervised_pool.ocr_task('/scans/b.png', str(blocker), return_details=True)
+    result_writer.flush_default_writer()
+    # 此前的写入失败随下一张图片的结果报告
+    details = supervised_pool.ocr_task('/scans/c.png', str(tmp_path), return_details=True)
+    assert [path for path, _ in details['write_errors']] == ['/scans/b.png']
+    assert supervised_pool.flush_results() == (['/scans/c.png'], [])
+
+
+_handled = []
+
+
+def _remember(value):
+    _handled.append(value)
+    return value
+
+
+def _report_handled():
+    handled = list(_handled)
+    del _handled[:]
+    return handled or None
+
+
+def test_pool_flush_collects_finalizer_results_from_workers():
+    pool = supervised_pool.SupervisedPool(num_workers=1, task_fn=_remember, initializer=None,
+                                          finalizer=_report_handled, task_timeout=30)
+    try:
+        pool.start()
+        assert pool.map([(1,), (2,)]) == [1, 2]
+        assert pool.flush() == [[1, 2]]
+        assert pool.flush() == []
+        assert pool.map([(3,)]) == [3]
+    finally:
+        pool.close()
+    # 关闭时送回的收尾结果
+    assert pool.flush() == [[3]]
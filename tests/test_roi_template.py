@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""roi_template 的模板校验、区域缩放和区域识别测试"""
+
+import json
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import PaddleOCRVL_main
+from pipeline_registry import PipelineRegistry
+from roi_template import get_region_crops, load_template, ocr_regions
+
+
+class FakeRecognizer:
+    def __call__(self, crops):
+        # 用裁剪尺寸作为识别文本，便于核对裁剪范围
+        return [(f"{crop.shape[1]}x{crop.shape[0]}", 0.9) for crop in crops], 0.0
+
+
+class FakeRegionPipeline:
+    use_angle_cls = False
+
+    def __init__(self, config):
+        self.text_recognizer = FakeRecognizer()
+
+    def ocr(self, img, cls=None):
+        return [[[[[0, 20], [10, 20], [10, 30], [0, 30]], ('下一行', 0.9)],
+                 [[[0, 0], [10, 0], [10, 10], [0, 10]], ('第一行', 0.9)]]]
+
+
+def _write_template(tmp_path, template):
+    path = tmp_path / 'template.json'
+    path.write_text(json.dumps(template, ensure_ascii=False), encoding='utf-8')
+    return str(path)
+
+
+@pytest.mark.parametrize('template, message', [
+    ({'regions': []}, '没有定义'),
+    ({'regions': [{'box': [0, 0, 10, 10]}]}, 'name'),
+    ({'regions': [{'name': 'a', 'box': [0, 0, 10, 10]}, {'name': 'a', 'box': [0, 0, 10, 10]}]}, '重复'),
+    ({'regions': [{'name': 'a', 'box': [0, 0, 10]}]}, 'box'),
+    ({'regions': [{'name': 'a', 'box': [10, 0, 5, 10]}]}, '无效'),
+    ({'regions': [{'name': 'a', 'box': [0, 0, 10, 10]}], 'reference_size': [100]}, 'reference_size'),
+])
+def test_load_template_rejects_invalid_templates(tmp_path, template, message):
+    with pytest.raises(ValueError, match=message):
+        load_template(_write_template(tmp_path, template))
+
+
+def test_load_template_missing_file(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        load_template(str(tmp_path / 'missing.json'))
+
+
+def test_region_crops_scale_with_reference_size():
+    template = {'reference_size': [200, 100],
+                'regions': [{'name': 'a', 'box': [11, 21, 51, 41]}, {'name': 'out', 'box': [300, 0, 400, 50]}]}
+    img = np.zeros((150, 300, 3), dtype=np.uint8)
+    (region, crop), (_, outside) = get_region_crops(img, template, padding=0)
+
+    # 1.5倍缩放：16.5/31.5/76.5/61.5 四条边按相同方式取整
+    assert crop.shape[:2] == (30, 60)
+    assert outside is None
+
+    (_, padded), _ = get_region_crops(img, template, padding=4)
+    assert padded.shape[:2] == (38, 68)
+
+
+def test_ocr_regions_uses_recognition_for_single_lines(tmp_path, monkeypatch):
+    monkeypatch.setattr(PaddleOCRVL_main, '_registry', PipelineRegistry(factory=FakeRegionPipeline))
+    image_path = str(tmp_path / 'form.png')
+    Image.new('RGB', (400, 200), 'white').save(image_path)
+    template = {'reference_size': [200, 100], 'regions': [
+        {'name': 'number', 'box': [10, 10, 60, 20], 'single_line': True},
+        {'name': 'address', 'box': [10, 30, 190, 90]},
+        {'name': 'missing', 'box': [250, 10, 300, 20]},
+    ]}
+
+    fields = ocr_regions(image_path, _write_template(tmp_path, template), output_dir=str(tmp_path / 'out'),
+                         print_result=False)
+
+    assert fields == {'number': '108x28', 'address': '第一行\n下一行', 'missing': ''}
+    saved = json.loads((tmp_path / 'out' / 'form' / 'form_fields.json').read_text(encoding='utf-8'))
+    assert saved == fields
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""shm_transport 直接解码到共享内存槽位和超大图片拒绝测试"""
+
+import numpy as np
+from PIL import Image
+
+import PaddleOCRVL_main
+import shm_transport
+from pipeline_registry import PipelineRegistry
+from shm_transport import SharedFramePool, _decoded_layout, decode_into
+
+
+class FakeArrayPipeline:
+    """返回图片尺寸和左上角像素，用于核对推理进程看到的数组"""
+
+    def predict(self, img):
+        return [{'rec_texts': [f"{img.shape}:{img[0, 0].tolist()}"], 'rec_scores': [0.99],
+                 'rec_polys': [[[0, 0], [1, 0], [1, 1], [0, 1]]]}]
+
+
+def test_decode_into_slot_matches_load_image_array(tmp_path):
+    rgba = np.random.RandomState(0).randint(0, 255, (300, 170, 4), dtype=np.uint8)
+    gray = np.random.RandomState(1).randint(0, 255, (90, 40), dtype=np.uint8)
+    paths = [str(tmp_path / 'rgba.png'), str(tmp_path / 'gray.png')]
+    Image.fromarray(rgba).save(paths[0])
+    Image.fromarray(gray).save(paths[1])
+
+    pool = SharedFramePool(slot_count=2, slot_bytes=300 * 170 * 3)
+    try:
+        for slot, path in enumerate(paths):
+            with Image.open(path) as img:
+                shape, dtype, convert_mode = _decoded_layout(img)
+                target, meta = pool.slot_array(slot, shape, dtype)
+                decode_into(img, target, convert_mode, strip_rows=64)
+                del target
+            view = pool.view(meta)
+            assert np.array_equal(view, PaddleOCRVL_main.load_image_array(path))
+            del view
+    finally:
+        pool.close()
+
+
+def test_batch_uses_spawned_decoders_and_rejects_oversized_frames(tmp_path, monkeypatch):
+    monkeypatch.setattr(PaddleOCRVL_main, '_registry', PipelineRegistry(factory=lambda config: FakeArrayPipeline()))
+    small = str(tmp_path / 'small.png')
+    large = str(tmp_path / 'large.png')
+    Image.new('RGB', (64, 32), (10, 20, 30)).save(small)
+    Image.new('RGB', (1024, 1024), (40, 50, 60)).save(large)
+    missing = str(tmp_path / 'missing.png')
+
+    results = shm_transport.run_shared_memory_batch([small, large, missing], output_dir=str(tmp_path / 'out'),
+                                                    decode_workers=2, slot_count=1, slot_mb=1, print_result=False)
+
+    assert results[small] == ['(32, 64, 3):[10, 20, 30]']
+    # 解码后3MB超过1MB的槽位，不会绕过槽位传输
+    assert isinstance(results[large], RuntimeError) and '槽位大小' in str(results[large])
+    assert isinstance(results[missing], RuntimeError)
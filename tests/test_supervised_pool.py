@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""supervised_pool 的超时、崩溃、回收和初始化超时测试"""
+
+import os
+import time
+
+from supervised_pool import SupervisedPool, TaskTimeoutError, WorkerCrashedError
+
+
+def _task(action):
+    """假的任务：按参数正常返回进程号、长时间运行或直接退出进程"""
+    if action == 'hang':
+        time.sleep(60)
+    elif action == 'crash':
+        os._exit(3)
+    return os.getpid()
+
+
+def _init_once(marker):
+    """第一次初始化正常完成，之后重启的工作进程在加载模型时卡住"""
+    if os.path.exists(marker):
+        time.sleep(60)
+    open(marker, 'w').close()
+
+
+def _pool(**kwargs):
+    kwargs.setdefault('initializer', None)
+    kwargs.setdefault('finalizer', None)
+    return SupervisedPool(num_workers=1, task_fn=_task, **kwargs)
+
+
+def test_hung_task_times_out_and_worker_is_replaced():
+    with _pool(task_timeout=1) as pool:
+        results = pool.map([('ok',), ('hang',), ('ok',)])
+        stats = dict(pool.stats)
+
+    assert isinstance(results[1], TaskTimeoutError)
+    assert results[0] != results[2]
+    assert stats['timeouts'] == 1 and stats['spawned'] == 2
+
+
+def test_crashed_worker_fails_only_its_task():
+    with _pool(task_timeout=30) as pool:
+        results = pool.map([('crash',), ('ok',)])
+        stats = dict(pool.stats)
+
+    assert isinstance(results[0], WorkerCrashedError)
+    assert isinstance(results[1], int)
+    assert stats['crashes'] == 1
+
+
+def test_workers_are_recycled_after_max_tasks():
+    with _pool(task_timeout=30, max_tasks_per_worker=2) as pool:
+        pids = pool.map([('ok',)] * 5)
+        stats = dict(pool.stats)
+
+    assert all(isinstance(pid, int) for pid in pids)
+    assert pids[0] == pids[1] and pids[2] == pids[3] and len(set(pids)) == 3
+    assert stats['recycled'] == 2
+
+
+def test_respawned_worker_that_hangs_during_init_times_out(tmp_path):
+    marker = str(tmp_path / 'initialized')
+    with _pool(initializer=_init_once, init_args=(marker,), task_timeout=30, start_timeout=2) as pool:
+        pool.start()
+        start = time.time()
+        results = pool.map([('crash',), ('ok',)])
+        elapsed = time.time() - start
+        stats = dict(pool.stats)
+        pool.close(timeout=1)
+
+    assert isinstance(results[0], WorkerCrashedError)
+    assert isinstance(results[1], TaskTimeoutError) and '初始化' in str(results[1])
+    assert stats['timeouts'] == 1
+    assert elapsed < 20